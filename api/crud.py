@@ -1,5 +1,7 @@
 from sqlalchemy.orm import Session
 from sqlalchemy import text
+from datetime import date
+from typing import Iterator, Optional
 
 def get_top_products(db: Session, limit: int):
     """
@@ -33,31 +35,104 @@ def get_top_products(db: Session, limit: int):
     result = db.execute(query, {"limit": limit}).fetchall()
     return result
 
-def get_channel_activity(db: Session, channel_name: str):
+def get_product_prices(db: Session, product_name: str):
     """
-    Gets daily post counts for a specific channel.
-    FIX: Joins with dim_dates to get the actual date from date_key.
+    Price range of a product per channel, from prices quoted next to its
+    mentions in message text. Names match case-insensitively ('paracetamol'
+    finds 'Paracetamol') through the lower(product_name) index of
+    fct_product_mentions instead of scanning message text.
     """
     query = text("""
-        SELECT 
-            TO_CHAR(d.full_date, 'YYYY-MM-DD') as date,
-            COUNT(m.message_id) as post_count
-        FROM staging_marts.fct_messages m
-        JOIN staging_marts.dim_channels c ON m.channel_key = c.channel_key
-        JOIN staging_marts.dim_dates d ON m.date_key = d.date_key
-        WHERE c.channel_name = :channel_name
-        GROUP BY d.full_date
-        ORDER BY d.full_date DESC
+        SELECT
+            c.channel_name,
+            p.currency,
+            COUNT(*) AS mention_count,
+            MIN(p.price) AS min_price,
+            ROUND(AVG(p.price), 2) AS avg_price,
+            MAX(p.price) AS max_price
+        FROM staging_marts.fct_product_mentions p
+        JOIN staging_marts.dim_channels c ON c.channel_key = p.channel_key
+        WHERE lower(p.product_name) = lower(:product_name)
+          AND p.price IS NOT NULL
+        GROUP BY c.channel_name, p.currency
+        ORDER BY mention_count DESC
     """)
-    result = db.execute(query, {"channel_name": channel_name}).fetchall()
+    return db.execute(query, {"product_name": product_name}).fetchall()
+
+# Rollup table per granularity, built by dbt (agg_channel_activity_*)
+ACTIVITY_TABLES = {
+    "day": "staging_marts.agg_channel_activity_daily",
+    "week": "staging_marts.agg_channel_activity_weekly",
+    "month": "staging_marts.agg_channel_activity_monthly",
+}
+
+def get_channel_activity(
+    db: Session,
+    channel_name: str,
+    limit: int,
+    after_date: Optional[date] = None,
+    granularity: str = "day",
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+):
+    """
+    Gets post counts per day/week/month for a specific channel, newest first.
+    Reads the dbt activity rollups, so any date range is an index range
+    scan on (channel_name, activity_date) instead of a join + group by.
+    Keyset pagination: pass the last date of the previous page as after_date.
+    """
+    filters = []
+    if date_from is not None:
+        filters.append("AND activity_date >= :date_from")
+    if date_to is not None:
+        filters.append("AND activity_date <= :date_to")
+    if after_date:
+        filters.append("AND activity_date < CAST(:after_date AS date)")
+    query = text(f"""
+        SELECT
+            TO_CHAR(activity_date, 'YYYY-MM-DD') as date,
+            post_count,
+            total_views,
+            total_forwards,
+            image_share
+        FROM {ACTIVITY_TABLES[granularity]}
+        WHERE channel_name = :channel_name
+        {" ".join(filters)}
+        ORDER BY activity_date DESC
+        LIMIT :limit
+    """)
+    params = {
+        "channel_name": channel_name,
+        "limit": limit,
+        "after_date": after_date,
+        "date_from": date_from,
+        "date_to": date_to,
+    }
+    result = db.execute(query, params).fetchall()
     return result
 
-def search_messages(db: Session, query_str: str, limit: int):
+def search_messages(
+    db: Session,
+    query_str: str,
+    limit: int,
+    after_date: Optional[date] = None,
+    after_id: Optional[int] = None,
+    after_channel: Optional[str] = None,
+):
     """
-    Case-insensitive search for messages.
+    Case-insensitive search for messages, newest first.
     FIX: Joins with dim_dates to return the message date.
+    Keyset pagination on (date, message_id, channel_name): pass the last
+    row's values. message_id is only unique within a channel, and search
+    spans all channels, so the channel breaks ties.
     """
-    sql_query = text("""
+    keyset = ""
+    if after_date is not None and after_id is not None and after_channel is not None:
+        keyset = (
+            "AND (d.full_date, m.message_id, c.channel_name) "
+            "< (CAST(:after_date AS date), :after_id, :after_channel)"
+        )
+    sql_query = text(f"""
         SELECT 
             m.message_id,
             c.channel_name,
@@ -68,12 +143,46 @@ def search_messages(db: Session, query_str: str, limit: int):
         JOIN staging_marts.dim_channels c ON m.channel_key = c.channel_key
         JOIN staging_marts.dim_dates d ON m.date_key = d.date_key
         WHERE m.message_text ILIKE :search_term
-        ORDER BY d.full_date DESC
+        {keyset}
+        ORDER BY d.full_date DESC, m.message_id DESC, c.channel_name DESC
         LIMIT :limit
     """)
     search_term = f"%{query_str}%"
-    result = db.execute(sql_query, {"search_term": search_term, "limit": limit}).fetchall()
+    params = {
+        "search_term": search_term,
+        "limit": limit,
+        "after_date": after_date,
+        "after_id": after_id,
+        "after_channel": after_channel,
+    }
+    result = db.execute(sql_query, params).fetchall()
     return result
+
+def stream_channel_messages(db: Session, channel_name: str, batch_size: int = 1000) -> Iterator:
+    """
+    Yields every message of a channel from a server-side cursor.
+    Rows are fetched batch_size at a time, so memory stays flat however
+    long the channel history is.
+    """
+    query = text("""
+        SELECT
+            m.message_id,
+            c.channel_name,
+            d.full_date as message_date,
+            m.message_text,
+            m.view_count as views,
+            m.forward_count as forwards,
+            m.has_image
+        FROM staging_marts.fct_messages m
+        JOIN staging_marts.dim_channels c ON m.channel_key = c.channel_key
+        JOIN staging_marts.dim_dates d ON m.date_key = d.date_key
+        WHERE c.channel_name = :channel_name
+        ORDER BY d.full_date DESC, m.message_id DESC
+    """).execution_options(stream_results=True)
+    result = db.execute(query, {"channel_name": channel_name})
+    for rows in result.partitions(batch_size):
+        yield from rows
+
 def get_visual_stats(db: Session):
     """
     Aggregates image stats per channel.
@@ -82,7 +191,7 @@ def get_visual_stats(db: Session):
         SELECT 
             c.channel_name,
             COUNT(d.detection_key) as total_images,
-            COALESCE(AVG(d.confidence_score), 0) as avg_confidence
+            ROUND(COALESCE(AVG(d.confidence_score), 0)::numeric, 3) as avg_confidence
         FROM staging_marts.dim_channels c
         LEFT JOIN staging_marts.fct_image_detections d ON c.channel_key = d.channel_key
         GROUP BY c.channel_name
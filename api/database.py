@@ -1,7 +1,9 @@
 import os
+import time
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
+from . import metrics
 
 load_dotenv()
 
@@ -14,11 +16,16 @@ DB_STR = (
 )
 
 engine = create_engine(DB_STR, pool_size=10, max_overflow=20)
+metrics.instrument_engine(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 def get_db():
     db = SessionLocal()
     try:
+        # Check the connection out up front so pool wait is measured on its own
+        started = time.perf_counter()
+        db.connection()
+        metrics.observe_pool_checkout(time.perf_counter() - started)
         yield db
     finally:
         db.close()
\ No newline at end of file
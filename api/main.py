@@ -1,13 +1,22 @@
-from fastapi import FastAPI, Depends, HTTPException, Query
+import csv
+import io
+import time
+import orjson
+from datetime import date
+from fastapi import FastAPI, Depends, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
-from . import database, schemas, crud
+from typing import Iterator, List, Optional
+from . import database, schemas, crud, metrics
+from .pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
+from .responses import ORJSONResponse, rows_response
 # ... imports ...
 
 app = FastAPI(
     title="Medical Telegram Analytics API",
     description="REST API for accessing medical channel insights.",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
 )
 
 # --- ADD THIS MISSING ROOT ENDPOINT ---
@@ -16,14 +25,34 @@ def read_root():
     return {"status": "online", "message": "Medical Data API is running. Go to /docs for the dashboard."}
 # --------------------------------------
 
-# ... rest of the code (get_db, endpoints) ...
-# Dependency to get DB session
-def get_db():
-    db = database.SessionLocal()
+# ---------------------------------------------------------
+# INSTRUMENTATION
+# ---------------------------------------------------------
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    db_time = metrics.start_request()
+    started = time.perf_counter()
+    status = 500
     try:
-        yield db
+        response = await call_next(request)
+        status = response.status_code
+        return response
     finally:
-        db.close()
+        route = request.scope.get("route")
+        metrics.observe_request(
+            route.path if route is not None else "unmatched",
+            request.method,
+            status,
+            time.perf_counter() - started,
+            db_time[0],
+        )
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def get_metrics():
+    return metrics.render(database.engine)
+
+# Dependency to get DB session (also records pool checkout wait)
+get_db = database.get_db
 
 # ---------------------------------------------------------
 # ENDPOINT 1: Top Products
@@ -31,34 +60,140 @@ def get_db():
 @app.get("/api/reports/top-products", response_model=List[schemas.TopProduct])
 def get_top_products(limit: int = 10, db: Session = Depends(get_db)):
     result = crud.get_top_products(db, limit)
-    return [{"product_name": row[0], "mention_count": row[1]} for row in result]
+    return rows_response(schemas.TopProduct, result)
+
+@app.get("/api/products/{product_name}/prices", response_model=List[schemas.ProductPrice])
+def get_product_prices(product_name: str, db: Session = Depends(get_db)):
+    result = crud.get_product_prices(db, product_name)
+    if not result:
+        raise HTTPException(status_code=404, detail=f"No prices found for product '{product_name}'")
+    return rows_response(schemas.ProductPrice, result)
+
+def _cursor_str(value) -> str:
+    if not isinstance(value, str):
+        raise TypeError(f"not a string: {value!r}")
+    return value
+
+def _cursor_int(value) -> int:
+    # JSON true/false and floats are not message ids
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise TypeError(f"not an integer: {value!r}")
+    return value
+
+# How each cursor key is parsed; values reach the SQL as typed bind parameters
+CURSOR_FIELDS = {
+    "date": date.fromisoformat,
+    "message_id": _cursor_int,
+    "channel_name": _cursor_str,
+}
+
+def _cursor_or_400(cursor: Optional[str], *keys: str) -> Optional[dict]:
+    try:
+        values = decode_cursor(cursor)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    if values is None:
+        return None
+    try:
+        return {k: CURSOR_FIELDS[k](values[k]) for k in keys}
+    except (KeyError, TypeError, ValueError):
+        raise HTTPException(status_code=400, detail=f"Invalid cursor: {cursor}")
 
 # ---------------------------------------------------------
 # ENDPOINT 2: Channel Activity
 # ---------------------------------------------------------
 @app.get("/api/channels/{channel_name}/activity", response_model=List[schemas.ChannelActivity])
-def get_channel_activity(channel_name: str, db: Session = Depends(get_db)):
-    result = crud.get_channel_activity(db, channel_name)
-    if not result:
+def get_channel_activity(
+    channel_name: str,
+    granularity: str = Query("day", pattern="^(day|week|month)$"),
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    after = _cursor_or_400(cursor, "date")
+    result = crud.get_channel_activity(
+        db,
+        channel_name,
+        limit,
+        after_date=after["date"] if after else None,
+        granularity=granularity,
+        date_from=date_from,
+        date_to=date_to,
+    )
+    if not result and after is None and date_from is None and date_to is None:
         raise HTTPException(status_code=404, detail=f"No activity found for channel '{channel_name}'")
-    return [{"date": row[0], "post_count": row[1]} for row in result]
+    headers = {}
+    if len(result) == limit:
+        headers[NEXT_CURSOR_HEADER] = encode_cursor({"date": result[-1].date})
+    return rows_response(schemas.ChannelActivity, result, headers)
 
 # ---------------------------------------------------------
 # ENDPOINT 3: Message Search
 # ---------------------------------------------------------
 @app.get("/api/search/messages", response_model=List[schemas.SearchResult])
-def search_messages(query: str, limit: int = 20, db: Session = Depends(get_db)):
-    result = crud.search_messages(db, query, limit)
-    return [
-        {
-            "message_id": row[0],
-            "channel_name": row[1],
-            "message_text": row[2],
-            "message_date": row[3],
-            "views": row[4]
-        }
-        for row in result
-    ]
+def search_messages(
+    query: str,
+    limit: int = Query(20, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    after = _cursor_or_400(cursor, "date", "message_id", "channel_name")
+    result = crud.search_messages(
+        db,
+        query,
+        limit,
+        after_date=after["date"] if after else None,
+        after_id=after["message_id"] if after else None,
+        after_channel=after["channel_name"] if after else None,
+    )
+    headers = {}
+    if len(result) == limit:
+        last = result[-1]
+        headers[NEXT_CURSOR_HEADER] = encode_cursor(
+            {"date": last.message_date, "message_id": last.message_id, "channel_name": last.channel_name}
+        )
+    return rows_response(schemas.SearchResult, result, headers)
+
+# ---------------------------------------------------------
+# ENDPOINT 3b: Channel Message Export (streaming)
+# ---------------------------------------------------------
+EXPORT_COLUMNS = ["message_id", "channel_name", "message_date", "message_text", "views", "forwards", "has_image"]
+
+def _export_rows(channel_name: str, fmt: str) -> Iterator[str]:
+    # The generator outlives the request dependency, so it owns its session
+    db = database.SessionLocal()
+    try:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if fmt == "csv":
+            writer.writerow(EXPORT_COLUMNS)
+        for row in crud.stream_channel_messages(db, channel_name):
+            if fmt == "csv":
+                writer.writerow(row)
+            else:
+                buffer.write(orjson.dumps(dict(zip(EXPORT_COLUMNS, row))).decode("utf-8"))
+                buffer.write("\n")
+            if buffer.tell() >= 64 * 1024:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+    finally:
+        db.close()
+
+@app.get("/api/channels/{channel_name}/messages/export")
+def export_channel_messages(
+    channel_name: str,
+    export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+):
+    media_type = "text/csv" if export_format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        _export_rows(channel_name, export_format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{channel_name}.{export_format}"'},
+    )
 
 # ---------------------------------------------------------
 # ENDPOINT 4: Visual Content Stats
@@ -66,11 +201,4 @@ def search_messages(query: str, limit: int = 20, db: Session = Depends(get_db)):
 @app.get("/api/reports/visual-content", response_model=List[schemas.VisualContentStats])
 def get_visual_content_stats(db: Session = Depends(get_db)):
     result = crud.get_visual_stats(db)
-    return [
-        {
-            "channel_name": row[0],
-            "total_images": row[1],
-            "avg_confidence": round(float(row[2]), 3)
-        }
-        for row in result
-    ]
\ No newline at end of file
+    return rows_response(schemas.VisualContentStats, result)
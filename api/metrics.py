@@ -0,0 +1,254 @@
+import os
+import time
+import hashlib
+import threading
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from loguru import logger
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+# -----------------------------------------------------------------------------
+# CONFIG
+# -----------------------------------------------------------------------------
+
+# Queries slower than this are logged together with their EXPLAIN plan
+SLOW_QUERY_MS = float(os.getenv("API_SLOW_QUERY_MS", "500"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ROWS_BUCKETS = (1, 10, 50, 100, 500, 1000, 5000, 10000, 50000)
+
+
+# -----------------------------------------------------------------------------
+# METRIC TYPES
+# -----------------------------------------------------------------------------
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Histogram:
+    """Prometheus-style cumulative histogram with a fixed label set."""
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...], buckets: Tuple[float, ...]):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        with self._lock:
+            # per bucket counts, then +Inf count and sum
+            series = self._series.setdefault(label_values, [0.0] * (len(self.buckets) + 2))
+            series[bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for label_values, series in sorted(self._series.items()):
+                cumulative = 0.0
+                for bound, count in zip(self.buckets, series):
+                    cumulative += count
+                    le = _format_labels(self.labels, label_values, f'le="{bound}"')
+                    lines.append(f"{self.name}_bucket{le} {cumulative:g}")
+                cumulative += series[len(self.buckets)]
+                le = _format_labels(self.labels, label_values, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{le} {cumulative:g}")
+                plain = _format_labels(self.labels, label_values)
+                lines.append(f"{self.name}_sum{plain} {series[-1]:.6f}")
+                lines.append(f"{self.name}_count{plain} {cumulative:g}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...]):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float, *label_values: str) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {value:g}")
+        return lines
+
+
+# -----------------------------------------------------------------------------
+# REGISTRY
+# -----------------------------------------------------------------------------
+
+REQUEST_LATENCY = Histogram(
+    "api_request_duration_seconds",
+    "End-to-end request latency per route",
+    ("route", "method", "status"),
+    LATENCY_BUCKETS,
+)
+REQUEST_DB_TIME = Histogram(
+    "api_request_db_seconds",
+    "Time spent in SQL per request; the rest of the request latency is Python and serialisation",
+    ("route",),
+    LATENCY_BUCKETS,
+)
+QUERY_LATENCY = Histogram(
+    "api_query_duration_seconds",
+    "SQL execution time per statement fingerprint",
+    ("query",),
+    LATENCY_BUCKETS,
+)
+QUERY_ROWS = Histogram(
+    "api_query_rows",
+    "Rows returned per statement fingerprint (client-side cursors only)",
+    ("query",),
+    ROWS_BUCKETS,
+)
+POOL_WAIT = Histogram(
+    "api_db_pool_checkout_seconds",
+    "Time waiting to check a connection out of the pool",
+    (),
+    LATENCY_BUCKETS,
+)
+SLOW_QUERIES = Counter(
+    "api_slow_queries_total",
+    f"Statements slower than API_SLOW_QUERY_MS ({SLOW_QUERY_MS:g} ms)",
+    ("query",),
+)
+
+# fingerprint -> first line of the statement, exported as an info metric
+_QUERY_TEXT: Dict[str, str] = {}
+
+# Mutable per-request accumulator of SQL time, shared with the threadpool
+_request_db_time: ContextVar[Optional[List[float]]] = ContextVar("request_db_time", default=None)
+
+
+def fingerprint(statement: str) -> str:
+    key = hashlib.md5(" ".join(statement.split()).encode("utf-8")).hexdigest()[:12]
+    if key not in _QUERY_TEXT:
+        _QUERY_TEXT[key] = " ".join(statement.split())[:120]
+    return key
+
+
+# -----------------------------------------------------------------------------
+# REQUEST HOOKS
+# -----------------------------------------------------------------------------
+
+def start_request() -> List[float]:
+    accumulator = [0.0]
+    _request_db_time.set(accumulator)
+    return accumulator
+
+
+def observe_request(route: str, method: str, status: int, seconds: float, db_seconds: float) -> None:
+    REQUEST_LATENCY.observe(seconds, route, method, str(status))
+    REQUEST_DB_TIME.observe(db_seconds, route)
+
+
+# -----------------------------------------------------------------------------
+# SQLALCHEMY HOOKS
+# -----------------------------------------------------------------------------
+
+def instrument_engine(engine: Engine) -> None:
+    """Attach per-query timing, row counts and the slow-query log to an engine."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        key = fingerprint(statement)
+
+        QUERY_LATENCY.observe(elapsed, key)
+        if cursor.rowcount is not None and cursor.rowcount >= 0:
+            QUERY_ROWS.observe(cursor.rowcount, key)
+
+        accumulator = _request_db_time.get()
+        if accumulator is not None:
+            accumulator[0] += elapsed
+
+        if elapsed * 1000 >= SLOW_QUERY_MS and not executemany:
+            SLOW_QUERIES.inc(1, key)
+            _log_slow_query(conn, statement, parameters, elapsed)
+
+    @event.listens_for(engine, "handle_error")
+    def _failed(exception_context):
+        # after_cursor_execute never fires for a failed statement
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_started"):
+            conn.info["query_started"].pop()
+
+
+def _log_slow_query(conn, statement: str, parameters, elapsed: float) -> None:
+    """Log a slow SELECT with its plan, without disturbing the caller's transaction."""
+    plan = None
+    if statement.lstrip().upper().startswith(("SELECT", "WITH")):
+        cursor = conn.connection.cursor()
+        try:
+            # A failing EXPLAIN must not abort the request's transaction
+            cursor.execute("SAVEPOINT slow_query_explain")
+            cursor.execute(f"EXPLAIN {statement}", parameters)
+            plan = "\n".join(str(row[0]) for row in cursor.fetchall())
+            cursor.execute("RELEASE SAVEPOINT slow_query_explain")
+        except Exception as exc:
+            cursor.execute("ROLLBACK TO SAVEPOINT slow_query_explain")
+            plan = f"<EXPLAIN failed: {exc}>"
+        finally:
+            cursor.close()
+
+    logger.warning(
+        f"Slow query ({elapsed * 1000:.0f} ms, threshold {SLOW_QUERY_MS:g} ms): "
+        f"{' '.join(statement.split())}\nparams={parameters}\nplan:\n{plan}"
+    )
+
+
+def observe_pool_checkout(seconds: float) -> None:
+    POOL_WAIT.observe(seconds)
+
+
+# -----------------------------------------------------------------------------
+# EXPOSITION
+# -----------------------------------------------------------------------------
+
+def render(engine: Engine) -> str:
+    """Render every metric in the Prometheus text exposition format."""
+    lines: List[str] = []
+    for metric in (REQUEST_LATENCY, REQUEST_DB_TIME, QUERY_LATENCY, QUERY_ROWS, POOL_WAIT, SLOW_QUERIES):
+        lines.extend(metric.render())
+
+    lines.append("# HELP api_query_info Statement text behind each query fingerprint")
+    lines.append("# TYPE api_query_info gauge")
+    for key, statement in sorted(_QUERY_TEXT.items()):
+        lines.append(f'api_query_info{{query="{key}",statement="{_escape(statement)}"}} 1')
+
+    pool = engine.pool
+    if isinstance(pool, QueuePool):
+        for name, help_text, value in (
+            ("api_db_pool_size", "Configured pool size", pool.size()),
+            ("api_db_pool_checked_out", "Connections currently checked out", pool.checkedout()),
+            ("api_db_pool_overflow", "Connections open beyond pool_size", pool.overflow()),
+        ):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,40 @@
+from typing import Any, Dict, Iterable, List, Optional, Type
+
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, TypeAdapter
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered with orjson (native datetime support, no indent)."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+_ADAPTERS: Dict[Type[BaseModel], TypeAdapter] = {}
+
+
+def _adapter(schema: Type[BaseModel]) -> TypeAdapter:
+    if schema not in _ADAPTERS:
+        _ADAPTERS[schema] = TypeAdapter(List[schema])
+    return _ADAPTERS[schema]
+
+
+def rows_response(
+    schema: Type[BaseModel],
+    rows: Iterable[Any],
+    headers: Optional[Dict[str, str]] = None,
+) -> ORJSONResponse:
+    """
+    Validate DB rows straight into a response schema and render with orjson.
+
+    Rows are read by attribute (column name), so no intermediate list of
+    dicts is built by hand. Returning a Response skips FastAPI's second
+    validation pass; the endpoint's response_model still documents the shape.
+    """
+    adapter = _adapter(schema)
+    models = adapter.validate_python(list(rows), from_attributes=True)
+    return ORJSONResponse(adapter.dump_python(models), headers=headers)
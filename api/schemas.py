@@ -1,16 +1,35 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from typing import List, Optional
 from datetime import datetime
 
 class ChannelActivity(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     date: str
     post_count: int
+    total_views: Optional[int] = None
+    total_forwards: Optional[int] = None
+    image_share: Optional[float] = None
 
 class TopProduct(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     product_name: str
     mention_count: int
 
+class ProductPrice(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    channel_name: str
+    currency: str
+    mention_count: int
+    min_price: float
+    avg_price: float
+    max_price: float
+
 class SearchResult(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     message_id: int
     channel_name: str
     message_text: str
@@ -18,6 +37,8 @@ class SearchResult(BaseModel):
     views: int
 
 class VisualContentStats(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     channel_name: str
     total_images: int
     avg_confidence: float
\ No newline at end of file
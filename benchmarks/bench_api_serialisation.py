@@ -0,0 +1,87 @@
+"""
+Microbenchmark: API response serialisation cost per 1k rows.
+
+Compares the previous path (hand-built dicts, response_model validation,
+stdlib json via JSONResponse) with api.responses.rows_response (rows
+validated straight into the schema, rendered with orjson).
+
+    python benchmarks/bench_api_serialisation.py --rows 1000 --repeat 50
+"""
+import sys
+import json
+import timeit
+import argparse
+from collections import namedtuple
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List
+
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from api import schemas
+from api.responses import rows_response
+
+# Stand-in for sqlalchemy Row: tuple with attribute access by column name
+SearchRow = namedtuple("SearchRow", ["message_id", "channel_name", "message_text", "message_date", "views"])
+
+# Telegram product posts are long and mix Amharic and English
+MESSAGE_TEXT = ("ፓራሲታሞል 500mg Paracetamol tablets available, ዋጋ 350 ብር. " * 20).strip()
+
+
+def make_rows(n: int) -> List[SearchRow]:
+    start = datetime(2026, 1, 1)
+    return [
+        SearchRow(i, "tikvahpharma", MESSAGE_TEXT, start - timedelta(hours=i), i * 37)
+        for i in range(n)
+    ]
+
+
+def previous_path(rows: List[SearchRow]) -> bytes:
+    adapter = TypeAdapter(List[schemas.SearchResult])
+    content = [
+        {
+            "message_id": row[0],
+            "channel_name": row[1],
+            "message_text": row[2],
+            "message_date": row[3],
+            "views": row[4],
+        }
+        for row in rows
+    ]
+    # What FastAPI does with a response_model: validate, dump, stdlib json
+    validated = adapter.validate_python(content)
+    return JSONResponse(adapter.dump_python(validated, mode="json")).body
+
+
+def orjson_path(rows: List[SearchRow]) -> bytes:
+    return rows_response(schemas.SearchResult, rows).body
+
+
+def run(n_rows: int, repeat: int) -> dict:
+    rows = make_rows(n_rows)
+    assert json.loads(previous_path(rows)) == json.loads(orjson_path(rows))
+
+    results = {}
+    for name, fn in (("previous", previous_path), ("orjson", orjson_path)):
+        best = min(timeit.repeat(lambda: fn(rows), number=1, repeat=repeat))
+        results[name] = round(best * 1000 * 1000 / n_rows, 3)  # ms per 1k rows
+    results["speedup"] = round(results["previous"] / results["orjson"], 2)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000, help="Rows per response (default: 1000)")
+    parser.add_argument("--repeat", type=int, default=50, help="Timing repetitions, best is kept (default: 50)")
+    args = parser.parse_args()
+
+    results = run(args.rows, args.repeat)
+    print(f"Serialisation cost per 1k SearchResult rows ({args.rows} rows/response):")
+    print(f"  previous (dicts + stdlib json): {results['previous']:.3f} ms")
+    print(f"  rows_response (orjson):         {results['orjson']:.3f} ms")
+    print(f"  speedup:                        {results['speedup']:.2f}x")
@@ -0,0 +1,106 @@
+"""
+Benchmark: scraper throughput against the offline fake Telegram client.
+
+Runs scripts/telegram_scraper.scrape_all_channels with
+src.telegram_fake.FakeTelegramClient injected, so throttling and FloodWait
+retry behaviour can be measured deterministically without network access.
+--max-rps simulates Telegram's server-side limit for tuning the adaptive
+rate limiter.
+
+    python benchmarks/bench_scraper.py --limit 300 --latency 0.05 --max-rps 10
+"""
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import importlib.util
+from pathlib import Path
+from types import ModuleType
+from typing import Dict, List, Optional
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.telegram_fake import FakeTelegramClient
+
+CHANNELS = ["@chemed123", "@lobelia4cosmetics", "@tikvahpharma"]
+
+
+def load_scraper() -> ModuleType:
+    spec = importlib.util.spec_from_file_location(
+        "telegram_scraper", PROJECT_ROOT / "scripts" / "telegram_scraper.py"
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def run(
+    channels: List[str] = CHANNELS,
+    limit: int = 300,
+    latency: float = 0.05,
+    download_latency: float = 0.1,
+    flood_every: int = 0,
+    flood_seconds: int = 1,
+    max_rps: Optional[float] = None,
+    message_delay: float = 0.0,
+    channel_delay: float = 0.0,
+) -> Dict:
+    scraper = load_scraper()
+    client = FakeTelegramClient(
+        messages_per_channel=limit,
+        latency=latency,
+        download_latency=download_latency,
+        flood_wait_every=flood_every,
+        flood_wait_seconds=flood_seconds,
+        max_requests_per_second=max_rps,
+    )
+
+    with tempfile.TemporaryDirectory(prefix="bench_scraper_") as base_path:
+        started = time.perf_counter()
+        stats = asyncio.run(scraper.scrape_all_channels(
+            client,
+            channels,
+            base_path,
+            limit,
+            message_delay=message_delay,
+            channel_delay=channel_delay,
+        ))
+        seconds = time.perf_counter() - started
+
+    messages = sum(stats.values())
+    return {
+        "channels": len(channels),
+        "messages": messages,
+        "seconds": round(seconds, 3),
+        "messages_per_sec": round(messages / seconds, 1) if seconds else 0.0,
+        "client": dict(client.stats),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the scraper against the fake Telegram client")
+    parser.add_argument("--limit", type=int, default=300, help="Messages per channel")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds per API request")
+    parser.add_argument("--download-latency", type=float, default=0.1, help="Seconds per media download")
+    parser.add_argument("--flood-every", type=int, default=0, help="FloodWaitError on every Nth request")
+    parser.add_argument("--flood-seconds", type=int, default=1, help="Seconds requested by each FloodWaitError")
+    parser.add_argument("--max-rps", type=float, default=None, help="Simulated server-side request limit")
+    parser.add_argument("--message-delay", type=float, default=0.0)
+    parser.add_argument("--channel-delay", type=float, default=0.0)
+    args = parser.parse_args()
+
+    result = run(
+        limit=args.limit,
+        latency=args.latency,
+        download_latency=args.download_latency,
+        flood_every=args.flood_every,
+        flood_seconds=args.flood_seconds,
+        max_rps=args.max_rps,
+        message_delay=args.message_delay,
+        channel_delay=args.channel_delay,
+    )
+    print(json.dumps(result, indent=2))
@@ -0,0 +1,65 @@
+"""
+Microbenchmark: drug/product extraction throughput in messages/sec.
+
+Compares src.text_enrich.ProductMatcher (one Aho-Corasick pass per
+message) with a naive scan that runs one word-boundary regex per
+dictionary term, over synthetic product posts.
+
+    python benchmarks/bench_text_enrich.py --messages 20000
+"""
+import re
+import sys
+import time
+import random
+import argparse
+from pathlib import Path
+from typing import List
+
+import pandas as pd
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from benchmarks.synthetic import PRODUCTS, TEMPLATES
+from src.text_enrich import DICTIONARY_PATH, ProductMatcher, normalise
+
+
+def make_messages(n: int, seed: int = 42) -> List[str]:
+    rng = random.Random(seed)
+    return [
+        rng.choice(TEMPLATES).format(product=rng.choice(PRODUCTS), price=rng.randrange(50, 5000, 10))
+        for _ in range(n)
+    ]
+
+
+def naive_extract(patterns, message: str) -> List[str]:
+    normalised = normalise(message)
+    return [name for pattern, name in patterns if pattern.search(normalised)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark product mention extraction")
+    parser.add_argument("--messages", type=int, default=20000)
+    args = parser.parse_args()
+
+    messages = make_messages(args.messages)
+    matcher = ProductMatcher.from_csv()
+
+    dictionary = pd.read_csv(DICTIONARY_PATH, dtype=str)
+    patterns = [
+        (re.compile(rf"(?<!\w){re.escape(normalise(term))}(?!\w)"), name)
+        for term, name in zip(dictionary["term"], dictionary["product_name"])
+    ]
+
+    started = time.perf_counter()
+    mentions = sum(len(matcher.extract(m)) for m in messages)
+    matcher_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    naive = sum(len(naive_extract(patterns, m)) for m in messages)
+    naive_seconds = time.perf_counter() - started
+
+    print(f"{args.messages} messages, {len(dictionary)} dictionary terms")
+    print(f"naive regex per term : {args.messages / naive_seconds:10.0f} messages/sec ({naive} matches, no prices)")
+    print(f"ProductMatcher       : {args.messages / matcher_seconds:10.0f} messages/sec ({mentions} mentions with prices)")
@@ -0,0 +1,78 @@
+"""
+Compare two benchmark result files and flag regressions.
+
+    python benchmarks/compare.py benchmarks/results/<base>.json benchmarks/results/<head>.json
+
+Throughput metrics (*_per_sec) regress when they drop; timings (*seconds,
+*_ms) regress when they grow. Exits with status 1 when any metric
+regresses by more than --threshold percent.
+"""
+import sys
+import json
+import argparse
+from pathlib import Path
+from typing import Dict, Optional
+
+
+def flatten(stages: Dict, prefix: str = "") -> Dict[str, float]:
+    """{"api": {"search": {"p50_ms": 3.1}}} -> {"api.search.p50_ms": 3.1}"""
+    metrics = {}
+    for key, value in stages.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            metrics.update(flatten(value, path + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            metrics[path] = float(value)
+    return metrics
+
+
+def direction(metric: str) -> Optional[int]:
+    """+1 when higher is better, -1 when lower is better, None for counts."""
+    name = metric.rsplit(".", 1)[-1]
+    if name.endswith("_per_sec"):
+        return 1
+    if name.endswith(("seconds", "_ms")):
+        return -1
+    return None
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("base", type=Path)
+    parser.add_argument("head", type=Path)
+    parser.add_argument("--threshold", type=float, default=10.0, help="Regression threshold in percent")
+    args = parser.parse_args()
+
+    with open(args.base, "r", encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.head, "r", encoding="utf-8") as f:
+        head = json.load(f)
+
+    if base.get("params") != head.get("params"):
+        print(f"WARNING: parameters differ: {base.get('params')} vs {head.get('params')}")
+
+    base_metrics = flatten(base["stages"])
+    head_metrics = flatten(head["stages"])
+
+    print(f"{'metric':<70} {base['commit']:>12} {head['commit']:>12} {'change':>9}")
+    regressions = 0
+    for metric in sorted(base_metrics.keys() & head_metrics.keys()):
+        better = direction(metric)
+        if better is None:
+            continue
+        old, new = base_metrics[metric], head_metrics[metric]
+        change = (new - old) / old * 100 if old else 0.0
+        flag = ""
+        if change * better < -args.threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        elif change * better > args.threshold:
+            flag = "  improved"
+        print(f"{metric:<70} {old:>12.3f} {new:>12.3f} {change:>+8.1f}%{flag}")
+
+    print(f"\n{regressions} regression(s) beyond {args.threshold:g}%")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
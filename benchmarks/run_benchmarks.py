@@ -0,0 +1,466 @@
+"""
+End-to-end benchmark suite for the pipeline's hot paths.
+
+Runs each stage against a synthetic lake (benchmarks/synthetic.py) and a
+local Postgres benchmark database, then stores the results as JSON keyed
+by git commit in benchmarks/results/ for benchmarks/compare.py.
+
+    scraper   scripts/telegram_scraper.py (fake client) messages/sec
+    loader    scripts/load_raw_telegram_messages.py    rows/sec
+    detector  src.yolo_detect.process_images           images/sec
+    dbt       dbt build                                seconds per model
+    api       FastAPI endpoints over HTTP              p50/p99 latency
+
+The benchmark database is truncated, so it must not be the PG_DB used by
+the pipeline. dbt needs a profile target pointing at the same database.
+
+    python benchmarks/run_benchmarks.py --database medical_warehouse_bench \
+        --dbt-target bench --stages loader detector dbt api
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import subprocess
+import importlib.util
+import urllib.error
+import urllib.request
+from datetime import datetime, timezone
+from pathlib import Path
+from types import ModuleType
+from typing import Dict, List, Optional
+
+import pandas as pd
+import psycopg2
+from dotenv import load_dotenv
+from sqlalchemy import create_engine
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from benchmarks import bench_scraper
+from benchmarks.synthetic import CHANNELS, generate
+
+load_dotenv()
+
+# -----------------------------------------------------------------------------
+# CONFIG
+# -----------------------------------------------------------------------------
+
+RESULTS_DIR = PROJECT_ROOT / "benchmarks" / "results"
+DBT_PROJECT_DIR = PROJECT_ROOT / "medical_warehouse"
+STAGES = ["scraper", "loader", "detector", "dbt", "api"]
+
+# raw.telegram_messages is normally created by hand; the benchmark
+# database starts empty, so create it with the loader's columns.
+RAW_MESSAGES_DDL = """
+CREATE SCHEMA IF NOT EXISTS raw;
+
+CREATE TABLE IF NOT EXISTS raw.telegram_messages (
+    message_id    bigint NOT NULL,
+    channel_name  text   NOT NULL,
+    channel_title text,
+    message_date  timestamptz,
+    message_text  text,
+    has_media     boolean,
+    image_path    text,
+    views         integer,
+    forwards      integer,
+    PRIMARY KEY (message_id, channel_name)
+);
+"""
+
+# The detector writes these with pandas; when the detector stage is
+# skipped, the dbt sources still have to exist, so create them empty.
+DETECTION_SOURCES_DDL = """
+CREATE TABLE IF NOT EXISTS raw.yolo_detections (
+    message_id       bigint,
+    channel_name     text,
+    image_path       text,
+    detected_objects text,
+    image_category   text,
+    confidence_score double precision
+);
+
+CREATE TABLE IF NOT EXISTS raw.image_duplicates (
+    image_path       text,
+    message_id       bigint,
+    channel_name     text,
+    image_hash       text,
+    cluster_id       text,
+    is_canonical     boolean,
+    hamming_distance bigint,
+    cluster_size     bigint
+);
+"""
+
+API_PORT = 8765
+API_ENDPOINTS = {
+    "top_products": "/api/reports/top-products?limit=10",
+    "channel_activity": "/api/channels/{channel}/activity",
+    "channel_activity_weekly": "/api/channels/{channel}/activity?granularity=week",
+    "search_messages": "/api/search/messages?query=paracetamol&limit=20",
+    "visual_content": "/api/reports/visual-content",
+}
+
+
+# -----------------------------------------------------------------------------
+# HELPERS
+# -----------------------------------------------------------------------------
+
+def db_config(database: str) -> Dict[str, Optional[str]]:
+    return {
+        "host": os.getenv("PG_HOST"),
+        "port": os.getenv("PG_PORT"),
+        "dbname": database,
+        "user": os.getenv("PG_USER"),
+        "password": os.getenv("PG_PASSWORD"),
+    }
+
+
+def db_url(database: str) -> str:
+    return (
+        f"postgresql://{os.getenv('PG_USER')}:{os.getenv('PG_PASSWORD')}@"
+        f"{os.getenv('PG_HOST')}:{os.getenv('PG_PORT')}/{database}"
+    )
+
+
+def bench_env(database: str) -> Dict[str, str]:
+    """Environment for subprocesses, pointed at the benchmark database."""
+    env = dict(os.environ)
+    env["PG_DB"] = database
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(PROJECT_ROOT), env.get("PYTHONPATH")]))
+    return env
+
+
+def load_script(name: str) -> ModuleType:
+    """Import a module from scripts/, which is not a package."""
+    spec = importlib.util.spec_from_file_location(name, PROJECT_ROOT / "scripts" / f"{name}.py")
+    module = importlib.util.module_from_spec(spec)
+    # Registered so process pools can pickle the module's functions by name
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def git_commit() -> Dict[str, object]:
+    def git(*args: str) -> str:
+        return subprocess.run(
+            ["git", *args], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+
+    try:
+        return {"commit": git("rev-parse", "--short", "HEAD"), "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": "unknown", "dirty": True}
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+# -----------------------------------------------------------------------------
+# STAGES
+# -----------------------------------------------------------------------------
+
+def bench_loader(lake_dir: Path, database: str, workers: int = 1) -> Dict:
+    loader = load_script("load_raw_telegram_messages")
+    loader.DB_CONFIG = db_config(database)
+
+    conn = psycopg2.connect(**loader.DB_CONFIG)
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                cur.execute(RAW_MESSAGES_DDL)
+                cur.execute("TRUNCATE raw.telegram_messages")
+                # Derived from the messages; text enrichment only reads
+                # messages missing from its log, so reset that too
+                cur.execute(
+                    "DROP TABLE IF EXISTS raw.telegram_engagement_history, "
+                    "raw.product_mentions, raw.text_enrichment_log"
+                )
+    finally:
+        conn.close()
+
+    started = time.perf_counter()
+    files = loader.get_all_json_files(lake_dir / "raw" / "telegram" / "messages")
+    if workers > 1:
+        rows = sum(len(loader.load_json(file)) for file in files)
+        loader.load_partitions_parallel(files, workers)
+    else:
+        records = []
+        for file in files:
+            records.extend(loader.load_partition_records(file))
+        rows = len(records)
+        loader.load_to_postgres(records)
+    seconds = time.perf_counter() - started
+
+    return {
+        "files": len(files),
+        "workers": workers,
+        "rows": rows,
+        "seconds": round(seconds, 3),
+        "rows_per_sec": round(rows / seconds, 1),
+    }
+
+
+def bench_detector(lake_dir: Path, database: str) -> Dict:
+    # Imported lazily: loads the YOLO model
+    from src import yolo_detect
+    from src.image_cache import ImageCache
+    from src.image_hash import ImageHashIndex
+
+    image_dir = str(lake_dir / "raw" / "images")
+    result: Dict[str, Dict] = {}
+
+    # Annotated images of synthetic data must not land in the real output dir
+    output_dir = yolo_detect.OUTPUT_DIR
+    annotated_dir = tempfile.mkdtemp(prefix="bench_annotated_")
+    cache_dir = tempfile.mkdtemp(prefix="bench_image_cache_")
+    yolo_detect.OUTPUT_DIR = annotated_dir
+    try:
+        # Cold: full decode and inference for every image
+        started = time.perf_counter()
+        df = yolo_detect.process_images(image_dir)
+        seconds = time.perf_counter() - started
+        result["cold"] = {
+            "images": len(df),
+            "seconds": round(seconds, 3),
+            "images_per_sec": round(len(df) / seconds, 2) if seconds else 0.0,
+        }
+
+        # Warm: letterbox cache built, reposts served from the hash index
+        image_cache = ImageCache(cache_dir=cache_dir)
+        started = time.perf_counter()
+        image_cache.build(image_dir)
+        build_seconds = time.perf_counter() - started
+
+        hash_index = ImageHashIndex(model_name=yolo_detect.MODEL_NAME)
+        started = time.perf_counter()
+        df = yolo_detect.process_images(image_dir, hash_index=hash_index, image_cache=image_cache)
+        seconds = time.perf_counter() - started
+    finally:
+        yolo_detect.OUTPUT_DIR = output_dir
+        shutil.rmtree(annotated_dir, ignore_errors=True)
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    result["cached"] = {
+        "images": len(df),
+        "cache_build_seconds": round(build_seconds, 3),
+        "seconds": round(seconds, 3),
+        "images_per_sec": round(len(df) / seconds, 2) if seconds else 0.0,
+    }
+
+    # Not timed: the dbt and API stages read these detections
+    load_detections(database, df, hash_index)
+    return result
+
+
+def load_detections(database: str, df: pd.DataFrame, hash_index) -> None:
+    """Write detector output to the benchmark database as the detector's __main__ does."""
+    from src.yolo_detect import detection_boxes
+
+    box_loader = load_script("load_yolo_detection_boxes")
+    box_loader.DB_CONFIG = db_config(database)
+
+    engine = create_engine(db_url(database))
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DROP TABLE IF EXISTS raw.yolo_detection_boxes")
+    df.drop(columns=["boxes", "source_image_path"]).to_sql(
+        "yolo_detections", engine, schema="raw", if_exists="replace", index=False
+    )
+    pd.DataFrame(hash_index.cluster_rows()).to_sql(
+        "image_duplicates", engine, schema="raw", if_exists="replace", index=False
+    )
+
+    boxes_dir = tempfile.mkdtemp(prefix="bench_boxes_")
+    try:
+        boxes_path = Path(boxes_dir) / "boxes.parquet"
+        detection_boxes(df).to_parquet(boxes_path, index=False)
+        box_loader.load_to_postgres([boxes_path])
+    finally:
+        shutil.rmtree(boxes_dir, ignore_errors=True)
+
+
+def prepare_sources(database: str) -> None:
+    """
+    Make every dbt source exist in the benchmark database.
+
+    Product mentions come from a real text enrichment run over the loaded
+    messages. Detection tables are the detector stage's output, or empty
+    when it did not run.
+    """
+    loader = load_script("load_raw_telegram_messages")
+    box_loader = load_script("load_yolo_detection_boxes")
+
+    conn = psycopg2.connect(**db_config(database))
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                cur.execute(RAW_MESSAGES_DDL)
+                cur.execute(loader.METRICS_DDL)
+                cur.execute(DETECTION_SOURCES_DDL)
+                cur.execute(box_loader.CREATE_SQL)
+    finally:
+        conn.close()
+
+    subprocess.run(
+        [sys.executable, str(PROJECT_ROOT / "src" / "text_enrich.py")],
+        cwd=PROJECT_ROOT,
+        env=bench_env(database),
+        check=True,
+    )
+
+
+def bench_dbt(database: str, target: Optional[str]) -> Dict:
+    command = ["dbt", "build", "--project-dir", str(DBT_PROJECT_DIR), "--full-refresh"]
+    if target:
+        command += ["--target", target]
+
+    started = time.perf_counter()
+    completed = subprocess.run(command, cwd=DBT_PROJECT_DIR, env=bench_env(database))
+    seconds = time.perf_counter() - started
+
+    with open(DBT_PROJECT_DIR / "target" / "run_results.json", "r", encoding="utf-8") as f:
+        run_results = json.load(f)
+
+    nodes = {
+        r["unique_id"]: {"status": r["status"], "seconds": round(r["execution_time"], 3)}
+        for r in run_results["results"]
+    }
+    return {
+        "success": completed.returncode == 0,
+        "seconds": round(seconds, 3),
+        "models": {k: v for k, v in nodes.items() if k.startswith(("model.", "snapshot."))},
+        "tests_seconds": round(sum(v["seconds"] for k, v in nodes.items() if k.startswith("test.")), 3),
+    }
+
+
+def bench_api(database: str, channel: str, requests_per_endpoint: int) -> Dict:
+    base_url = f"http://127.0.0.1:{API_PORT}"
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api.main:app", "--port", str(API_PORT), "--log-level", "warning"],
+        cwd=PROJECT_ROOT,
+        env=bench_env(database),
+    )
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                urllib.request.urlopen(base_url + "/", timeout=1).read()
+                break
+            except OSError:
+                if time.monotonic() > deadline or server.poll() is not None:
+                    raise RuntimeError("API server did not start")
+                time.sleep(0.2)
+
+        result = {}
+        for name, path in API_ENDPOINTS.items():
+            url = base_url + path.format(channel=channel)
+            latencies = []
+            try:
+                for _ in range(5):  # warm up the pool and the database cache
+                    urllib.request.urlopen(url).read()
+
+                for _ in range(requests_per_endpoint):
+                    started = time.perf_counter()
+                    urllib.request.urlopen(url).read()
+                    latencies.append((time.perf_counter() - started) * 1000)
+            except (urllib.error.HTTPError, OSError) as exc:
+                # Recorded instead of raised, so the other endpoints still run
+                print(f"{name} failed: {exc}")
+                result[name] = {"error": str(exc)}
+                continue
+
+            result[name] = {
+                "requests": requests_per_endpoint,
+                "p50_ms": round(percentile(latencies, 50), 2),
+                "p99_ms": round(percentile(latencies, 99), 2),
+            }
+        return result
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+# -----------------------------------------------------------------------------
+# MAIN
+# -----------------------------------------------------------------------------
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the pipeline benchmark suite")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+    parser.add_argument(
+        "--database",
+        default=os.getenv("BENCH_PG_DB", "medical_warehouse_bench"),
+        help="Benchmark database; truncated by the loader stage (default: $BENCH_PG_DB)",
+    )
+    parser.add_argument("--dbt-target", default=None, help="dbt profile target for the benchmark database")
+    parser.add_argument("--lake", type=Path, default=Path("data/bench"), help="Synthetic lake directory")
+    parser.add_argument("--regenerate", action="store_true", help="Regenerate the synthetic lake")
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--messages-per-day", type=int, default=2000)
+    parser.add_argument("--images", type=int, default=200)
+    parser.add_argument("--loader-workers", type=int, default=1, help="Loader --workers")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per API endpoint")
+    parser.add_argument("--output", type=Path, default=None, help="Result file (default: results/<commit>.json)")
+    args = parser.parse_args()
+
+    if args.database == os.getenv("PG_DB"):
+        parser.error("--database must not be the pipeline database (PG_DB); the benchmark truncates it")
+
+    if args.regenerate and args.lake.exists():
+        shutil.rmtree(args.lake)
+    if not args.lake.exists():
+        summary = generate(args.lake, days=args.days, messages_per_day=args.messages_per_day, images=args.images)
+        print(f"Generated {summary['messages']} messages and {summary['images']} images under {args.lake}")
+
+    results: Dict[str, object] = {
+        **git_commit(),
+        "run_utc": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "machine": f"{platform.system()} {platform.machine()} ({os.cpu_count()} cpus)",
+        "params": {
+            "days": args.days,
+            "messages_per_day": args.messages_per_day,
+            "images": args.images,
+            "requests": args.requests,
+            "loader_workers": args.loader_workers,
+        },
+        "stages": {},
+    }
+
+    stages = results["stages"]
+    for stage in STAGES:
+        if stage not in args.stages:
+            continue
+        print(f"Running {stage} benchmark")
+        if stage == "scraper":
+            stages[stage] = bench_scraper.run()
+        elif stage == "loader":
+            stages[stage] = bench_loader(args.lake, args.database, args.loader_workers)
+        elif stage == "detector":
+            stages[stage] = bench_detector(args.lake, args.database)
+        elif stage == "dbt":
+            prepare_sources(args.database)
+            stages[stage] = bench_dbt(args.database, args.dbt_target)
+        elif stage == "api":
+            stages[stage] = bench_api(args.database, CHANNELS[0][0], args.requests)
+        print(json.dumps(stages[stage], indent=2))
+
+    output = args.output or RESULTS_DIR / f"{results['commit']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
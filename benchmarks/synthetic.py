@@ -0,0 +1,232 @@
+"""
+Synthetic data generator for the benchmark suite.
+
+Writes Telegram message partitions in the src/datalake.py layout and fake
+product photos in the scraper's image layout, so every stage of the
+pipeline can be exercised without Telegram access:
+
+    <out>/raw/telegram/messages/ingestion_date=YYYY-MM-DD/channel=<name>/messages.json
+    <out>/raw/telegram/messages/ingestion_date=YYYY-MM-DD/_manifest.json
+    <out>/raw/images/<channel>/<message_id>.jpg
+
+    python benchmarks/synthetic.py --out data/bench --channels 3 --days 7 \
+        --messages-per-day 500 --images 200
+"""
+import sys
+import random
+import argparse
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List
+
+import cv2
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.datalake import write_channel_messages_json, write_manifest
+
+# -----------------------------------------------------------------------------
+# CONFIG
+# -----------------------------------------------------------------------------
+
+CHANNELS = [
+    ("chemed123", "CheMed Telegram Channel"),
+    ("lobelia4cosmetics", "Lobelia Cosmetics"),
+    ("tikvahpharma", "Tikvah Pharma"),
+    ("ethiopianpharmacy", "Ethiopian Pharmacy"),
+    ("medicalsupplyeth", "Medical Supply Ethiopia"),
+]
+
+PRODUCTS = [
+    "Paracetamol 500mg", "Amoxicillin 250mg", "Ibuprofen 400mg", "Vitamin C 1000mg",
+    "Omeprazole 20mg", "Metformin 850mg", "Cetirizine 10mg", "Azithromycin 500mg",
+    "Nivea Body Lotion", "Sunscreen SPF 50", "Digital Thermometer", "Blood Pressure Monitor",
+]
+
+TEMPLATES = [
+    "{product} available now. ዋጋ {price} ብር",
+    "New stock: {product} - {price} birr. Call 0911 000 000",
+    "{product} ✅ Price: {price} ETB, delivery in Addis",
+    "ፓራሲታሞል and {product} በቅናሽ ዋጋ {price} ብር",
+    "Limited offer on {product}! Only {price} Birr",
+]
+
+IMAGE_SIZE = (480, 640)  # height, width of a typical Telegram photo
+
+
+# -----------------------------------------------------------------------------
+# MESSAGES
+# -----------------------------------------------------------------------------
+
+def make_messages(
+    rng: random.Random,
+    out_dir: Path,
+    channel_name: str,
+    channel_title: str,
+    day: datetime,
+    count: int,
+    first_id: int,
+    image_share: float,
+) -> List[Dict]:
+    messages = []
+    for i in range(count):
+        message_id = first_id + i
+        has_media = rng.random() < image_share
+        posted = day + timedelta(seconds=rng.randrange(86400))
+        text = rng.choice(TEMPLATES).format(
+            product=rng.choice(PRODUCTS),
+            price=rng.randrange(50, 5000, 10),
+        )
+        messages.append({
+            "message_id": message_id,
+            "channel_name": channel_name,
+            "channel_title": channel_title,
+            "message_date": posted.isoformat(),
+            "message_text": text,
+            "has_media": has_media,
+            "image_path": str(out_dir / "raw" / "images" / channel_name / f"{message_id}.jpg") if has_media else None,
+            "views": int(rng.paretovariate(1.5) * 100),
+            "forwards": rng.randrange(0, 40),
+        })
+    return messages
+
+
+# -----------------------------------------------------------------------------
+# IMAGES
+# -----------------------------------------------------------------------------
+
+def make_image(rng: np.random.Generator) -> np.ndarray:
+    """A noisy background with a few box and bottle shaped blobs."""
+    height, width = IMAGE_SIZE
+    image = rng.integers(150, 255, size=(height, width, 3), dtype=np.uint8)
+    image = cv2.GaussianBlur(image, (7, 7), 0)
+    for _ in range(rng.integers(1, 5)):
+        color = tuple(int(c) for c in rng.integers(0, 200, size=3))
+        x, y = int(rng.integers(0, width - 120)), int(rng.integers(0, height - 160))
+        if rng.random() < 0.5:
+            cv2.rectangle(image, (x, y), (x + int(rng.integers(60, 120)), y + int(rng.integers(80, 160))), color, -1)
+        else:
+            cv2.ellipse(image, (x + 40, y + 80), (30, 70), 0, 0, 360, color, -1)
+    cv2.putText(image, "PHARMA", (20, height - 30), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 0, 0), 2)
+    return image
+
+
+def write_images(
+    out_dir: Path,
+    messages: List[Dict],
+    limit: int,
+    repost_share: float,
+    seed: int,
+) -> int:
+    """
+    Write one JPEG per media message, up to `limit`.
+
+    A share of the images are reposts: an earlier image re-encoded at a
+    lower quality and slightly resized, which is what the hash index sees
+    when channels share the same product photo.
+    """
+    rng = np.random.default_rng(seed)
+    written: List[np.ndarray] = []
+    count = 0
+
+    # Spread the images over every channel and day
+    media = [m for m in messages if m["has_media"]]
+    media = random.Random(seed).sample(media, min(limit, len(media)))
+
+    for msg in media:
+        if written and rng.random() < repost_share:
+            source = written[int(rng.integers(len(written)))]
+            image = cv2.resize(source, None, fx=0.9, fy=0.9, interpolation=cv2.INTER_AREA)
+            params = [cv2.IMWRITE_JPEG_QUALITY, 70]
+        else:
+            image = make_image(rng)
+            written.append(image)
+            params = [cv2.IMWRITE_JPEG_QUALITY, 90]
+
+        path = out_dir / "raw" / "images" / msg["channel_name"] / f"{msg['message_id']}.jpg"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        cv2.imwrite(str(path), image, params)
+        count += 1
+
+    return count
+
+
+# -----------------------------------------------------------------------------
+# GENERATOR
+# -----------------------------------------------------------------------------
+
+def generate(
+    out_dir: Path,
+    channels: int = 3,
+    days: int = 7,
+    messages_per_day: int = 500,
+    images: int = 200,
+    image_share: float = 0.4,
+    repost_share: float = 0.2,
+    seed: int = 42,
+) -> Dict:
+    """Generate lake partitions and images; returns a summary of what was written."""
+    rng = random.Random(seed)
+    end = datetime(2026, 1, 31, tzinfo=timezone.utc)
+    all_messages: List[Dict] = []
+
+    for day_offset in range(days):
+        day = end - timedelta(days=days - 1 - day_offset)
+        date_str = day.strftime("%Y-%m-%d")
+        counts = {}
+        for channel_index, (channel_name, channel_title) in enumerate(CHANNELS[:channels]):
+            # Message ids are unique across channels too, like the detection
+            # outputs keyed by message_id expect
+            first_id = (channel_index * days + day_offset) * messages_per_day + 1
+            messages = make_messages(
+                rng, out_dir, channel_name, channel_title, day, messages_per_day, first_id, image_share
+            )
+            write_channel_messages_json(
+                base_path=str(out_dir),
+                date_str=date_str,
+                channel_name=channel_name,
+                messages=messages,
+            )
+            counts[channel_name] = len(messages)
+            all_messages.extend(messages)
+        write_manifest(
+            base_path=str(out_dir),
+            date_str=date_str,
+            channel_message_counts=counts,
+            extra={"synthetic": True, "seed": seed},
+        )
+
+    image_count = write_images(out_dir, all_messages, images, repost_share, seed)
+    return {
+        "out_dir": str(out_dir),
+        "channels": [name for name, _ in CHANNELS[:channels]],
+        "days": days,
+        "messages": len(all_messages),
+        "images": image_count,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic data lake for benchmarks")
+    parser.add_argument("--out", type=Path, default=Path("data/bench"), help="Output base path")
+    parser.add_argument("--channels", type=int, default=3, help=f"Number of channels (max {len(CHANNELS)})")
+    parser.add_argument("--days", type=int, default=7, help="Number of ingestion_date partitions")
+    parser.add_argument("--messages-per-day", type=int, default=500, help="Messages per channel and day")
+    parser.add_argument("--images", type=int, default=200, help="Maximum number of images")
+    parser.add_argument("--repost-share", type=float, default=0.2, help="Share of images that are reposts")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    summary = generate(
+        args.out,
+        channels=args.channels,
+        days=args.days,
+        messages_per_day=args.messages_per_day,
+        images=args.images,
+        repost_share=args.repost_share,
+        seed=args.seed,
+    )
+    print(f"Generated {summary['messages']} messages and {summary['images']} images under {summary['out_dir']}")
@@ -0,0 +1,32 @@
+{#
+    Roll agg_channel_activity_daily up to a coarser grain ('week', 'month').
+    activity_date is the first day of the period. Incremental runs
+    recompute every (channel, period) with a daily row refreshed since the
+    last run, using the daily model's source_updated_at watermark.
+#}
+{% macro channel_activity_rollup(grain) %}
+
+SELECT
+    channel_name,
+    CAST(DATE_TRUNC('{{ grain }}', activity_date) AS date) AS activity_date,
+    SUM(post_count) AS post_count,
+    SUM(total_views) AS total_views,
+    SUM(total_forwards) AS total_forwards,
+    SUM(image_posts) AS image_posts,
+    ROUND(SUM(image_posts)::numeric / SUM(post_count), 4) AS image_share,
+    MAX(source_updated_at) AS source_updated_at
+FROM {{ ref('agg_channel_activity_daily') }}
+{% if is_incremental() %}
+WHERE (channel_name, DATE_TRUNC('{{ grain }}', activity_date)) IN (
+    SELECT DISTINCT channel_name, DATE_TRUNC('{{ grain }}', activity_date)
+    FROM {{ ref('agg_channel_activity_daily') }}
+    WHERE source_updated_at > (
+        SELECT COALESCE(MAX(source_updated_at), '-infinity'::timestamptz)
+            - INTERVAL '{{ var("activity_load_overlap_minutes", 60) }} minutes'
+        FROM {{ this }}
+    )
+)
+{% endif %}
+GROUP BY 1, 2
+
+{% endmacro %}
@@ -0,0 +1,56 @@
+-- Daily channel activity rollup, refreshed incrementally.
+-- Each run re-aggregates only the (channel, day) pairs with messages
+-- loaded or re-counted since the last run, however old the day, and
+-- replaces those rows. source_updated_at is that watermark; it goes back
+-- `activity_load_overlap_minutes` so loads that were still committing
+-- during the last run are not missed.
+{{ config(
+    materialized='incremental',
+    schema='marts',
+    unique_key=['channel_name', 'activity_date'],
+    incremental_strategy='delete+insert',
+    on_schema_change='append_new_columns',
+    indexes=[
+        {'columns': ['channel_name', 'activity_date'], 'unique': True}
+    ]
+) }}
+
+WITH messages AS (
+    SELECT
+        channel_name,
+        channel_title,
+        message_date,
+        DATE(message_date) AS activity_date,
+        view_count,
+        forward_count,
+        has_image,
+        updated_at
+    FROM {{ ref('stg_telegram_messages') }}
+    {% if is_incremental() %}
+    WHERE (channel_name, DATE(message_date)) IN (
+        SELECT DISTINCT channel_name, DATE(message_date)
+        FROM {{ ref('stg_telegram_messages') }}
+        WHERE updated_at > (
+            SELECT COALESCE(MAX(source_updated_at), '-infinity'::timestamptz)
+                - INTERVAL '{{ var("activity_load_overlap_minutes", 60) }} minutes'
+            FROM {{ this }}
+        )
+    )
+    {% endif %}
+)
+
+SELECT
+    channel_name,
+    activity_date,
+    COUNT(*) AS post_count,
+    SUM(view_count) AS total_views,
+    SUM(forward_count) AS total_forwards,
+    COUNT(*) FILTER (WHERE has_image) AS image_posts,
+    ROUND(COUNT(*) FILTER (WHERE has_image)::numeric / COUNT(*), 4) AS image_share,
+    MIN(message_date) AS first_post_at,
+    MAX(message_date) AS last_post_at,
+    -- Title as of the channel's last post that day
+    (ARRAY_AGG(channel_title ORDER BY message_date DESC))[1] AS channel_title,
+    MAX(updated_at) AS source_updated_at
+FROM messages
+GROUP BY channel_name, activity_date
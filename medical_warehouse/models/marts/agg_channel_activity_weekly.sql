@@ -0,0 +1,13 @@
+-- Weekly channel activity rollup built from agg_channel_activity_daily.
+{{ config(
+    materialized='incremental',
+    schema='marts',
+    unique_key=['channel_name', 'activity_date'],
+    incremental_strategy='delete+insert',
+    on_schema_change='append_new_columns',
+    indexes=[
+        {'columns': ['channel_name', 'activity_date'], 'unique': True}
+    ]
+) }}
+
+{{ channel_activity_rollup('week') }}
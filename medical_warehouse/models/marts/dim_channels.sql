@@ -1,28 +1,73 @@
 -- Dimension_table
+-- One row per channel. Stats are summed from the daily activity rollup,
+-- and incremental runs only recompute channels with a daily row refreshed
+-- since the last run (source_updated_at watermark, like the rollups), so
+-- backfills and re-counted views of old days reach quiet channels too.
+-- Title history lives in channel_titles_snapshot.
 {{ config(
-    materialized='table',
-    schema='marts'
+    materialized='incremental',
+    schema='marts',
+    unique_key='channel_name',
+    incremental_strategy='delete+insert',
+    on_schema_change='append_new_columns',
+    indexes=[
+        {'columns': ['channel_key'], 'unique': True},
+        {'columns': ['channel_name'], 'unique': True}
+    ]
 ) }}
 
-WITH channel_stats AS (
+WITH daily AS (
+    SELECT *
+    FROM {{ ref('agg_channel_activity_daily') }}
+),
+
+{% if is_incremental() %}
+touched AS (
+    SELECT DISTINCT channel_name
+    FROM daily
+    WHERE source_updated_at > (
+        SELECT COALESCE(MAX(source_updated_at), '-infinity'::timestamptz)
+            - INTERVAL '{{ var("activity_load_overlap_minutes", 60) }} minutes'
+        FROM {{ this }}
+    )
+),
+{% endif %}
+
+channel_stats AS (
+    SELECT
+        channel_name,
+        SUM(post_count) AS total_posts,
+        ROUND(SUM(total_views)::numeric / SUM(post_count))::int AS avg_views,
+        MIN(first_post_at) AS first_post_date,
+        MAX(last_post_at) AS last_post_date,
+        MAX(source_updated_at) AS source_updated_at
+    FROM daily
+    {% if is_incremental() %}
+    WHERE channel_name IN (SELECT channel_name FROM touched)
+    {% endif %}
+    GROUP BY channel_name
+),
+
+current_titles AS (
     SELECT
         channel_name,
         channel_title,
-        COUNT(*) AS total_posts,
-        AVG(view_count)::int AS avg_views,
-        MIN(message_date) AS first_post_date,
-        MAX(message_date) AS last_post_date
-    FROM {{ ref('stg_telegram_messages') }}
-    GROUP BY channel_name, channel_title
+        dbt_valid_from AS title_valid_from
+    FROM {{ ref('channel_titles_snapshot') }}
+    WHERE dbt_valid_to IS NULL
 )
 
 SELECT
-    ROW_NUMBER() OVER () AS channel_key,
-    channel_name,
-    channel_title,
+    md5(s.channel_name) AS channel_key,
+    s.channel_name,
+    t.channel_title,
     'Medical' AS channel_type,
-    first_post_date,
-    last_post_date,
-    total_posts,
-    avg_views
-FROM channel_stats
+    s.first_post_date,
+    s.last_post_date,
+    s.total_posts,
+    s.avg_views,
+    t.title_valid_from,
+    s.source_updated_at
+FROM channel_stats AS s
+LEFT JOIN current_titles AS t
+    ON s.channel_name = t.channel_name
@@ -0,0 +1,68 @@
+{{ config(
+    materialized='table',
+    schema='marts',
+    indexes=[
+        {'columns': ['message_id', 'channel_key']},
+        {'columns': ['class_name']}
+    ]
+) }}
+
+-- One row per YOLO bounding box. Metrics such as per-class counts or
+-- confidence distributions are recomputed from here without re-inference.
+
+WITH boxes AS (
+    SELECT
+        message_id,
+        channel_name,
+        model_name,
+        box_index,
+        class_id,
+        confidence,
+        x1,
+        y1,
+        x2,
+        y2,
+        source_image_path
+    FROM {{ source('telegram', 'yolo_detection_boxes') }}
+),
+
+messages AS (
+    SELECT
+        m.message_id,
+        m.channel_key,
+        m.date_key,
+        c.channel_name
+    FROM {{ ref('fct_messages') }} AS m
+    INNER JOIN {{ ref('dim_channels') }} AS c
+        ON m.channel_key = c.channel_key
+)
+
+SELECT
+    md5(
+        concat(
+            CAST(b.message_id AS varchar),
+            b.channel_name,
+            b.model_name,
+            CAST(b.box_index AS varchar)
+        )
+    ) AS box_key,
+    m.message_id,
+    m.channel_key,
+    m.date_key,
+    b.model_name,
+    b.box_index,
+    b.class_id,
+    cls.class_name,
+    b.confidence,
+    b.x1,
+    b.y1,
+    b.x2,
+    b.y2,
+    (b.x2 - b.x1) * (b.y2 - b.y1) AS box_area,
+    b.source_image_path
+FROM boxes AS b
+INNER JOIN messages AS m
+    ON b.message_id = m.message_id
+   AND b.channel_name = m.channel_name
+LEFT JOIN {{ ref('coco_classes') }} AS cls
+    ON b.class_id = cls.class_id
@@ -0,0 +1,53 @@
+{{ config(
+    materialized='table',
+    schema='marts'
+) }}
+
+-- One row per downloaded image with its perceptual-hash duplicate cluster.
+-- cluster_id is the image_path of the first copy seen (the canonical image).
+
+WITH duplicates AS (
+    SELECT
+        CAST(message_id AS bigint) AS message_id,
+        channel_name,
+        image_path,
+        image_hash,
+        cluster_id,
+        is_canonical,
+        hamming_distance,
+        cluster_size
+    FROM {{ source('telegram', 'image_duplicates') }}
+    WHERE message_id IS NOT NULL
+),
+
+messages AS (
+    SELECT
+        m.message_id,
+        m.channel_key,
+        m.date_key,
+        c.channel_name
+    FROM {{ ref('fct_messages') }} AS m
+    INNER JOIN {{ ref('dim_channels') }} AS c
+        ON m.channel_key = c.channel_key
+)
+
+SELECT
+    md5(
+        concat(
+            CAST(d.message_id AS varchar),
+            d.channel_name
+        )
+    ) AS image_key,
+    md5(d.cluster_id) AS cluster_key,
+    m.message_id,
+    m.channel_key,
+    m.date_key,
+    d.image_hash,
+    d.is_canonical,
+    d.hamming_distance,
+    d.cluster_size,
+    d.image_path
+FROM duplicates AS d
+INNER JOIN messages AS m
+    ON d.message_id = m.message_id
+   AND d.channel_name = m.channel_name
@@ -0,0 +1,60 @@
+{{ config(
+    materialized='table',
+    schema='marts',
+    indexes=[
+        {'columns': ['product_name', 'date_key']},
+        {'columns': ['lower(product_name)']},
+        {'columns': ['category']},
+        {'columns': ['message_id', 'channel_key']}
+    ]
+) }}
+
+-- One row per drug/product mention extracted from message text by
+-- src/text_enrich.py, with the price quoted next to it when there is one.
+-- Product and price queries use the indexes here instead of scanning text.
+
+WITH mentions AS (
+    SELECT
+        message_id,
+        channel_name,
+        mention_index,
+        product_name,
+        category,
+        matched_term,
+        price,
+        currency
+    FROM {{ source('telegram', 'product_mentions') }}
+),
+
+messages AS (
+    SELECT
+        m.message_id,
+        m.channel_key,
+        m.date_key,
+        c.channel_name
+    FROM {{ ref('fct_messages') }} AS m
+    INNER JOIN {{ ref('dim_channels') }} AS c
+        ON m.channel_key = c.channel_key
+)
+
+SELECT
+    md5(
+        concat(
+            CAST(p.message_id AS varchar),
+            p.channel_name,
+            CAST(p.mention_index AS varchar)
+        )
+    ) AS mention_key,
+    m.message_id,
+    m.channel_key,
+    m.date_key,
+    p.mention_index,
+    p.product_name,
+    p.category,
+    p.matched_term,
+    p.price,
+    p.currency
+FROM mentions AS p
+INNER JOIN messages AS m
+    ON p.message_id = m.message_id
+   AND p.channel_name = m.channel_name
@@ -0,0 +1,68 @@
+-- Views and forwards gained between successive observations of a message,
+-- from raw.telegram_engagement_history (appended by the raw loader only
+-- when a message's counts changed). Refreshed incrementally: each run
+-- recomputes the observations of messages with history rows recorded
+-- since the last run, whatever their observed_on (late partitions,
+-- compacted months and backfills write old dates), and replaces those rows.
+{{ config(
+    materialized='incremental',
+    schema='marts',
+    unique_key=['message_id', 'channel_name', 'observed_on'],
+    incremental_strategy='delete+insert',
+    on_schema_change='append_new_columns',
+    indexes=[
+        {'columns': ['message_id', 'channel_name', 'observed_on'], 'unique': True},
+        {'columns': ['channel_key', 'observed_on']}
+    ]
+) }}
+
+WITH history AS (
+    SELECT
+        message_id,
+        channel_name,
+        observed_on,
+        views,
+        forwards,
+        recorded_at
+    FROM {{ source('telegram', 'telegram_engagement_history') }}
+    {% if is_incremental() %}
+    -- Whole history of touched messages, so LAG has the previous observation
+    WHERE (message_id, channel_name) IN (
+        SELECT DISTINCT message_id, channel_name
+        FROM {{ source('telegram', 'telegram_engagement_history') }}
+        WHERE recorded_at > (
+            SELECT COALESCE(MAX(recorded_at), '-infinity'::timestamptz)
+                - INTERVAL '{{ var("activity_load_overlap_minutes", 60) }} minutes'
+            FROM {{ this }}
+        )
+    )
+    {% endif %}
+),
+
+observations AS (
+    SELECT
+        *,
+        LAG(observed_on) OVER w AS prev_observed_on,
+        LAG(views) OVER w AS prev_views,
+        LAG(forwards) OVER w AS prev_forwards
+    FROM history
+    WINDOW w AS (PARTITION BY message_id, channel_name ORDER BY observed_on)
+)
+
+SELECT
+    message_id,
+    channel_name,
+    md5(channel_name) AS channel_key,
+    observed_on,
+    prev_observed_on,
+    views,
+    forwards,
+    views - COALESCE(prev_views, 0) AS views_gained,
+    forwards - COALESCE(prev_forwards, 0) AS forwards_gained,
+    observed_on - prev_observed_on AS days_elapsed,
+    ROUND(
+        (views - prev_views)::numeric / NULLIF(observed_on - prev_observed_on, 0),
+        2
+    ) AS views_per_day,
+    recorded_at
+FROM observations
@@ -20,7 +20,11 @@ cleaned AS (
         COALESCE(views, 0) AS view_count,
         COALESCE(forwards, 0) AS forward_count,
         LENGTH(COALESCE(message_text, '')) AS message_length,
-        CASE WHEN has_media = TRUE AND image_path IS NOT NULL THEN TRUE ELSE FALSE END AS has_image
+        CASE WHEN has_media = TRUE AND image_path IS NOT NULL THEN TRUE ELSE FALSE END AS has_image,
+        loaded_at,
+        metrics_updated_at,
+        -- Last time the row was inserted or its counts changed
+        GREATEST(loaded_at, metrics_updated_at) AS updated_at
     FROM raw_messages
     WHERE message_id IS NOT NULL
       AND channel_name IS NOT NULL
@@ -0,0 +1,21 @@
+{#
+    Title history per channel (SCD type 2). Reads the latest title from the
+    small daily rollup instead of scanning every raw message.
+#}
+{% snapshot channel_titles_snapshot %}
+
+{{ config(
+    target_schema='snapshots',
+    unique_key='channel_name',
+    strategy='check',
+    check_cols=['channel_title']
+) }}
+
+SELECT DISTINCT ON (channel_name)
+    channel_name,
+    channel_title
+FROM {{ ref('agg_channel_activity_daily') }}
+WHERE channel_title IS NOT NULL
+ORDER BY channel_name, last_post_at DESC
+
+{% endsnapshot %}
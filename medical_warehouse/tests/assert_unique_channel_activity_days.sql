@@ -0,0 +1,9 @@
+-- This test fails if an incremental refresh left duplicate (channel, day) rows
+
+SELECT
+    channel_name,
+    activity_date,
+    COUNT(*) AS row_count
+FROM {{ ref('agg_channel_activity_daily') }}
+GROUP BY channel_name, activity_date
+HAVING COUNT(*) > 1
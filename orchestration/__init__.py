@@ -1,12 +1,14 @@
 from dagster import Definitions, load_assets_from_modules
-from . import assets, dbt_assets
+from . import assets, dbt_assets, sensors
 
 # Load all assets from our python files
 all_assets = load_assets_from_modules([assets, dbt_assets])
 
 defs = Definitions(
     assets=all_assets,
+    jobs=[sensors.partition_load_job, sensors.image_detection_job],
+    sensors=[sensors.lake_partition_sensor, sensors.image_sensor],
     resources={
         "dbt": dbt_assets.dbt_resource,
     },
-)
\ No newline at end of file
+)
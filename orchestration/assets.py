@@ -1,18 +1,50 @@
 import subprocess
 import sys
 import os
-import json
-from dagster import asset, Output, AssetExecutionContext
+from datetime import date
+from typing import List
+from dagster import asset, Output, AssetExecutionContext, Config, MetadataValue
 from pathlib import Path
 
 # 1. Define the Root Directory
 ROOT_DIR = Path(__file__).parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from src.datalake import committed_messages_files, read_stage_metrics
 
 # ---------------------------------------------------
 # CONFIGURATION
 # ---------------------------------------------------
-# FIX: Change this to the exact name of the file your scraper produces!
-SCRAPED_FILE_PATH = ROOT_DIR / "telegram_data.json"
+# Lake the scripts write to (they run with cwd=ROOT_DIR and base path "data")
+DATA_DIR = ROOT_DIR / "data"
+MESSAGES_DIR = DATA_DIR / "raw" / "telegram" / "messages"
+
+
+class LoadConfig(Config):
+    # Partitions to load, relative to MESSAGES_DIR (e.g.
+    # "ingestion_date=2026-01-05/channel=chemed123"); empty loads every
+    # committed partition. Set by the lake partition sensor.
+    partitions: List[str] = []
+
+
+def stage_metadata(stage: str) -> dict:
+    """
+    Timing and resource metrics the stage's script recorded in today's
+    manifest (src/instrumentation.py), as asset metadata so they can be
+    compared run over run in the Dagster UI.
+    """
+    metrics = read_stage_metrics(str(DATA_DIR), date.today().isoformat(), stage)
+    if not metrics:
+        return {}
+
+    metadata = {}
+    for key, value in metrics.items():
+        if key == "stages":
+            metadata["stages"] = MetadataValue.json(value)
+        elif isinstance(value, (int, float)):
+            metadata[key] = value
+    return metadata
 
 
 # ---------------------------------------------------
@@ -46,7 +78,7 @@ def raw_telegram_data(context: AssetExecutionContext):
 
     return Output(
         value="Scraping Finished",
-        metadata={"status": "Success"}
+        metadata={"status": "Success", **stage_metadata("scrape")}
     )
 
 
@@ -54,38 +86,33 @@ def raw_telegram_data(context: AssetExecutionContext):
 # ASSET 2: LOADER (With "New Data" Check)
 # ---------------------------------------------------
 @asset(group_name="ingestion", deps=[raw_telegram_data])
-def raw_database_tables(context: AssetExecutionContext):
+def raw_database_tables(context: AssetExecutionContext, config: LoadConfig):
     """
     Runs scripts/load_raw_telegram_messages.py ONLY if there is new data.
     """
-    # 1. CHECK: Does the data file exist?
-    if not SCRAPED_FILE_PATH.exists():
-        context.log.warning(f"⚠️ Data file not found at {SCRAPED_FILE_PATH}. Skipping Load.")
-        return Output("Skipped", metadata={"status": "No File"})
-
-    # 2. CHECK: Is the data file empty?
-    try:
-        with open(SCRAPED_FILE_PATH, 'r') as f:
-            data = json.load(f)
-
-        if not data or len(data) == 0:
-            context.log.info("ℹ️ Scraper returned 0 items. Skipping Loader to prevent duplicates.")
-            return Output("Skipped", metadata={"status": "No New Data", "items": 0})
-
-        context.log.info(f"✅ Found {len(data)} items. Proceeding to Load...")
+    # 1. CHECK: Are there committed lake partitions (with a _SUCCESS marker) to load?
+    files = committed_messages_files(str(MESSAGES_DIR))
+    if config.partitions:
+        prefixes = [p.rstrip("/") + "/" for p in config.partitions]
+        files = [
+            f for f in files
+            if any(Path(f).relative_to(MESSAGES_DIR).as_posix().startswith(prefix) for prefix in prefixes)
+        ]
+    if not files:
+        context.log.info("ℹ️ No committed lake partitions to load. Skipping Loader.")
+        return Output("Skipped", metadata={"status": "No New Data", "items": 0})
 
-    except json.JSONDecodeError:
-        context.log.error("❌ Failed to parse JSON. File might be corrupted.")
-        raise
+    context.log.info(f"✅ Found {len(files)} committed partitions. Proceeding to Load...")
 
-    # 3. RUN: The Loader Script
+    # 2. RUN: The Loader Script
     script_path = ROOT_DIR / "scripts" / "load_raw_telegram_messages.py"
 
     if not script_path.exists():
         raise Exception(f"❌ Loader script not found at: {script_path}")
 
+    partition_args = [arg for p in config.partitions for arg in ("--partition", p)]
     result = subprocess.run(
-        [sys.executable, str(script_path)],
+        [sys.executable, str(script_path), *partition_args],
         capture_output=True,
         text=True,
         cwd=str(ROOT_DIR)
@@ -99,13 +126,82 @@ def raw_database_tables(context: AssetExecutionContext):
     if result.returncode != 0:
         raise Exception("Loader script failed!")
 
-    return Output("Data Loaded", metadata={"table": "raw.telegram_messages", "items_loaded": len(data)})
+    return Output(
+        "Data Loaded",
+        metadata={"table": "raw.telegram_messages", "partitions_loaded": len(files), **stage_metadata("load")},
+    )
+
+
+# ---------------------------------------------------
+# ASSET 3: TEXT ENRICHMENT
+# ---------------------------------------------------
+@asset(group_name="ingestion", deps=[raw_database_tables])
+def product_mentions_table(context: AssetExecutionContext):
+    """
+    Runs src/text_enrich.py (drug/product mentions and prices of new raw
+    messages -> raw.product_mentions)
+    """
+    script_path = ROOT_DIR / "src" / "text_enrich.py"
+
+    if not script_path.exists():
+        raise Exception(f"❌ Script not found at: {script_path}")
+
+    result = subprocess.run(
+        [sys.executable, str(script_path)],
+        capture_output=True,
+        text=True,
+        cwd=str(ROOT_DIR)
+    )
+
+    if result.stdout:
+        context.log.info(f"Text Enrichment Output: {result.stdout}")
+    if result.stderr:
+        context.log.warning(f"Text Enrichment Logs: {result.stderr}")
+
+    if result.returncode != 0:
+        raise Exception("Text enrichment script failed!")
+
+    return Output("Product Mentions Extracted", metadata={"table": "raw.product_mentions"})
 
 
 # ---------------------------------------------------
-# ASSET 3: YOLO
+# ASSET 4: IMAGE PREPROCESSING
 # ---------------------------------------------------
 @asset(group_name="ingestion", deps=[raw_telegram_data])
+def preprocessed_images(context: AssetExecutionContext):
+    """
+    Runs src/image_cache.py (decode + letterbox new images once)
+    """
+    script_path = ROOT_DIR / "src" / "image_cache.py"
+
+    if not script_path.exists():
+        raise Exception(f"❌ Script not found at: {script_path}")
+
+    result = subprocess.run(
+        [sys.executable, str(script_path)],
+        capture_output=True,
+        text=True,
+        cwd=str(ROOT_DIR)
+    )
+
+    if result.stdout:
+        context.log.info(f"Image Cache Output: {result.stdout}")
+    if result.stderr:
+        context.log.warning(f"Image Cache Logs: {result.stderr}")
+
+    if result.returncode != 0:
+        raise Exception("Image cache script failed!")
+
+    return Output(
+        "Image Cache Built",
+        metadata={"cache_dir": "data/processed/image_cache", **stage_metadata("image_cache")},
+    )
+
+
+# ---------------------------------------------------
+# ASSET 5: YOLO
+# ---------------------------------------------------
+@asset(group_name="ingestion", deps=[preprocessed_images])
 def object_detection_results(context: AssetExecutionContext):
     """
     Runs src/yolo_detect.py
@@ -130,4 +226,37 @@ def object_detection_results(context: AssetExecutionContext):
     if result.returncode != 0:
         raise Exception("YOLO script failed!")
 
-    return Output("YOLO Detections Completed", metadata={"table": "raw.yolo_detections"})
\ No newline at end of file
+    return Output(
+        "YOLO Detections Completed",
+        metadata={"table": "raw.yolo_detections", **stage_metadata("detect")},
+    )
+
+# ---------------------------------------------------
+# ASSET 6: DETECTION BOXES LOADER
+# ---------------------------------------------------
+@asset(group_name="ingestion", deps=[object_detection_results])
+def detection_boxes_table(context: AssetExecutionContext):
+    """
+    Runs scripts/load_yolo_detection_boxes.py (Parquet -> raw.yolo_detection_boxes)
+    """
+    script_path = ROOT_DIR / "scripts" / "load_yolo_detection_boxes.py"
+
+    if not script_path.exists():
+        raise Exception(f"❌ Script not found at: {script_path}")
+
+    result = subprocess.run(
+        [sys.executable, str(script_path)],
+        capture_output=True,
+        text=True,
+        cwd=str(ROOT_DIR)
+    )
+
+    if result.stdout:
+        context.log.info(f"Boxes Loader Output: {result.stdout}")
+    if result.stderr:
+        context.log.warning(f"Boxes Loader Logs: {result.stderr}")
+
+    if result.returncode != 0:
+        raise Exception("Detection boxes loader failed!")
+
+    return Output("Detection Boxes Loaded", metadata={"table": "raw.yolo_detection_boxes"})
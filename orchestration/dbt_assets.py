@@ -1,5 +1,10 @@
 import os
-from dagster import AssetExecutionContext
+import sys
+import json
+import time
+from datetime import date
+from typing import List
+from dagster import AssetExecutionContext, AssetKey, Config
 from dagster_dbt import DbtCliResource, dbt_assets
 from pathlib import Path
 
@@ -10,11 +15,129 @@ from pathlib import Path
 # / "medical_warehouse" = The actual dbt project folder
 DBT_PROJECT_DIR = Path(__file__).parent.parent / "medical_warehouse"
 
+ROOT_DIR = Path(__file__).parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from src.datalake import atomic_write_json, record_stage_metrics
+from src.instrumentation import StageTimer
+from src.text_enrich import ensure_tables as ensure_text_enrichment_tables
+
+# Manifest and timestamp of the last successful build; `state:modified+`
+# compares the current project against this manifest
+STATE_DIR = DBT_PROJECT_DIR / "state"
+LAST_BUILD_PATH = STATE_DIR / "last_build.json"
+
+# Parallel model execution (overrides the profile's threads)
+DBT_THREADS = int(os.getenv("DBT_THREADS", "4"))
+
+# dbt sources each ingestion asset writes; a new materialization of the
+# asset rebuilds and retests everything downstream of them
+UPSTREAM_SOURCES = {
+    "raw_database_tables": [
+        "source:raw.telegram_messages+",
+        "source:telegram.telegram_engagement_history+",
+    ],
+    "product_mentions_table": [
+        "source:telegram.product_mentions+",
+    ],
+    "object_detection_results": [
+        "source:telegram.yolo_detections+",
+        "source:telegram.image_duplicates+",
+    ],
+    "detection_boxes_table": [
+        "source:telegram.yolo_detection_boxes+",
+    ],
+}
+
+# Output statuses of ingestion assets that ran but wrote nothing
+SKIPPED_STATUSES = {"No File", "No New Data"}
+
+
+class DbtBuildConfig(Config):
+    threads: int = DBT_THREADS
+    # Ignore the saved state and build the whole project
+    full_build: bool = False
+
+
 # Define the dbt resource
 dbt_resource = DbtCliResource(project_dir=os.fspath(DBT_PROJECT_DIR))
 
+
+def _last_build() -> dict:
+    if not LAST_BUILD_PATH.exists() or not (STATE_DIR / "manifest.json").exists():
+        return {}
+    with open(LAST_BUILD_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def changed_source_selectors(context: AssetExecutionContext, since: float) -> List[str]:
+    """Selectors for the sources whose ingestion asset materialized new data after `since`."""
+    selectors = []
+    for asset_name, sources in UPSTREAM_SOURCES.items():
+        event = context.instance.get_latest_materialization_event(AssetKey(asset_name))
+        if event is None or event.timestamp <= since:
+            continue
+        status = event.asset_materialization.metadata.get("status")
+        if status is not None and status.value in SKIPPED_STATUSES:
+            continue
+        selectors.extend(sources)
+    return selectors
+
+
+def build_args(context: AssetExecutionContext, config: DbtBuildConfig, last_build: dict) -> List[str]:
+    """
+    dbt build arguments for this run.
+
+    Subsetted runs (e.g. launched for a few models) keep Dagster's own
+    selection. Otherwise only models and tests downstream of freshly
+    loaded sources, plus anything changed since the last build's manifest
+    (`state:modified+`), are built. Without saved state the whole
+    project is built.
+    """
+    args = ["build", "--threads", str(config.threads)]
+    if config.full_build or context.is_subset or not last_build:
+        return args
+
+    selectors = changed_source_selectors(context, last_build["built_at"])
+    selectors.append("state:modified+")
+    return args + ["--select", *selectors, "--state", os.fspath(STATE_DIR)]
+
+
 # Create assets automatically from your dbt project
 # Note: We look for manifest.json inside that specific folder's target directory
 @dbt_assets(manifest=DBT_PROJECT_DIR / "target" / "manifest.json")
-def medical_dbt_assets(context: AssetExecutionContext, dbt: DbtCliResource):
-    yield from dbt.cli(["build"], context=context).stream()
\ No newline at end of file
+def medical_dbt_assets(context: AssetExecutionContext, dbt: DbtCliResource, config: DbtBuildConfig):
+    # raw.product_mentions is a dbt source; on a fresh database it exists
+    # only once text enrichment has run, so create it up front
+    ensure_text_enrichment_tables()
+
+    last_build = _last_build()
+    args = build_args(context, config, last_build)
+    context.log.info(f"dbt {' '.join(args)}")
+
+    # Sources loaded while this build runs are picked up by the next one
+    started = time.time()
+
+    # Per-model timings come with each dbt event; the run's wall/CPU time,
+    # peak RSS and node count go to today's manifest with the other stages
+    timer = StageTimer("dbt")
+    with timer:
+        invocation = dbt.cli(args, context=context)
+        yield from invocation.stream()
+    # Models, tests, seeds and snapshots dbt actually ran in this build
+    timer.add(nodes=len(invocation.get_artifact("run_results.json")["results"]))
+
+    # Only a successful, unsubsetted build moves the state forward; otherwise
+    # the next run selects against the previous state again
+    if invocation.is_successful() and not context.is_subset:
+        atomic_write_json(os.fspath(STATE_DIR / "manifest.json"), invocation.get_artifact("manifest.json"), indent=None)
+        atomic_write_json(os.fspath(LAST_BUILD_PATH), {"built_at": started, "args": args})
+
+    record_stage_metrics(
+        base_path=str(ROOT_DIR / "data"),
+        date_str=date.today().isoformat(),
+        stage="dbt",
+        metrics={"threads": config.threads, **timer.to_dict()},
+    )
+    context.log.info(timer.summary())
@@ -0,0 +1,176 @@
+import os
+import json
+import hashlib
+from typing import Dict
+
+from dagster import (
+    AssetSelection,
+    DagsterRunStatus,
+    RunRequest,
+    RunsFilter,
+    SensorEvaluationContext,
+    SkipReason,
+    define_asset_job,
+    sensor,
+)
+from dagster_dbt import build_dbt_asset_selection
+
+from . import assets
+from .dbt_assets import UPSTREAM_SOURCES, medical_dbt_assets
+
+# ---------------------------------------------------
+# CONFIGURATION
+# ---------------------------------------------------
+MESSAGES_DIR = assets.MESSAGES_DIR
+IMAGES_DIR = assets.DATA_DIR / "raw" / "images"
+
+# How often the lake is polled; new data waits at most this long plus a run
+SENSOR_INTERVAL_SECONDS = 60
+
+# A job with a run in one of these states is not started again; whatever
+# arrives meanwhile is coalesced into its next run
+ACTIVE_STATUSES = [
+    DagsterRunStatus.QUEUED,
+    DagsterRunStatus.NOT_STARTED,
+    DagsterRunStatus.STARTING,
+    DagsterRunStatus.STARTED,
+]
+
+
+def _dbt_downstream_of(*asset_names: str) -> AssetSelection:
+    selectors = [selector for name in asset_names for selector in UPSTREAM_SOURCES[name]]
+    return build_dbt_asset_selection([medical_dbt_assets], dbt_select=" ".join(selectors))
+
+
+# ---------------------------------------------------
+# JOBS
+# ---------------------------------------------------
+# Load the given lake partitions and extract their product mentions, then
+# refresh only the dbt models that read either (the dbt asset runs
+# Dagster's subset selection)
+partition_load_job = define_asset_job(
+    "partition_load_job",
+    selection=(
+        AssetSelection.assets(assets.raw_database_tables, assets.product_mentions_table)
+        | _dbt_downstream_of("raw_database_tables", "product_mentions_table")
+    ),
+)
+
+# Cache and detect new images (both skip images they have already seen),
+# then refresh the detection models
+image_detection_job = define_asset_job(
+    "image_detection_job",
+    selection=(
+        AssetSelection.assets(
+            assets.preprocessed_images,
+            assets.object_detection_results,
+            assets.detection_boxes_table,
+        )
+        | _dbt_downstream_of("object_detection_results", "detection_boxes_table")
+    ),
+)
+
+
+# Both jobs rebuild the detection marts (they read fct_messages and the
+# detection sources), and two dbt runs swapping the same relations at once
+# fail, so each sensor waits for either job. Both sensors can still fire
+# in the same tick; the shared tag lets the run queue's
+# tag_concurrency_limits serialise those runs too.
+DBT_REFRESH_JOBS = [partition_load_job.name, image_detection_job.name]
+DBT_REFRESH_TAG = {"warehouse/dbt_refresh": "true"}
+
+
+def _has_active_run(context: SensorEvaluationContext) -> bool:
+    for job_name in DBT_REFRESH_JOBS:
+        records = context.instance.get_run_records(
+            RunsFilter(job_name=job_name, statuses=ACTIVE_STATUSES),
+            limit=1,
+        )
+        if records:
+            return True
+    return False
+
+
+# ---------------------------------------------------
+# SENSOR 1: COMMITTED LAKE PARTITIONS
+# ---------------------------------------------------
+def committed_partitions() -> Dict[str, float]:
+    """
+    Daily channel partitions with their commit time.
+
+    The scraper writes a partition's _SUCCESS marker as soon as that
+    channel is done (the date's _manifest.json only after the whole run),
+    so watching markers lets each channel load without waiting for the
+    rest. A re-committed partition gets a new marker time and is reloaded.
+    """
+    partitions = {}
+    for marker in MESSAGES_DIR.glob("ingestion_date=*/channel=*/_SUCCESS"):
+        partition = marker.parent.relative_to(MESSAGES_DIR).as_posix()
+        partitions[partition] = marker.stat().st_mtime
+    return partitions
+
+
+@sensor(job=partition_load_job, minimum_interval_seconds=SENSOR_INTERVAL_SECONDS)
+def lake_partition_sensor(context: SensorEvaluationContext):
+    """Load newly committed lake partitions as soon as they land."""
+    seen: Dict[str, float] = json.loads(context.cursor) if context.cursor else {}
+    current = committed_partitions()
+    new = sorted(p for p, committed_at in current.items() if seen.get(p) != committed_at)
+
+    if not new:
+        return SkipReason("No newly committed lake partitions")
+    if _has_active_run(context):
+        # Cursor is not advanced, so these join the next run
+        return SkipReason(f"{len(new)} new partitions wait for the running refresh")
+
+    # Partitions that were compacted away drop out of the cursor here
+    context.update_cursor(json.dumps(current))
+    run_key = hashlib.md5(json.dumps({p: current[p] for p in new}).encode("utf-8")).hexdigest()
+    return RunRequest(
+        run_key=f"partitions:{run_key}",
+        run_config={"ops": {"raw_database_tables": {"config": {"partitions": new}}}},
+        tags={"lake_partitions": str(len(new)), **DBT_REFRESH_TAG},
+    )
+
+
+# ---------------------------------------------------
+# SENSOR 2: NEW IMAGES
+# ---------------------------------------------------
+def channel_images() -> Dict[str, int]:
+    """
+    Every channel image with its inode number.
+
+    Channel images are hard links into the media store, and linking a
+    repost updates the ctime shared by every link to that blob, so inode
+    times cannot tell which paths are new. The sensor instead remembers
+    the (path, inode) pairs it has seen; a path re-linked to another blob
+    gets a new inode and counts as new.
+    """
+    images: Dict[str, int] = {}
+    if not IMAGES_DIR.exists():
+        return images
+    for channel_dir in os.scandir(IMAGES_DIR):
+        if not channel_dir.is_dir():
+            continue
+        for entry in os.scandir(channel_dir.path):
+            if entry.name.endswith(".jpg"):
+                images[f"{channel_dir.name}/{entry.name}"] = entry.inode()
+    return images
+
+
+@sensor(job=image_detection_job, minimum_interval_seconds=SENSOR_INTERVAL_SECONDS)
+def image_sensor(context: SensorEvaluationContext):
+    """Run detection for newly downloaded images without waiting for the full pipeline."""
+    seen: Dict[str, int] = json.loads(context.cursor) if context.cursor else {}
+    current = channel_images()
+    new = sorted(path for path, inode in current.items() if seen.get(path) != inode)
+
+    if not new:
+        return SkipReason("No new images")
+    if _has_active_run(context):
+        return SkipReason(f"{len(new)} new images wait for the running refresh")
+
+    # Deleted images drop out of the cursor here
+    context.update_cursor(json.dumps(current))
+    run_key = hashlib.md5(json.dumps({path: current[path] for path in new}).encode("utf-8")).hexdigest()
+    return RunRequest(run_key=f"images:{run_key}", tags={"new_images": str(len(new)), **DBT_REFRESH_TAG})
@@ -0,0 +1,57 @@
+import sys
+import argparse
+from pathlib import Path
+
+# Allow running this file directly: `python scripts/compact_datalake.py`
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.datalake import apply_retention, closed_months, compact_month
+
+# -----------------------------------------------------------------------------
+# MAIN
+# -----------------------------------------------------------------------------
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Compact daily Telegram message partitions into monthly files and apply retention"
+    )
+    parser.add_argument("--path", default="data", help="Base data directory (default: data)")
+    parser.add_argument(
+        "--month",
+        action="append",
+        help="Month to compact (YYYY-MM); repeatable. Default: every closed month",
+    )
+    parser.add_argument(
+        "--keep-daily",
+        action="store_true",
+        help="Keep the daily partitions after compacting them",
+    )
+    parser.add_argument(
+        "--retention-months",
+        type=int,
+        default=None,
+        help="Delete lake partitions older than this many months (default: keep everything)",
+    )
+    args = parser.parse_args()
+
+    months = args.month or closed_months(args.path)
+    if not months:
+        print("No closed months to compact.")
+
+    for month in months:
+        summary = compact_month(args.path, month, delete_daily=not args.keep_daily)
+        for channel, counts in summary.items():
+            print(
+                f"{month} {channel}: {counts['partitions']} daily partitions, "
+                f"{counts['read']} messages read -> {counts['written']} unique"
+            )
+
+    if args.retention_months is not None:
+        deleted = apply_retention(args.path, args.retention_months)
+        print(f"Retention ({args.retention_months} months): deleted {len(deleted)} partitions")
+
+
+if __name__ == "__main__":
+    main()
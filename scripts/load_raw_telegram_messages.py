@@ -1,11 +1,28 @@
+import io
 import os
+import sys
+import csv
 import json
+import time
+import calendar
+import argparse
+from datetime import date
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 from dotenv import load_dotenv
 import psycopg2
+from psycopg2 import errors
 from psycopg2.extras import execute_batch
 
+# Allow running this file directly: `python scripts/load_raw_telegram_messages.py`
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.datalake import committed_messages_files, is_partition_committed, record_stage_metrics
+from src.instrumentation import StageTimer
+
 load_dotenv()
 
 # -----------------------------------------------------------------------------
@@ -48,13 +65,193 @@ VALUES (
 ON CONFLICT (message_id, channel_name) DO NOTHING;
 """
 
+COLUMNS = [
+    "message_id",
+    "channel_name",
+    "channel_title",
+    "message_date",
+    "message_text",
+    "has_media",
+    "image_path",
+    "views",
+    "forwards",
+]
+
+STAGE_SQL = """
+CREATE TEMP TABLE telegram_messages_stage
+    (LIKE raw.telegram_messages INCLUDING DEFAULTS)
+    ON COMMIT DROP;
+"""
+
+# Keys are inserted in a fixed order so concurrent workers loading
+# overlapping partitions of a channel queue up instead of deadlocking.
+MERGE_SQL = f"""
+INSERT INTO raw.telegram_messages ({', '.join(COLUMNS)})
+SELECT {', '.join(COLUMNS)}
+FROM telegram_messages_stage
+ORDER BY channel_name, message_id
+ON CONFLICT (message_id, channel_name) DO NOTHING;
+"""
+
+# Retries of a partition transaction that lost a deadlock anyway
+MAX_DEADLOCK_RETRIES = 3
+
+# -----------------------------------------------------------------------------
+# ENGAGEMENT METRICS
+# -----------------------------------------------------------------------------
+
+# Inserts never touch existing rows, so views/forwards of re-scraped
+# messages are refreshed separately: only rows whose counts changed are
+# updated, and each change is appended to a compact history table.
+# metrics_observed_on is the date of the counts a row holds, so a stale
+# partition can never overwrite newer counts. loaded_at and
+# metrics_updated_at tell the incremental dbt models which days changed,
+# and recorded_at which history rows were written since their last run
+# (a late or backfilled partition writes rows for old observed_on dates).
+METRICS_DDL = """
+ALTER TABLE raw.telegram_messages
+    ADD COLUMN IF NOT EXISTS loaded_at timestamptz DEFAULT now(),
+    ADD COLUMN IF NOT EXISTS metrics_updated_at timestamptz,
+    ADD COLUMN IF NOT EXISTS metrics_observed_on date;
+
+CREATE TABLE IF NOT EXISTS raw.telegram_engagement_history (
+    message_id   bigint  NOT NULL,
+    channel_name text    NOT NULL,
+    observed_on  date    NOT NULL,
+    views        integer NOT NULL,
+    forwards     integer NOT NULL,
+    recorded_at  timestamptz NOT NULL DEFAULT now(),
+    PRIMARY KEY (message_id, channel_name, observed_on)
+);
+
+ALTER TABLE raw.telegram_engagement_history
+    ADD COLUMN IF NOT EXISTS recorded_at timestamptz NOT NULL DEFAULT now();
+"""
+
+METRICS_STAGE_SQL = """
+CREATE TEMP TABLE engagement_stage (
+    message_id   bigint,
+    channel_name text,
+    observed_on  date,
+    views        integer,
+    forwards     integer
+) ON COMMIT DROP;
+"""
+
+METRICS_COLUMNS = ["message_id", "channel_name", "observed_on", "views", "forwards"]
+
+# Newest observation per message, ignoring ones older than the history
+# already holds (e.g. an old partition reloaded after a newer one)
+METRICS_LATEST_SQL = """
+CREATE TEMP TABLE engagement_latest ON COMMIT DROP AS
+SELECT DISTINCT ON (s.message_id, s.channel_name) s.*
+FROM engagement_stage s
+WHERE NOT EXISTS (
+    SELECT 1
+    FROM raw.telegram_engagement_history h
+    WHERE h.message_id = s.message_id
+      AND h.channel_name = s.channel_name
+      AND h.observed_on > s.observed_on
+)
+ORDER BY s.message_id, s.channel_name, s.observed_on DESC;
+"""
+
+# Rows are written when the counts changed or the observation is newer
+# than the one they hold. The metrics_observed_on guard is re-checked on
+# the locked row, so a parallel load of an older partition that waited
+# for a newer one's commit leaves the newer counts alone.
+METRICS_UPDATE_SQL = """
+WITH candidates AS (
+    SELECT
+        l.*,
+        (m.views, m.forwards) IS DISTINCT FROM (l.views, l.forwards) AS counts_changed
+    FROM engagement_latest l
+    INNER JOIN raw.telegram_messages m
+        ON m.message_id = l.message_id
+       AND m.channel_name = l.channel_name
+),
+updated AS (
+    UPDATE raw.telegram_messages t
+    SET views = c.views,
+        forwards = c.forwards,
+        metrics_observed_on = c.observed_on,
+        metrics_updated_at = CASE WHEN c.counts_changed THEN now() ELSE t.metrics_updated_at END
+    FROM candidates c
+    WHERE t.message_id = c.message_id
+      AND t.channel_name = c.channel_name
+      AND (t.metrics_observed_on IS NULL OR t.metrics_observed_on <= c.observed_on)
+      AND (c.counts_changed OR t.metrics_observed_on IS DISTINCT FROM c.observed_on)
+    RETURNING c.message_id, c.channel_name, c.observed_on, c.views, c.forwards, c.counts_changed
+)
+INSERT INTO raw.telegram_engagement_history (message_id, channel_name, observed_on, views, forwards)
+SELECT message_id, channel_name, observed_on, views, forwards
+FROM updated
+WHERE counts_changed
+ON CONFLICT (message_id, channel_name, observed_on) DO UPDATE
+SET views = EXCLUDED.views,
+    forwards = EXCLUDED.forwards,
+    recorded_at = now();
+"""
+
+# First observation of newly loaded messages, the baseline for velocity
+METRICS_BASELINE_SQL = """
+INSERT INTO raw.telegram_engagement_history (message_id, channel_name, observed_on, views, forwards)
+SELECT l.message_id, l.channel_name, l.observed_on, l.views, l.forwards
+FROM engagement_latest l
+WHERE NOT EXISTS (
+    SELECT 1
+    FROM raw.telegram_engagement_history h
+    WHERE h.message_id = l.message_id
+      AND h.channel_name = l.channel_name
+);
+"""
+
 # -----------------------------------------------------------------------------
 # HELPERS
 # -----------------------------------------------------------------------------
 
 def get_all_json_files(base_path: Path) -> List[Path]:
-    """Recursively find all JSON files under channel folders."""
-    return list(base_path.glob("**/channel=*/**/*.json"))
+    """
+    Find the messages file of every committed partition.
+
+    Partitions still being written (no _SUCCESS marker) are skipped and
+    picked up by the next run.
+    """
+    files = [Path(f) for f in committed_messages_files(str(base_path))]
+    pending = len(list(base_path.glob("ingestion_date=*/channel=*"))) - len(files)
+    if pending:
+        print(f"Skipping {pending} uncommitted partitions")
+    return files
+
+
+def get_partition_files(base_path: Path, partitions: List[str]) -> List[Path]:
+    """
+    Messages files of the given partitions only.
+
+    Each partition is a directory relative to base_path (or absolute): a
+    channel partition such as ingestion_date=2026-01-05/channel=chemed123,
+    or a date/month directory for all of its channels. Uncommitted ones
+    are skipped like in a full load.
+    """
+    files: List[Path] = []
+    for partition in partitions:
+        partition_dir = Path(partition)
+        if not partition_dir.is_absolute():
+            partition_dir = base_path / partition_dir
+        channel_dirs = (
+            [partition_dir] if partition_dir.name.startswith("channel=")
+            else sorted(partition_dir.glob("channel=*"))
+        )
+        for channel_dir in channel_dirs:
+            file = channel_dir / "messages.json"
+            if not file.exists():
+                continue
+            if not is_partition_committed(str(channel_dir)):
+                print(f"Skipping uncommitted partition {channel_dir}")
+                continue
+            if file not in files:
+                files.append(file)
+    return files
 
 
 def load_json(file_path: Path) -> List[Dict]:
@@ -86,6 +283,26 @@ def flatten_messages(messages: List[Dict]) -> List[Dict]:
     return records
 
 
+def partition_observed_on(file: Path) -> str:
+    """
+    Date the counts in a partition file were observed: the ingestion date,
+    or the last day of the month for a compacted month=YYYY-MM partition.
+    """
+    key, value = file.parent.parent.name.split("=", 1)
+    if key == "month":
+        year, month = map(int, value.split("-"))
+        return f"{value}-{calendar.monthrange(year, month)[1]:02d}"
+    return value
+
+
+def load_partition_records(file: Path) -> List[Dict]:
+    records = flatten_messages(load_json(file))
+    observed_on = partition_observed_on(file)
+    for r in records:
+        r["observed_on"] = observed_on
+    return records
+
+
 def filter_existing_records(records: List[Dict], conn) -> List[Dict]:
     """Remove messages that already exist in the database."""
     if not records:
@@ -117,39 +334,214 @@ def filter_existing_records(records: List[Dict], conn) -> List[Dict]:
 # MAIN LOAD
 # -----------------------------------------------------------------------------
 
-def load_to_postgres(records: List[Dict]) -> None:
+def refresh_metrics(cur, records: List[Dict]) -> int:
+    """
+    Stage re-scraped views/forwards and update only rows whose counts changed.
+
+    Records without counts are skipped rather than read as 0. Runs inside
+    the caller's transaction; returns the number of rows whose counts changed.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    today = date.today().isoformat()
+    for r in records:
+        if r.get("views") is None or r.get("forwards") is None:
+            continue
+        writer.writerow([
+            r["message_id"],
+            r["channel_name"],
+            r.get("observed_on") or today,
+            r["views"],
+            r["forwards"],
+        ])
+    buffer.seek(0)
+
+    cur.execute(METRICS_STAGE_SQL)
+    cur.copy_expert(
+        f"COPY engagement_stage ({', '.join(METRICS_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+        buffer,
+    )
+    cur.execute(METRICS_LATEST_SQL)
+    cur.execute(METRICS_UPDATE_SQL)
+    updated = cur.rowcount
+    cur.execute(METRICS_BASELINE_SQL)
+    return updated
+
+
+def load_to_postgres(records: List[Dict]) -> Dict[str, int]:
+    """Insert new records and refresh metrics; returns rows/inserted/updated counts."""
     if not records:
         print("No new records to load.")
-        return
+        return {"rows": 0, "inserted": 0, "updated": 0}
 
     conn = psycopg2.connect(**DB_CONFIG)
     try:
+        with conn:
+            with conn.cursor() as cur:
+                cur.execute(METRICS_DDL)
+
         new_records = filter_existing_records(records, conn)
         if not new_records:
             print("All messages already loaded, skipping insert.")
-            return
+        else:
+            with conn:
+                with conn.cursor() as cur:
+                    execute_batch(cur, INSERT_SQL, new_records, page_size=500)
+            print(f"Loaded {len(new_records)} new records into raw.telegram_messages")
 
         with conn:
             with conn.cursor() as cur:
-                execute_batch(cur, INSERT_SQL, new_records, page_size=500)
-        print(f"Loaded {len(new_records)} new records into raw.telegram_messages")
+                updated = refresh_metrics(cur, records)
+        print(f"Refreshed views/forwards of {updated} messages")
     finally:
         conn.close()
+    return {"rows": len(records), "inserted": len(new_records), "updated": updated}
 
 
-def main() -> None:
-    all_files = get_all_json_files(DATA_LAKE_BASE)
-    print(f"Found {len(all_files)} JSON files")
+# -----------------------------------------------------------------------------
+# PARALLEL LOAD
+# -----------------------------------------------------------------------------
+
+# One connection per worker process, opened by the pool initializer
+_worker_conn = None
+
+
+def _init_worker(db_config: Dict) -> None:
+    global _worker_conn
+    _worker_conn = psycopg2.connect(**db_config)
+
+
+def copy_records(cur, records: List[Dict]) -> None:
+    """Stream records into the staging table with COPY."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, quoting=csv.QUOTE_ALL)
+    for r in records:
+        writer.writerow(["" if r[c] is None else r[c] for c in COLUMNS])
+    buffer.seek(0)
+    # Quoting everything keeps empty message texts as ''; every other
+    # column turns empty values (None) back into NULL
+    nullable = [c for c in COLUMNS if c != "message_text"]
+    cur.copy_expert(
+        f"COPY telegram_messages_stage ({', '.join(COLUMNS)}) FROM STDIN "
+        f"WITH (FORMAT csv, FORCE_NULL ({', '.join(nullable)}))",
+        buffer,
+    )
+
 
-    all_records: List[Dict] = []
+def load_partition(file: Path) -> Tuple[str, int, int, int]:
+    """Parse one partition file and merge it; returns (file, rows, inserted, updated)."""
+    records = load_partition_records(file)
+    if not records:
+        return str(file), 0, 0, 0
+
+    for attempt in range(MAX_DEADLOCK_RETRIES + 1):
+        try:
+            with _worker_conn:
+                with _worker_conn.cursor() as cur:
+                    cur.execute(STAGE_SQL)
+                    copy_records(cur, records)
+                    cur.execute(MERGE_SQL)
+                    inserted = cur.rowcount
+                    updated = refresh_metrics(cur, records)
+                    return str(file), len(records), inserted, updated
+        except errors.DeadlockDetected:
+            if attempt == MAX_DEADLOCK_RETRIES:
+                raise
+            time.sleep(0.1 * (attempt + 1))
+
+
+def load_partitions_parallel(files: List[Path], workers: int) -> Dict[str, int]:
+    """
+    Fan partition files out to a process pool.
+
+    Each worker parses its own JSON and COPYs over its own connection;
+    ON CONFLICT on (message_id, channel_name) keeps re-runs and the
+    overlapping daily partitions idempotent, and the same transaction
+    refreshes views/forwards of messages that were already loaded.
+    """
+    if not files:
+        print("No new records to load.")
+        return {"rows": 0, "inserted": 0, "updated": 0}
+
+    conn = psycopg2.connect(**DB_CONFIG)
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                cur.execute(METRICS_DDL)
+    finally:
+        conn.close()
+
+    started = time.perf_counter()
+    rows = inserted = updated = 0
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(DB_CONFIG,),
+    ) as pool:
+        futures = [pool.submit(load_partition, file) for file in files]
+        for future in as_completed(futures):
+            file, file_rows, file_inserted, file_updated = future.result()
+            rows += file_rows
+            inserted += file_inserted
+            updated += file_updated
+
+    elapsed = time.perf_counter() - started
+    print(
+        f"Loaded {inserted} new records ({rows} read) into raw.telegram_messages "
+        f"from {len(files)} partitions with {workers} workers in {elapsed:.1f}s "
+        f"({rows / elapsed:.0f} rows/sec); refreshed views/forwards of {updated} messages"
+    )
+    return {"rows": rows, "inserted": inserted, "updated": updated}
+
+
+def main(workers: int = 1, partitions: Optional[List[str]] = None) -> None:
+    if partitions:
+        all_files = get_partition_files(DATA_LAKE_BASE, partitions)
+    else:
+        all_files = get_all_json_files(DATA_LAKE_BASE)
+    print(f"Found {len(all_files)} JSON files")
 
-    for file in all_files:
-        messages = load_json(file)
-        records = flatten_messages(messages)
-        all_records.extend(records)
+    timer = StageTimer("load")
+    with timer:
+        timer.add(files=len(all_files), bytes=sum(f.stat().st_size for f in all_files))
+        if workers > 1:
+            counts = load_partitions_parallel(all_files, workers)
+        else:
+            all_records: List[Dict] = []
+            with timer.stage("read"):
+                for file in all_files:
+                    all_records.extend(load_partition_records(file))
+            with timer.stage("write"):
+                counts = load_to_postgres(all_records)
+        timer.add(**counts)
 
-    load_to_postgres(all_records)
+    # data/raw/telegram/messages -> data
+    record_stage_metrics(
+        base_path=str(DATA_LAKE_BASE.parents[2]),
+        date_str=date.today().isoformat(),
+        stage="load",
+        metrics={"workers": workers, "partitions": partitions or "all", **timer.to_dict()},
+    )
+    print(timer.summary())
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Load raw Telegram messages from the lake into Postgres")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Load partitions in parallel with this many processes (default: 1, single connection)",
+    )
+    parser.add_argument(
+        "--partition",
+        action="append",
+        dest="partitions",
+        help=(
+            "Load only this partition, relative to the messages root, e.g. "
+            "ingestion_date=2026-01-05/channel=chemed123 or ingestion_date=2026-01-05 "
+            "(repeatable; default: every committed partition)"
+        ),
+    )
+    args = parser.parse_args()
+    main(args.workers, args.partitions)
@@ -0,0 +1,147 @@
+import io
+import os
+import argparse
+from pathlib import Path
+from typing import List
+from dotenv import load_dotenv
+import pandas as pd
+import psycopg2
+
+load_dotenv()
+
+# -----------------------------------------------------------------------------
+# CONFIG
+# -----------------------------------------------------------------------------
+
+DETECTIONS_BASE = Path("data/raw/yolo/detections")
+
+DB_CONFIG = {
+    "host": os.getenv("PG_HOST"),
+    "port": os.getenv("PG_PORT"),
+    "dbname": os.getenv("PG_DB"),
+    "user": os.getenv("PG_USER"),
+    "password": os.getenv("PG_PASSWORD"),
+}
+
+COLUMNS = [
+    "message_id",
+    "channel_name",
+    "model_name",
+    "box_index",
+    "class_id",
+    "confidence",
+    "x1",
+    "y1",
+    "x2",
+    "y2",
+    "source_image_path",
+]
+
+CREATE_SQL = """
+CREATE SCHEMA IF NOT EXISTS raw;
+
+CREATE TABLE IF NOT EXISTS raw.yolo_detection_boxes (
+    message_id        bigint   NOT NULL,
+    channel_name      text     NOT NULL,
+    model_name        text     NOT NULL,
+    box_index         smallint NOT NULL,
+    class_id          smallint NOT NULL,
+    confidence        real     NOT NULL,
+    x1                real     NOT NULL,
+    y1                real     NOT NULL,
+    x2                real     NOT NULL,
+    y2                real     NOT NULL,
+    source_image_path text,
+    PRIMARY KEY (message_id, channel_name, model_name, box_index)
+);
+"""
+
+STAGE_SQL = """
+CREATE TEMP TABLE yolo_detection_boxes_stage
+    (LIKE raw.yolo_detection_boxes INCLUDING DEFAULTS)
+    ON COMMIT DROP;
+"""
+
+# A re-run replaces every box of the images it covers, so an image whose
+# box count shrank does not keep stale trailing boxes.
+REPLACE_SQL = """
+DELETE FROM raw.yolo_detection_boxes b
+USING (
+    SELECT DISTINCT message_id, channel_name, model_name
+    FROM yolo_detection_boxes_stage
+) s
+WHERE b.message_id = s.message_id
+  AND b.channel_name = s.channel_name
+  AND b.model_name = s.model_name;
+
+INSERT INTO raw.yolo_detection_boxes
+SELECT * FROM yolo_detection_boxes_stage;
+"""
+
+# -----------------------------------------------------------------------------
+# HELPERS
+# -----------------------------------------------------------------------------
+
+def get_parquet_files(base_path: Path, load_all: bool) -> List[Path]:
+    """Box files of the latest detection_date partition, or of all of them."""
+    partitions = sorted(base_path.glob("detection_date=*"))
+    if not load_all:
+        partitions = partitions[-1:]
+    return [f for p in partitions for f in sorted(p.glob("*.parquet"))]
+
+
+def copy_boxes(cur, boxes: pd.DataFrame) -> None:
+    """Stream a DataFrame into the staging table with COPY."""
+    buffer = io.StringIO()
+    boxes[COLUMNS].to_csv(buffer, index=False, header=False)
+    buffer.seek(0)
+    cur.copy_expert(
+        f"COPY yolo_detection_boxes_stage ({', '.join(COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+        buffer,
+    )
+
+
+# -----------------------------------------------------------------------------
+# MAIN LOAD
+# -----------------------------------------------------------------------------
+
+def load_to_postgres(files: List[Path]) -> None:
+    if not files:
+        print("No detection box files to load.")
+        return
+
+    conn = psycopg2.connect(**DB_CONFIG)
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                cur.execute(CREATE_SQL)
+
+        # Oldest partition first, so the newest run of an image wins
+        for file in files:
+            boxes = pd.read_parquet(file)
+            with conn:
+                with conn.cursor() as cur:
+                    cur.execute(STAGE_SQL)
+                    copy_boxes(cur, boxes)
+                    cur.execute(REPLACE_SQL)
+            print(f"Loaded {len(boxes)} boxes from {file} into raw.yolo_detection_boxes")
+    finally:
+        conn.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load YOLO detection boxes from the lake into Postgres")
+    parser.add_argument(
+        "--all",
+        action="store_true",
+        help="Load every detection_date partition instead of only the latest",
+    )
+    args = parser.parse_args()
+
+    files = get_parquet_files(DETECTIONS_BASE, args.all)
+    print(f"Found {len(files)} Parquet files")
+    load_to_postgres(files)
+
+
+if __name__ == "__main__":
+    main()
@@ -19,7 +19,11 @@ PROJECT_ROOT = Path(__file__).resolve().parents[1]
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
 
-from src.datalake import write_channel_messages_json, write_manifest
+from src.datalake import record_stage_metrics, write_channel_messages_json, write_manifest
+from src.instrumentation import StageTimer
+from src.media_store import MediaStore
+from src.rate_limit import AdaptiveRateLimiter
+from src.telegram_fake import FakeTelegramClient
 
 # =============================================================================
 # CONFIGURATION
@@ -27,25 +31,32 @@ from src.datalake import write_channel_messages_json, write_manifest
 
 load_dotenv()
 
-# Validate required environment variables before proceeding
-api_id_str = os.getenv("TG_API_ID")
-api_hash = os.getenv("TG_API_HASH")
 
-if not api_id_str or not api_hash:
-    print("ERROR: Missing TG_API_ID or TG_API_HASH in .env file")
-    print("Create a .env file with:")
-    print("  TG_API_ID=your_api_id")
-    print("  TG_API_HASH=your_api_hash")
-    sys.exit(1)
+def load_api_credentials() -> tuple:
+    """Read and validate the Telegram API credentials from the environment."""
+    api_id_str = os.getenv("TG_API_ID")
+    api_hash = os.getenv("TG_API_HASH")
+
+    if not api_id_str or not api_hash:
+        print("ERROR: Missing TG_API_ID or TG_API_HASH in .env file")
+        print("Create a .env file with:")
+        print("  TG_API_ID=your_api_id")
+        print("  TG_API_HASH=your_api_hash")
+        sys.exit(1)
+
+    return int(api_id_str), api_hash
 
-api_id = int(api_id_str)
 
 # Date string for partitioning output files
 TODAY = datetime.today().strftime("%Y-%m-%d")
 
-# Default throttling (seconds). You can override these via CLI args.
-DEFAULT_CHANNEL_DELAY = 3.0
-DEFAULT_MESSAGE_DELAY = 1.0
+# Optional fixed pauses (seconds). Request pacing is handled by
+# AdaptiveRateLimiter, so these default to off.
+DEFAULT_CHANNEL_DELAY = 0.0
+DEFAULT_MESSAGE_DELAY = 0.0
+
+# Messages per history request (Telegram's maximum)
+PAGE_SIZE = 100
 
 # =============================================================================
 # LOGGING SETUP
@@ -87,66 +98,71 @@ async def scrape_channel(
         message_delay: float = DEFAULT_MESSAGE_DELAY,
         channel_delay: float = DEFAULT_CHANNEL_DELAY,
         max_retries: int = 3,
+        rate_limiter: Optional[AdaptiveRateLimiter] = None,
+        media_store: Optional[MediaStore] = None,
+        timer: Optional[StageTimer] = None,
 ) -> int:
     """
     Scrape a single Telegram channel and save messages + images.
 
+    History is fetched one page at a time. On FloodWaitError the rate limiter
+    backs off for the requested time and the scrape resumes after the
+    last fetched message instead of restarting the channel.
+
     Args:
         client: Authenticated TelegramClient instance
         channel: Channel username (e.g., '@lobelia4cosmetics')
         writer: CSV writer to append rows
-        image_dir: Directory to save downloaded images
-        json_save_dir: Directory to save JSON output
+        base_path: Base data directory (e.g., 'data')
+        date_str: ingestion_date partition to write
         limit: Maximum number of messages to scrape (default 100)
+        max_retries: Consecutive FloodWaits without progress before giving up
+        rate_limiter: Limiter shared by every request of the run
+        media_store: Content-addressed photo store shared by the run
+        timer: This channel's stage timer; counts messages, images and bytes
 
     Returns:
         Number of messages scraped
     """
     channel_name = channel.strip('@')
+    rate_limiter = rate_limiter or AdaptiveRateLimiter()
+    media_store = media_store or MediaStore(base_path)
+    timer = timer or StageTimer(channel_name)
+
+    # Create image directory for this channel
+    # Path format: data/raw/images/{channel_name}/
+    channel_image_dir = os.path.join(base_path, "raw", "images", channel_name)
+    os.makedirs(channel_image_dir, exist_ok=True)
+
+    logger.info(f"Starting scrape of {channel} (limit={limit})")
 
+    entity = None
+    messages = []
+    offset_id = 0  # 0 = start from the newest message
     retries = 0
-    while True:
+
+    while len(messages) < limit:
         try:
-            # Get channel entity (validates channel exists and is accessible)
-            entity = await client.get_entity(channel)
-            channel_title = entity.title
-            messages = []
-
-            # Create image directory for this channel
-            # Path format: data/raw/images/{channel_name}/
-            channel_image_dir = os.path.join(base_path, "raw", "images", channel_name)
-            os.makedirs(channel_image_dir, exist_ok=True)
-
-            logger.info(f"Starting scrape of {channel} (limit={limit})")
-
-            # Iterate through channel messages (newest first by default)
-            async for message in client.iter_messages(entity, limit=limit):
-                image_path: Optional[str] = None
-                has_media = message.media is not None
-
-                # Download photo if present
-                # Challenge requires: data/raw/images/{channel_name}/{message_id}.jpg
-                if has_media and isinstance(message.media, MessageMediaPhoto):
-                    filename = f"{message.id}.jpg"
-                    image_path = os.path.join(channel_image_dir, filename)
-                    try:
-                        await client.download_media(message.media, image_path)
-                    except Exception as e:
-                        logger.warning(f"Failed to download image for message {message.id}: {e}")
-                        image_path = None
-
-                # Build message dict with all required fields
-                message_dict = {
-                    "message_id": message.id,
-                    "channel_name": channel_name,
-                    "channel_title": channel_title,
-                    "message_date": message.date.isoformat(),  # ISO format for consistency
-                    "message_text": message.message or "",  # Handle None text
-                    "has_media": has_media,
-                    "image_path": image_path,
-                    "views": message.views or 0,  # Some messages may not have views
-                    "forwards": message.forwards or 0,
-                }
+            if entity is None:
+                # Get channel entity (validates channel exists and is accessible)
+                await rate_limiter.acquire()
+                entity = await client.get_entity(channel)
+                rate_limiter.on_success()
+
+            # One page of history (newest first), older than the last fetched message
+            page_size = min(PAGE_SIZE, limit - len(messages))
+            await rate_limiter.acquire()
+            page = [
+                message
+                async for message in client.iter_messages(entity, limit=page_size, offset_id=offset_id)
+            ]
+            rate_limiter.on_success()
+
+            for message in page:
+                message_dict = await build_message(
+                    client, message, entity.title, channel_name, channel_image_dir,
+                    rate_limiter, media_store,
+                )
 
                 # Write to CSV (backup/alternative format)
                 writer.writerow([
@@ -162,40 +178,104 @@ async def scrape_channel(
                 ])
 
                 messages.append(message_dict)
+                timer.add(messages=1, images=int(message_dict["image_path"] is not None))
+                offset_id = message.id
+                retries = 0
 
-                # Optional delay between messages (reduces risk of rate limiting).
+                # Optional fixed delay between messages, on top of the rate limiter.
                 if message_delay and message_delay > 0:
                     await asyncio.sleep(message_delay)
 
-            write_channel_messages_json(
-                base_path=base_path,
-                date_str=date_str,
-                channel_name=channel_name,
-                messages=messages,
-            )
-
-            logger.info(f"Finished scraping {channel}: {len(messages)} messages saved")
-
-            # Delay between channels (recommended).
-            if channel_delay and channel_delay > 0:
-                await asyncio.sleep(channel_delay)
-
-            return len(messages)
+            if len(page) < page_size:
+                break  # reached the start of the channel
 
         except FloodWaitError as e:
-            # Telegram explicitly asks you to wait e.seconds
+            # Telegram explicitly asks you to wait e.seconds; the limiter
+            # blocks until then and lowers its rate
             wait_seconds = int(getattr(e, "seconds", 0) or 0)
             wait_seconds = max(wait_seconds, 1)
-            logger.warning(f"FloodWaitError for {channel}: sleeping {wait_seconds}s")
-            await asyncio.sleep(wait_seconds)
+            rate_limiter.on_flood_wait(wait_seconds)
             retries += 1
             if retries > max_retries:
-                logger.error(f"Too many FloodWait retries for {channel}. Skipping.")
-                return 0
+                logger.error(
+                    f"Too many FloodWait retries for {channel}. "
+                    f"Keeping the {len(messages)} messages fetched so far."
+                )
+                break
+            logger.warning(
+                f"FloodWaitError for {channel}: waiting {wait_seconds}s, "
+                f"resuming after message {offset_id or 'start'} "
+                f"at {rate_limiter.rate:.2f} req/s"
+            )
         except Exception as e:
             logger.error(f"Error scraping {channel}: {e}")
+            # Photos downloaded before the error are still in the store
+            media_store.save()
             return 0
 
+    # Saved per channel, so a crash later in the run does not lose the
+    # photo ids downloaded so far
+    media_store.save()
+
+    with timer.stage("lake_write") as write_timer:
+        json_path = write_channel_messages_json(
+            base_path=base_path,
+            date_str=date_str,
+            channel_name=channel_name,
+            messages=messages,
+        )
+        write_timer.add(rows=len(messages), bytes=os.path.getsize(json_path))
+
+    logger.info(f"Finished scraping {channel}: {len(messages)} messages saved")
+
+    # Optional fixed delay between channels, on top of the rate limiter.
+    if channel_delay and channel_delay > 0:
+        await asyncio.sleep(channel_delay)
+
+    return len(messages)
+
+
+async def build_message(
+        client: TelegramClient,
+        message,
+        channel_title: str,
+        channel_name: str,
+        channel_image_dir: str,
+        rate_limiter: AdaptiveRateLimiter,
+        media_store: MediaStore,
+) -> dict:
+    """Fetch the message's photo (if any) and build its record."""
+    image_path: Optional[str] = None
+    has_media = message.media is not None
+
+    # Photos go to the content-addressed store once; the path the challenge
+    # requires, data/raw/images/{channel_name}/{message_id}.jpg, links to it.
+    # Photos already in the store (reposts) are not downloaded again.
+    if has_media and isinstance(message.media, MessageMediaPhoto):
+        filename = f"{message.id}.jpg"
+        image_path = os.path.join(channel_image_dir, filename)
+        try:
+            await media_store.fetch(client, message.media, image_path, rate_limiter)
+        except FloodWaitError:
+            # Handled by the caller, which retries from this message
+            raise
+        except Exception as e:
+            logger.warning(f"Failed to download image for message {message.id}: {e}")
+            image_path = None
+
+    # Build message dict with all required fields
+    return {
+        "message_id": message.id,
+        "channel_name": channel_name,
+        "channel_title": channel_title,
+        "message_date": message.date.isoformat(),  # ISO format for consistency
+        "message_text": message.message or "",  # Handle None text
+        "has_media": has_media,
+        "image_path": image_path,
+        "views": message.views or 0,  # Some messages may not have views
+        "forwards": message.forwards or 0,
+    }
+
 
 async def scrape_all_channels(
         client: TelegramClient,
@@ -204,6 +284,8 @@ async def scrape_all_channels(
         limit: int = 100,
         message_delay: float = DEFAULT_MESSAGE_DELAY,
         channel_delay: float = DEFAULT_CHANNEL_DELAY,
+        rate_limiter: Optional[AdaptiveRateLimiter] = None,
+        media_store: Optional[MediaStore] = None,
 ) -> dict:
     """
     Scrape multiple Telegram channels and organize output.
@@ -213,6 +295,8 @@ async def scrape_all_channels(
         channels: List of channel usernames to scrape
         base_path: Base directory for all output (e.g., 'data')
         limit: Max messages per channel
+        rate_limiter: Shared request limiter (a fresh one per run by default)
+        media_store: Photo store (data/raw/telegram/media under base_path by default)
 
     Returns:
         Dict with scraping statistics per channel
@@ -220,6 +304,10 @@ async def scrape_all_channels(
     await client.start()
     logger.info(f"Client authenticated. Scraping {len(channels)} channels...")
 
+    # One limiter for the whole run: Telegram rate limits per account
+    rate_limiter = rate_limiter or AdaptiveRateLimiter()
+    media_store = media_store or MediaStore(base_path)
+
     # Setup output directories following challenge spec
     csv_dir = os.path.join(base_path, "raw", "csv", TODAY)
     json_dir = os.path.join(base_path, "raw", "telegram_messages", TODAY)
@@ -233,7 +321,10 @@ async def scrape_all_channels(
     csv_file_path = os.path.join(csv_dir, "telegram_data.csv")
     stats = {}
 
-    with open(csv_file_path, 'w', newline='', encoding='utf-8') as f:
+    # Wall/CPU time, peak RSS and counts for the run and each channel
+    run_timer = StageTimer("scrape")
+
+    with open(csv_file_path, 'w', newline='', encoding='utf-8') as f, run_timer:
         writer = csv.writer(f)
         # Header row matching challenge required fields
         writer.writerow([
@@ -252,28 +343,46 @@ async def scrape_all_channels(
 
         for channel in channels:
             logger.info(f"Scraping {channel}...")
-            count = await scrape_channel(
-                client=client,
-                channel=channel,
-                writer=writer,
-                base_path=base_path,
-                date_str=TODAY,
-                limit=limit,
-                message_delay=message_delay,
-                channel_delay=channel_delay,
-            )
+            with run_timer.stage(channel.strip("@")) as channel_timer:
+                count = await scrape_channel(
+                    client=client,
+                    channel=channel,
+                    writer=writer,
+                    base_path=base_path,
+                    date_str=TODAY,
+                    limit=limit,
+                    message_delay=message_delay,
+                    channel_delay=channel_delay,
+                    rate_limiter=rate_limiter,
+                    media_store=media_store,
+                    timer=channel_timer,
+                )
             stats[channel] = count
             channel_counts[channel.strip("@")] = count
 
-        write_manifest(
-            base_path=base_path,
-            date_str=TODAY,
-            channel_message_counts=channel_counts,
-        )
+    rate_stats = rate_limiter.stats()
+    write_manifest(
+        base_path=base_path,
+        date_str=TODAY,
+        channel_message_counts=channel_counts,
+        extra={"rate_limit": rate_stats, "media": dict(media_store.stats)},
+    )
+    record_stage_metrics(base_path=base_path, date_str=TODAY, stage="scrape", metrics=run_timer.to_dict())
 
     # Log summary
     total = sum(stats.values())
     logger.info(f"Scraping complete. Total messages: {total}")
+    logger.info(
+        f"Effective rate: {rate_stats['effective_rate']:.2f} req/s over {rate_stats['requests']} requests "
+        f"(peak {rate_stats['peak_rate']:.2f} req/s, {rate_stats['flood_waits']} FloodWaits, "
+        f"{rate_stats['flood_wait_seconds']:.0f}s waited)"
+    )
+    logger.info(
+        f"Media: {media_store.stats['downloads']} downloaded, "
+        f"{media_store.stats['skipped_downloads']} already stored, "
+        f"{media_store.stats['duplicate_blobs']} byte-identical re-uploads"
+    )
+    logger.info(run_timer.summary())
     for ch, count in stats.items():
         logger.info(f"  {ch}: {count} messages")
 
@@ -310,20 +419,46 @@ Examples:
         "--message-delay",
         type=float,
         default=DEFAULT_MESSAGE_DELAY,
-        help="Pause (seconds) between processing messages (default: 0)"
+        help="Extra fixed pause (seconds) after each message; pacing is adaptive (default: 0)"
     )
     parser.add_argument(
         "--channel-delay",
         type=float,
         default=DEFAULT_CHANNEL_DELAY,
-        help="Pause (seconds) after finishing a channel (default: 3)"
+        help="Extra fixed pause (seconds) after each channel (default: 0)"
+    )
+    parser.add_argument(
+        "--fake",
+        action="store_true",
+        help="Scrape synthetic channels from an offline fake client (no credentials needed)"
+    )
+    parser.add_argument(
+        "--fake-latency",
+        type=float,
+        default=0.05,
+        help="Simulated seconds per API request with --fake (default: 0.05)"
+    )
+    parser.add_argument(
+        "--fake-flood-every",
+        type=int,
+        default=0,
+        help="With --fake, raise FloodWaitError on every Nth request (default: never)"
     )
     args = parser.parse_args()
 
-    # Initialize Telegram client
-    # Session file stores auth so you don't need to re-login each time
-    client = TelegramClient("telegram_scraper_session", api_id, api_hash)
-    logger.info("Telegram client initialized")
+    if args.fake:
+        client = FakeTelegramClient(
+            messages_per_channel=args.limit,
+            latency=args.fake_latency,
+            flood_wait_every=args.fake_flood_every,
+        )
+        logger.info("Fake Telegram client initialized (offline)")
+    else:
+        # Initialize Telegram client
+        # Session file stores auth so you don't need to re-login each time
+        api_id, api_hash = load_api_credentials()
+        client = TelegramClient("telegram_scraper_session", api_id, api_hash)
+        logger.info("Telegram client initialized")
 
     # Target channels from challenge document
     target_channels = [
@@ -1,16 +1,155 @@
+import glob
 import json
 import os
+import tempfile
+from contextlib import contextmanager
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
 
 
 SOURCE = "telegram"
 
+# A partition is committed once its marker exists; readers skip the rest
+SUCCESS_MARKER = "_SUCCESS"
+LOCK_FILE = "_LOCK"
+
 
 def ensure_dir(path: str) -> None:
     os.makedirs(path, exist_ok=True)
 
 
+# The process umask can only be read by setting it, so it is read once here
+_UMASK = os.umask(0o022)
+os.umask(_UMASK)
+
+
+def apply_default_mode(path: str) -> None:
+    """
+    Give a file made by tempfile.mkstemp (always 0600) the permissions an
+    ordinary open() would have, so other users and containers sharing the
+    lake can still read it.
+    """
+    os.chmod(path, 0o666 & ~_UMASK)
+
+
+# -----------------------------------------------------------------------------
+# ATOMIC WRITES
+# -----------------------------------------------------------------------------
+
+def _fsync_dir(path: str) -> None:
+    """Persist a rename by syncing its directory entry (POSIX only)."""
+    if os.name == "nt":
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+@contextmanager
+def atomic_path(out_path: str) -> Iterator[str]:
+    """
+    Yield a temp path next to `out_path` and move it into place on success.
+
+    The temp file is fsynced and renamed over the target with os.replace, so
+    readers see either the old file or the complete new one, never a
+    truncated write. On error the temp file is removed.
+    """
+    directory = os.path.dirname(out_path) or "."
+    ensure_dir(directory)
+    fd, tmp_path = tempfile.mkstemp(
+        prefix=f".{os.path.basename(out_path)}.", suffix=".tmp", dir=directory
+    )
+    os.close(fd)
+    try:
+        yield tmp_path
+        with open(tmp_path, "rb+") as f:
+            os.fsync(f.fileno())
+        apply_default_mode(tmp_path)
+        os.replace(tmp_path, out_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    _fsync_dir(directory)
+
+
+def atomic_write_json(out_path: str, payload: Any, indent: Optional[int] = 2) -> str:
+    with atomic_path(out_path) as tmp_path:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, indent=indent)
+    return out_path
+
+
+@contextmanager
+def partition_lock(partition_dir: str) -> Iterator[None]:
+    """
+    Exclusive inter-process lock on a partition directory.
+
+    Concurrent writers of the same partition (e.g. two Dagster runs scraping
+    the same date and channel) wait for each other instead of interleaving.
+    A partition removed by compaction deletes its lock file while holding
+    it; a writer that was waiting on that file notices and locks the new one.
+    """
+    lock_path = os.path.join(partition_dir, LOCK_FILE)
+    while True:
+        ensure_dir(partition_dir)
+        f = open(lock_path, "a+b")
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                current = os.path.samestat(os.fstat(f.fileno()), os.stat(lock_path))
+            except FileNotFoundError:
+                current = False
+            if not current:
+                f.close()
+                continue
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue  # LK_LOCK gives up after ~10s; keep waiting
+        break
+
+    with f:
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def mark_partition_uncommitted(partition_dir: str) -> None:
+    marker = os.path.join(partition_dir, SUCCESS_MARKER)
+    if os.path.exists(marker):
+        os.remove(marker)
+        _fsync_dir(partition_dir)
+
+
+def mark_partition_committed(partition_dir: str, files: Dict[str, int]) -> str:
+    """Write the partition's commit marker listing its files and record counts."""
+    return atomic_write_json(
+        os.path.join(partition_dir, SUCCESS_MARKER),
+        {"committed_utc": datetime.now(timezone.utc).isoformat(), "files": files},
+    )
+
+
 def sanitize_channel(name: str) -> str:
     return name.strip().lower().replace(" ", "_")
 
@@ -29,17 +168,18 @@ def telegram_messages_partition_dir(base_path: str, date_str: str, channel_name:
     return path
 
 
-def telegram_images_dir(base_path: str, channel_name: str) -> str:
-    channel = sanitize_channel(channel_name)
-    path = os.path.join(
-        base_path,
-        "raw",
-        SOURCE,
-        "media",
-        f"channel={channel}",
-    )
-    ensure_dir(path)
-    return path
+def telegram_media_dir(base_path: str) -> str:
+    return os.path.join(base_path, "raw", SOURCE, "media")
+
+
+def telegram_media_blob_path(base_path: str, sha256: str, ext: str = ".jpg") -> str:
+    """
+    Content-addressed location of a media file.
+
+    Blobs are sharded on the first two bytes of their SHA-256
+    (media/ab/cd/abcd....jpg) to keep directories small.
+    """
+    return os.path.join(telegram_media_dir(base_path), sha256[:2], sha256[2:4], f"{sha256}{ext}")
 
 
 def channel_messages_json_path(base_path: str, date_str: str, channel_name: str) -> str:
@@ -59,10 +199,16 @@ def write_channel_messages_json(
 
     This function overwrites the partition file by design.
     Raw data is treated as append-only at the partition level.
+
+    The write is atomic and holds the partition lock. The partition is
+    uncommitted while it is rewritten and gets its _SUCCESS marker last.
     """
     out_path = channel_messages_json_path(base_path, date_str, channel_name)
-    with open(out_path, "w", encoding="utf-8") as f:
-        json.dump(messages, f, ensure_ascii=False, indent=2)
+    partition_dir = os.path.dirname(out_path)
+    with partition_lock(partition_dir):
+        mark_partition_uncommitted(partition_dir)
+        atomic_write_json(out_path, messages)
+        mark_partition_committed(partition_dir, {os.path.basename(out_path): len(messages)})
     return out_path
 
 
@@ -86,20 +232,267 @@ def write_manifest(
     channel_message_counts: Dict[str, int],
     extra: Optional[Dict[str, Any]] = None,
 ) -> str:
-    """Write audit metadata for a Telegram scrape run."""
+    """
+    Write audit metadata for a Telegram scrape run.
+
+    Runs for the same date (e.g. scrapes of different channels) are merged
+    under the date's lock, so no run drops another run's channel counts.
+    """
+    out_path = manifest_path(base_path, date_str)
+
+    with partition_lock(os.path.dirname(out_path)):
+        previous = _read_manifest(out_path)
+        channels: Dict[str, int] = dict(previous.get("channels", {}))
+        channels.update(channel_message_counts)
+
+        payload: Dict[str, Any] = {
+            "source": SOURCE,
+            "ingestion_date": date_str,
+            "run_utc": datetime.now(timezone.utc).isoformat(),
+            "channels": channels,
+            "total_messages": sum(channels.values()),
+        }
+        if "stages" in previous:
+            payload["stages"] = previous["stages"]
+
+        if extra:
+            payload.update(extra)
+
+        atomic_write_json(out_path, payload)
+    return out_path
 
-    payload: Dict[str, Any] = {
-        "source": SOURCE,
-        "ingestion_date": date_str,
-        "run_utc": datetime.now(timezone.utc).isoformat(),
-        "channels": channel_message_counts,
-        "total_messages": sum(channel_message_counts.values()),
-    }
 
-    if extra:
-        payload.update(extra)
+def _read_manifest(out_path: str) -> Dict[str, Any]:
+    if not os.path.exists(out_path):
+        return {}
+    with open(out_path, "r", encoding="utf-8") as f:
+        return json.load(f)
 
+
+def record_stage_metrics(*, base_path: str, date_str: str, stage: str, metrics: Dict[str, Any]) -> str:
+    """
+    Store one pipeline stage's instrumentation (src/instrumentation.py)
+    under `stages` in the date's manifest, replacing that stage's last run.
+    """
     out_path = manifest_path(base_path, date_str)
-    with open(out_path, "w", encoding="utf-8") as f:
-        json.dump(payload, f, ensure_ascii=False, indent=2)
+
+    with partition_lock(os.path.dirname(out_path)):
+        payload = _read_manifest(out_path) or {"source": SOURCE, "ingestion_date": date_str}
+        payload.setdefault("stages", {})[stage] = {
+            "recorded_utc": datetime.now(timezone.utc).isoformat(),
+            **metrics,
+        }
+        atomic_write_json(out_path, payload)
+    return out_path
+
+
+def read_stage_metrics(base_path: str, date_str: str, stage: str) -> Optional[Dict[str, Any]]:
+    return _read_manifest(manifest_path(base_path, date_str)).get("stages", {}).get(stage)
+
+
+def is_partition_committed(partition_dir: str) -> bool:
+    """
+    True when a messages partition is safe to read.
+
+    Partitions written before commit markers existed have neither a marker
+    nor a lock file; they count as committed when their date's manifest,
+    which the scraper writes after every channel, lists the channel.
+    """
+    if os.path.exists(os.path.join(partition_dir, SUCCESS_MARKER)):
+        return True
+    if os.path.exists(os.path.join(partition_dir, LOCK_FILE)):
+        return False
+
+    manifest = os.path.join(os.path.dirname(partition_dir), "_manifest.json")
+    if not os.path.exists(manifest):
+        return False
+    with open(manifest, "r", encoding="utf-8") as f:
+        channels = json.load(f).get("channels", {})
+    channel = os.path.basename(partition_dir).split("=", 1)[1]
+    return channel in {sanitize_channel(name) for name in channels}
+
+
+def _dir_value(path: str) -> str:
+    # .../ingestion_date=2026-01-05 -> "2026-01-05", .../month=2026-01 -> "2026-01"
+    return os.path.basename(path).split("=", 1)[1]
+
+
+def _partition_key(partition_dir: str) -> str:
+    return _dir_value(os.path.dirname(partition_dir))
+
+
+def committed_messages_files(messages_dir: str) -> List[str]:
+    """
+    messages.json files of every committed partition under a messages root
+    (e.g. data/raw/telegram/messages), daily and compacted monthly ones,
+    oldest first.
+    """
+    partitions = sorted(
+        glob.glob(os.path.join(messages_dir, "ingestion_date=*", "channel=*"))
+        + glob.glob(os.path.join(messages_dir, "month=*", "channel=*")),
+        key=_partition_key,
+    )
+    return [
+        os.path.join(partition, "messages.json")
+        for partition in partitions
+        if is_partition_committed(partition)
+        and os.path.exists(os.path.join(partition, "messages.json"))
+    ]
+
+
+# -----------------------------------------------------------------------------
+# COMPACTION AND RETENTION
+# -----------------------------------------------------------------------------
+
+def messages_root(base_path: str) -> str:
+    return os.path.join(base_path, "raw", SOURCE, "messages")
+
+
+def compacted_partition_dir(base_path: str, month: str, channel_name: str) -> str:
+    return os.path.join(
+        messages_root(base_path),
+        f"month={month}",
+        f"channel={sanitize_channel(channel_name)}",
+    )
+
+
+def _remove_partition(partition_dir: str) -> None:
+    with partition_lock(partition_dir):
+        for name in os.listdir(partition_dir):
+            if name != LOCK_FILE:
+                os.remove(os.path.join(partition_dir, name))
+        if fcntl is not None:
+            # Still locked, so no writer can start on the directory in between
+            os.remove(os.path.join(partition_dir, LOCK_FILE))
+            os.rmdir(partition_dir)
+    if fcntl is None:
+        # Windows cannot delete a file that is open
+        os.remove(os.path.join(partition_dir, LOCK_FILE))
+        os.rmdir(partition_dir)
+
+
+def closed_months(base_path: str, today: Optional[datetime] = None) -> List[str]:
+    """Months with daily partitions that ended before the current UTC month."""
+    current = (today or datetime.now(timezone.utc)).strftime("%Y-%m")
+    dates = glob.glob(os.path.join(messages_root(base_path), "ingestion_date=*"))
+    return sorted({_dir_value(d)[:7] for d in dates if _dir_value(d)[:7] < current})
+
+
+def compact_month(base_path: str, month: str, delete_daily: bool = True) -> Dict[str, Dict[str, int]]:
+    """
+    Merge a month's daily partitions into one deduplicated file per channel.
+
+    The scraper re-fetches each channel's newest messages every day, so the
+    daily partitions mostly repeat each other. Messages are keyed on
+    message_id; later partitions win, which keeps the latest views and
+    forwards. An existing compacted file for the month is merged in first,
+    so re-running is safe. Uncommitted daily partitions are left alone.
+
+    Returns per channel: daily partitions merged, messages read and messages
+    written.
+    """
+    root = messages_root(base_path)
+    daily = sorted(glob.glob(os.path.join(root, f"ingestion_date={month}-*", "channel=*")))
+
+    by_channel: Dict[str, List[str]] = {}
+    for partition in daily:
+        if is_partition_committed(partition):
+            channel = os.path.basename(partition).split("=", 1)[1]
+            by_channel.setdefault(channel, []).append(partition)
+
+    summary: Dict[str, Dict[str, int]] = {}
+    for channel, partitions in by_channel.items():
+        out_dir = compacted_partition_dir(base_path, month, channel)
+        out_path = os.path.join(out_dir, "messages.json")
+
+        with partition_lock(out_dir):
+            merged: Dict[int, Dict[str, Any]] = {}
+            sources = ([out_path] if os.path.exists(out_path) else []) + [
+                os.path.join(p, "messages.json") for p in partitions
+            ]
+            read = 0
+            for source in sources:
+                if not os.path.exists(source):
+                    continue
+                with open(source, "r", encoding="utf-8") as f:
+                    messages = json.load(f)
+                read += len(messages)
+                for msg in messages:
+                    if msg.get("message_id"):
+                        merged[msg["message_id"]] = msg
+
+            compacted = [merged[k] for k in sorted(merged)]
+            mark_partition_uncommitted(out_dir)
+            atomic_write_json(out_path, compacted, indent=None)
+            mark_partition_committed(out_dir, {"messages.json": len(compacted)})
+
+        if delete_daily:
+            for partition in partitions:
+                _remove_partition(partition)
+
+        summary[channel] = {"partitions": len(partitions), "read": read, "written": len(compacted)}
+    return summary
+
+
+def apply_retention(base_path: str, keep_months: int, today: Optional[datetime] = None) -> List[str]:
+    """
+    Delete lake partitions older than the last `keep_months` months.
+
+    Only the lake copy is removed; loaded rows stay in raw.telegram_messages.
+    Returns the partitions deleted.
+    """
+    now = today or datetime.now(timezone.utc)
+    total = now.year * 12 + now.month - 1 - keep_months
+    cutoff = f"{total // 12:04d}-{total % 12 + 1:02d}"
+
+    root = messages_root(base_path)
+    deleted = []
+    for partition in sorted(
+        glob.glob(os.path.join(root, "ingestion_date=*", "channel=*"))
+        + glob.glob(os.path.join(root, "month=*", "channel=*"))
+    ):
+        if _partition_key(partition)[:7] <= cutoff:
+            _remove_partition(partition)
+            deleted.append(partition)
+
+    # Drop date/month directories left with only their manifest and lock
+    for parent in glob.glob(os.path.join(root, "ingestion_date=*")) + glob.glob(os.path.join(root, "month=*")):
+        if _dir_value(parent)[:7] <= cutoff and not glob.glob(os.path.join(parent, "channel=*")):
+            for name in os.listdir(parent):
+                os.remove(os.path.join(parent, name))
+            os.rmdir(parent)
+    return deleted
+
+
+def detections_partition_dir(base_path: str, date_str: str) -> str:
+    path = os.path.join(
+        base_path,
+        "raw",
+        "yolo",
+        "detections",
+        f"detection_date={date_str}",
+    )
+    ensure_dir(path)
+    return path
+
+
+def write_detection_boxes_parquet(
+    *,
+    base_path: str,
+    date_str: str,
+    model_name: str,
+    boxes: "pd.DataFrame",
+) -> str:
+    """
+    Write every detected box of a YOLO run for a single date partition.
+
+    One file per model, so runs of different model versions can coexist.
+    """
+    model = os.path.splitext(os.path.basename(model_name))[0]
+    out_path = os.path.join(
+        detections_partition_dir(base_path, date_str),
+        f"boxes_{model}.parquet",
+    )
+    with atomic_path(out_path) as tmp_path:
+        boxes.to_parquet(tmp_path, index=False, compression="zstd")
     return out_path
@@ -0,0 +1,294 @@
+import os
+import sys
+import glob
+import json
+import time
+import hashlib
+import argparse
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+from loguru import logger
+
+# Allow running this file directly: `python src/image_cache.py`
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.datalake import record_stage_metrics
+from src.instrumentation import StageTimer
+
+# -----------------------------------------------------------------------------
+# CONFIG
+# -----------------------------------------------------------------------------
+
+IMAGE_DIR = "data/raw/images"
+CACHE_DIR = "data/processed/image_cache"
+
+# Model input size used by yolov8n
+IMGSZ = 640
+
+# Ultralytics pads letterboxed images with this gray value
+PAD_VALUE = 114
+
+# "npy": raw uint8 arrays, memory-mapped on load (no decode at all)
+# "jpg": letterboxed JPEG copies (small on disk, cheap decode)
+CACHE_FORMATS = ("npy", "jpg")
+DEFAULT_FORMAT = "npy"
+
+# Bump when the index layout changes; older indexes are rebuilt
+CACHE_VERSION = 2
+
+
+# -----------------------------------------------------------------------------
+# PREPROCESSING
+# -----------------------------------------------------------------------------
+
+def letterbox(image: np.ndarray, imgsz: int = IMGSZ) -> Tuple[np.ndarray, float, Tuple[int, int]]:
+    """
+    Resize keeping aspect ratio and pad to a square imgsz x imgsz canvas.
+
+    Returns the canvas, the scale ratio and the (left, top) padding needed
+    to map box coordinates back onto the original image.
+    """
+    h, w = image.shape[:2]
+    ratio = min(imgsz / h, imgsz / w)
+    new_w, new_h = int(round(w * ratio)), int(round(h * ratio))
+
+    if (new_w, new_h) != (w, h):
+        image = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_AREA)
+
+    left = (imgsz - new_w) // 2
+    top = (imgsz - new_h) // 2
+    canvas = cv2.copyMakeBorder(
+        image,
+        top,
+        imgsz - new_h - top,
+        left,
+        imgsz - new_w - left,
+        cv2.BORDER_CONSTANT,
+        value=(PAD_VALUE, PAD_VALUE, PAD_VALUE),
+    )
+    return canvas, ratio, (left, top)
+
+
+# -----------------------------------------------------------------------------
+# CACHE
+# -----------------------------------------------------------------------------
+
+class ImageCache:
+    """
+    Model-input-sized copies of downloaded images.
+
+    Each source image is decoded and letterboxed once. Detection runs then
+    read the cached copy (memory-mapped for the npy format) and skip the
+    JPEG decode and resize entirely.
+
+    Cached copies are keyed on the SHA-256 of the source bytes, so the same
+    photo linked into several channels (see src/media_store.py) is decoded
+    and stored once.
+    """
+
+    def __init__(self, cache_dir: str = CACHE_DIR, imgsz: int = IMGSZ, fmt: str = DEFAULT_FORMAT):
+        if fmt not in CACHE_FORMATS:
+            raise ValueError(f"Unknown cache format '{fmt}', expected one of {CACHE_FORMATS}")
+        self.cache_dir = cache_dir
+        self.imgsz = imgsz
+        self.fmt = fmt
+        self.index_path = os.path.join(cache_dir, "_index.json")
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.hits = 0
+        self.load_seconds = 0.0
+
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                payload = json.load(f)
+            # A different input size or format invalidates every entry
+            if (
+                payload.get("version") == CACHE_VERSION
+                and payload.get("imgsz") == imgsz
+                and payload.get("format") == fmt
+            ):
+                self.entries = payload.get("entries", {})
+        self._by_sha = {e["sha256"]: e for e in self.entries.values()}
+
+    def _cache_path(self, sha256: str) -> str:
+        return os.path.join(self.cache_dir, sha256[:2], f"{sha256}.{self.fmt}")
+
+    def _entry_for_sha(self, sha256: str) -> Optional[Dict[str, Any]]:
+        entry = self._by_sha.get(sha256)
+        if entry is None or not os.path.exists(entry["cache_path"]):
+            return None
+        return entry
+
+    def _is_fresh(self, img_path: str, entry: Optional[Dict[str, Any]]) -> bool:
+        if entry is None or not os.path.exists(entry["cache_path"]):
+            return False
+        stat = os.stat(img_path)
+        return entry["src_bytes"] == stat.st_size and entry["src_mtime"] == stat.st_mtime
+
+    def add(self, img_path: str) -> Optional[Dict[str, Any]]:
+        """Decode and letterbox one image into the cache, unless its bytes already are."""
+        started = time.perf_counter()
+        with open(img_path, "rb") as f:
+            data = f.read()
+        sha256 = hashlib.sha256(data).hexdigest()
+        stat = os.stat(img_path)
+
+        existing = self._entry_for_sha(sha256)
+        if existing is not None:
+            entry = {**existing, "src_bytes": stat.st_size, "src_mtime": stat.st_mtime}
+            self.entries[img_path] = entry
+            return entry
+
+        image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            return None
+        canvas, ratio, pad = letterbox(image, self.imgsz)
+        decode_seconds = time.perf_counter() - started
+
+        cache_path = self._cache_path(sha256)
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        if self.fmt == "npy":
+            np.save(cache_path, np.ascontiguousarray(canvas, dtype=np.uint8))
+        else:
+            cv2.imwrite(cache_path, canvas)
+
+        entry = {
+            "sha256": sha256,
+            "cache_path": cache_path,
+            "src_bytes": stat.st_size,
+            "src_mtime": stat.st_mtime,
+            "cache_bytes": os.path.getsize(cache_path),
+            "orig_shape": list(image.shape[:2]),
+            "ratio": ratio,
+            "pad": list(pad),
+            "decode_seconds": decode_seconds,
+        }
+        self._by_sha[sha256] = entry
+        self.entries[img_path] = entry
+        return entry
+
+    def build(self, image_dir: str = IMAGE_DIR) -> Dict[str, Any]:
+        """Cache every new or modified image under image_dir."""
+        image_paths = glob.glob(os.path.join(image_dir, "**", "*.jpg"), recursive=True)
+
+        added = 0
+        failed = 0
+        started = time.perf_counter()
+        for img_path in image_paths:
+            if self._is_fresh(img_path, self.entries.get(img_path)):
+                continue
+            try:
+                if self.add(img_path) is None:
+                    failed += 1
+                else:
+                    added += 1
+            except Exception as exc:
+                failed += 1
+                logger.error(f"Failed caching {img_path}: {exc}")
+
+        # Forget images that were removed from the lake; a cached copy is
+        # deleted once no remaining image shares its bytes
+        live = set(image_paths)
+        for img_path in [p for p in self.entries if p not in live]:
+            self.entries.pop(img_path)
+        self._by_sha = {e["sha256"]: e for e in self.entries.values()}
+        referenced = {e["cache_path"] for e in self.entries.values()}
+        for cache_path in glob.glob(os.path.join(self.cache_dir, "*", f"*.{self.fmt}")):
+            if cache_path not in referenced:
+                os.remove(cache_path)
+
+        self.save()
+        logger.info(
+            f"Image cache: {added} added, {failed} failed, {len(self.entries)} total "
+            f"in {time.perf_counter() - started:.1f}s"
+        )
+        return {"added": added, "failed": failed, "total": len(self.entries)}
+
+    def load(self, img_path: str) -> Optional[Tuple[np.ndarray, Dict[str, Any]]]:
+        """Return the cached model input and its entry, or None on a miss."""
+        entry = self.entries.get(img_path)
+        if not self._is_fresh(img_path, entry):
+            return None
+
+        started = time.perf_counter()
+        if self.fmt == "npy":
+            image = np.load(entry["cache_path"], mmap_mode="r")
+        else:
+            image = cv2.imread(entry["cache_path"])
+        self.load_seconds += time.perf_counter() - started
+        self.hits += 1
+        return image, entry
+
+    def save(self) -> str:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        payload = {
+            "version": CACHE_VERSION,
+            "imgsz": self.imgsz,
+            "format": self.fmt,
+            "entries": self.entries,
+        }
+        with open(self.index_path, "w", encoding="utf-8") as f:
+            json.dump(payload, f)
+        return self.index_path
+
+    def report(self) -> Dict[str, Any]:
+        """Disk usage of the cache and decode time saved by cache hits so far."""
+        unique = {e["sha256"]: e for e in self.entries.values()}.values()
+        src_bytes = sum(e["src_bytes"] for e in unique)
+        cache_bytes = sum(e["cache_bytes"] for e in unique)
+        mean_decode = (
+            sum(e["decode_seconds"] for e in self.entries.values()) / len(self.entries)
+            if self.entries else 0.0
+        )
+        return {
+            "images": len(self.entries),
+            "unique_images": len(unique),
+            "format": self.fmt,
+            "source_mb": round(src_bytes / 1e6, 2),
+            "cache_mb": round(cache_bytes / 1e6, 2),
+            "hits": self.hits,
+            "decode_seconds_saved": round(max(self.hits * mean_decode - self.load_seconds, 0.0), 2),
+        }
+
+
+def to_original_coords(xyxy: np.ndarray, entry: Dict[str, Any]) -> np.ndarray:
+    """Map letterboxed box coordinates back to the source image."""
+    left, top = entry["pad"]
+    h, w = entry["orig_shape"]
+    boxes = (np.asarray(xyxy, dtype=np.float32) - [left, top, left, top]) / entry["ratio"]
+    boxes[..., [0, 2]] = boxes[..., [0, 2]].clip(0, w)
+    boxes[..., [1, 3]] = boxes[..., [1, 3]].clip(0, h)
+    return boxes
+
+
+# -----------------------------------------------------------------------------
+# MAIN
+# -----------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the letterboxed image cache used by yolo_detect")
+    parser.add_argument("--image-dir", default=IMAGE_DIR, help=f"Source images (default: {IMAGE_DIR})")
+    parser.add_argument("--cache-dir", default=CACHE_DIR, help=f"Cache location (default: {CACHE_DIR})")
+    parser.add_argument("--imgsz", type=int, default=IMGSZ, help=f"Model input size (default: {IMGSZ})")
+    parser.add_argument("--format", choices=CACHE_FORMATS, default=DEFAULT_FORMAT,
+                        help=f"Cache format (default: {DEFAULT_FORMAT})")
+    args = parser.parse_args()
+
+    with StageTimer("image_cache") as timer:
+        cache = ImageCache(cache_dir=args.cache_dir, imgsz=args.imgsz, fmt=args.format)
+        built = cache.build(args.image_dir)
+        timer.add(images=built["added"], files=built["total"])
+    logger.success(f"Image cache report: {cache.report()}")
+
+    record_stage_metrics(
+        base_path="data",
+        date_str=date.today().isoformat(),
+        stage="image_cache",
+        metrics=timer.to_dict(),
+    )
+    logger.info(timer.summary())
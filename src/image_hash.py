@@ -0,0 +1,215 @@
+import json
+import os
+from typing import Any, Dict, Iterator, List, Optional
+
+import cv2
+
+# -----------------------------------------------------------------------------
+# CONFIG
+# -----------------------------------------------------------------------------
+
+HASH_INDEX_PATH = "data/processed/image_hash_index.json"
+
+# Bump when the shape of cached detections changes
+INDEX_VERSION = 2
+
+# 8x8 difference hash -> 64 bit fingerprint
+HASH_SIZE = 8
+HASH_BITS = HASH_SIZE * HASH_SIZE
+
+# Two images whose hashes differ in at most this many bits are treated as
+# the same product photo (re-compressed, resized or lightly cropped repost).
+DEFAULT_MAX_DISTANCE = 6
+
+# The 64 bit hash is split into NUM_BANDS bands for lookup. By pigeonhole,
+# any hash within NUM_BANDS - 1 bits of a stored one shares at least one
+# band exactly, so candidate lookup never misses a near duplicate.
+NUM_BANDS = 8
+BAND_BITS = HASH_BITS // NUM_BANDS
+BAND_MASK = (1 << BAND_BITS) - 1
+
+
+# -----------------------------------------------------------------------------
+# HASHING
+# -----------------------------------------------------------------------------
+
+def dhash(img_path: str, hash_size: int = HASH_SIZE) -> Optional[int]:
+    """
+    Compute the difference hash of an image.
+
+    The JPEG is decoded at reduced scale straight to grayscale, which is
+    much cheaper than a full decode and plenty for an 8x8 fingerprint.
+    """
+    image = cv2.imread(img_path, cv2.IMREAD_REDUCED_GRAYSCALE_4)
+    if image is None:
+        return None
+
+    resized = cv2.resize(image, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    diff = resized[:, 1:] > resized[:, :-1]
+
+    value = 0
+    for bit in diff.flatten():
+        value = (value << 1) | int(bit)
+    return value
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def _bands(value: int) -> Iterator[tuple]:
+    for i in range(NUM_BANDS):
+        yield i, (value >> (i * BAND_BITS)) & BAND_MASK
+
+
+# -----------------------------------------------------------------------------
+# INDEX
+# -----------------------------------------------------------------------------
+
+class ImageHashIndex:
+    """
+    Persistent perceptual-hash index of downloaded media.
+
+    Every image is assigned to a cluster whose id is the path of the first
+    copy seen (the canonical image). Detections are cached on the canonical
+    entry so reposts can reuse them instead of re-running the model.
+    """
+
+    def __init__(self, model_name: str, max_distance: int = DEFAULT_MAX_DISTANCE):
+        if max_distance >= NUM_BANDS:
+            raise ValueError(f"max_distance must be below {NUM_BANDS} for exact band lookup")
+        self.model_name = model_name
+        self.max_distance = max_distance
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self._bands: List[Dict[int, List[str]]] = [{} for _ in range(NUM_BANDS)]
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, img_path: str) -> bool:
+        return img_path in self.entries
+
+    def get(self, img_path: str) -> Optional[Dict[str, Any]]:
+        return self.entries.get(img_path)
+
+    def find_near(self, value: int) -> Optional[tuple]:
+        """Return (canonical_path, distance) of the closest cluster, if any."""
+        best = None
+        seen = set()
+        for i, band in _bands(value):
+            for path in self._bands[i].get(band, ()):
+                if path in seen:
+                    continue
+                seen.add(path)
+                distance = hamming(value, int(self.entries[path]["hash"], 16))
+                if distance <= self.max_distance and (best is None or distance < best[1]):
+                    best = (path, distance)
+        return best
+
+    def add(
+        self,
+        img_path: str,
+        value: int,
+        message_id: Optional[int],
+        channel_name: str,
+    ) -> Dict[str, Any]:
+        """Insert an image, attaching it to an existing cluster when one is near."""
+        match = self.find_near(value)
+        cluster, distance = match if match else (img_path, 0)
+
+        entry = {
+            "hash": f"{value:016x}",
+            "message_id": message_id,
+            "channel_name": channel_name,
+            "cluster": cluster,
+            "distance": distance,
+            "detection": None,
+        }
+        self.entries[img_path] = entry
+
+        # Only canonical images are indexed, which keeps clusters stable
+        # and bounds the number of candidates per band.
+        if cluster == img_path:
+            self._index(img_path, value)
+        return entry
+
+    def canonical(self, img_path: str) -> Optional[Dict[str, Any]]:
+        entry = self.entries.get(img_path)
+        if entry is None:
+            return None
+        return self.entries.get(entry["cluster"])
+
+    def set_detection(self, img_path: str, detection: Dict[str, Any]) -> None:
+        self.entries[img_path]["detection"] = detection
+
+    def _index(self, img_path: str, value: int) -> None:
+        for i, band in _bands(value):
+            self._bands[i].setdefault(band, []).append(img_path)
+
+    def cluster_rows(self) -> List[Dict[str, Any]]:
+        """Flatten the index into one row per image for analytics."""
+        sizes: Dict[str, int] = {}
+        for entry in self.entries.values():
+            sizes[entry["cluster"]] = sizes.get(entry["cluster"], 0) + 1
+
+        rows = []
+        for path, entry in self.entries.items():
+            rows.append({
+                "image_path": path,
+                "message_id": entry["message_id"],
+                "channel_name": entry["channel_name"],
+                "image_hash": entry["hash"],
+                "cluster_id": entry["cluster"],
+                "is_canonical": entry["cluster"] == path,
+                "hamming_distance": entry["distance"],
+                "cluster_size": sizes[entry["cluster"]],
+            })
+        return rows
+
+    # -------------------------------------------------------------------------
+    # PERSISTENCE
+    # -------------------------------------------------------------------------
+
+    def save(self, path: str = HASH_INDEX_PATH) -> str:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        payload = {
+            "version": INDEX_VERSION,
+            "model_name": self.model_name,
+            "max_distance": self.max_distance,
+            "entries": self.entries,
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False)
+        return path
+
+    @classmethod
+    def load(
+        cls,
+        model_name: str,
+        path: str = HASH_INDEX_PATH,
+        max_distance: int = DEFAULT_MAX_DISTANCE,
+    ) -> "ImageHashIndex":
+        """
+        Load the index from disk, or start an empty one.
+
+        Cached detections are dropped when they were produced by a different
+        model or an older index version, but the hashes and clusters are kept.
+        """
+        index = cls(model_name=model_name, max_distance=max_distance)
+        if not os.path.exists(path):
+            return index
+
+        with open(path, "r", encoding="utf-8") as f:
+            payload = json.load(f)
+
+        stale = (
+            payload.get("model_name") != model_name
+            or payload.get("version", 1) != INDEX_VERSION
+        )
+        for img_path, entry in payload.get("entries", {}).items():
+            if stale:
+                entry["detection"] = None
+            index.entries[img_path] = entry
+            if entry["cluster"] == img_path:
+                index._index(img_path, int(entry["hash"], 16))
+        return index
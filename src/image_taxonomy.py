@@ -0,0 +1,164 @@
+import json
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# -----------------------------------------------------------------------------
+# CONFIG
+# -----------------------------------------------------------------------------
+
+TAXONOMY_PATH = Path(__file__).resolve().parents[1] / "config" / "image_taxonomy.json"
+
+# Group membership is packed into one bit per group
+MAX_GROUPS = 64
+
+
+# -----------------------------------------------------------------------------
+# TAXONOMY
+# -----------------------------------------------------------------------------
+
+class Taxonomy:
+    """
+    Rule set mapping detected object classes to an image category.
+
+    Config layout (config/image_taxonomy.json):
+        groups:            group name -> list of class names
+        min_confidence:    {"default": float, "classes": {class name: float}}
+        rules:             ordered list of {"category", "all": [groups], "none": [groups]}
+        default_category:  category when no rule matches
+
+    The first matching rule wins. Boxes below their class's confidence
+    threshold are ignored for both the rules and the confidence score.
+    """
+
+    def __init__(
+        self,
+        groups: Dict[str, List[str]],
+        rules: List[Dict],
+        default_category: str = "other",
+        min_confidence: float = 0.0,
+        class_min_confidence: Optional[Dict[str, float]] = None,
+    ):
+        if len(groups) > MAX_GROUPS:
+            raise ValueError(f"At most {MAX_GROUPS} groups are supported, got {len(groups)}")
+        for rule in rules:
+            unknown = set(rule.get("all", [])) | set(rule.get("none", []))
+            unknown -= set(groups)
+            if unknown:
+                raise ValueError(f"Rule '{rule['category']}' references unknown groups: {sorted(unknown)}")
+
+        self.groups = groups
+        self.rules = rules
+        self.default_category = default_category
+        self.min_confidence = min_confidence
+        self.class_min_confidence = class_min_confidence or {}
+
+    @classmethod
+    def from_file(cls, path: Path = TAXONOMY_PATH) -> "Taxonomy":
+        with open(path, "r", encoding="utf-8") as f:
+            config = json.load(f)
+
+        thresholds = config.get("min_confidence", {})
+        return cls(
+            groups=config["groups"],
+            rules=config["rules"],
+            default_category=config.get("default_category", "other"),
+            min_confidence=thresholds.get("default", 0.0),
+            class_min_confidence=thresholds.get("classes", {}),
+        )
+
+    @property
+    def categories(self) -> List[str]:
+        return [rule["category"] for rule in self.rules] + [self.default_category]
+
+    def compile(self, names: Dict[int, str]) -> "CompiledTaxonomy":
+        """Build lookup tables for a model's class id -> name mapping."""
+        return CompiledTaxonomy(self, names)
+
+
+class CompiledTaxonomy:
+    """
+    Taxonomy compiled against a model's class ids.
+
+    Each class id maps to a bitmask of the groups it belongs to and to its
+    confidence threshold, so a whole batch of boxes is classified with a
+    handful of array operations instead of per-image Python lists.
+    """
+
+    def __init__(self, taxonomy: Taxonomy, names: Dict[int, str]):
+        self.taxonomy = taxonomy
+        self.names = names
+        self.name_to_id = {name: cls_id for cls_id, name in names.items()}
+
+        # One extra trailing slot for classes the model does not know;
+        # index -1 lands there and carries no group bits.
+        size = max(names) + 2 if names else 1
+        group_bit = {group: np.uint64(1) << np.uint64(i) for i, group in enumerate(taxonomy.groups)}
+
+        self.class_bits = np.zeros(size, dtype=np.uint64)
+        for group, members in taxonomy.groups.items():
+            for name in members:
+                if name in self.name_to_id:
+                    self.class_bits[self.name_to_id[name]] |= group_bit[group]
+
+        self.class_threshold = np.full(size, taxonomy.min_confidence, dtype=np.float32)
+        for name, threshold in taxonomy.class_min_confidence.items():
+            if name in self.name_to_id:
+                self.class_threshold[self.name_to_id[name]] = threshold
+
+        def mask(groups: Sequence[str]) -> np.uint64:
+            bits = np.uint64(0)
+            for group in groups:
+                bits |= group_bit[group]
+            return bits
+
+        self.rule_all = np.array([mask(r.get("all", [])) for r in taxonomy.rules], dtype=np.uint64)
+        self.rule_none = np.array([mask(r.get("none", [])) for r in taxonomy.rules], dtype=np.uint64)
+        self.categories = np.array(taxonomy.categories, dtype=object)
+
+    def ids_for(self, labels: Sequence[str]) -> np.ndarray:
+        """Map class names to ids (-1 for names the model does not know)."""
+        return np.array([self.name_to_id.get(label, -1) for label in labels], dtype=np.int64)
+
+    def classify(
+        self,
+        cls_ids: np.ndarray,
+        confidences: np.ndarray,
+        image_idx: np.ndarray,
+        n_images: int,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Classify a batch of images from their flattened boxes.
+
+        Args:
+            cls_ids: class id of every box
+            confidences: confidence of every box
+            image_idx: index of the image each box belongs to (0..n_images-1)
+            n_images: number of images in the batch
+
+        Returns:
+            (categories, mean confidence, kept box mask) where the first two
+            are per image and the mask is per box.
+        """
+        cls_ids = np.asarray(cls_ids, dtype=np.int64)
+        confidences = np.asarray(confidences, dtype=np.float32)
+        image_idx = np.asarray(image_idx, dtype=np.int64)
+
+        keep = confidences >= self.class_threshold[cls_ids]
+        kept_images = image_idx[keep]
+
+        image_bits = np.zeros(n_images, dtype=np.uint64)
+        np.bitwise_or.at(image_bits, kept_images, self.class_bits[cls_ids[keep]])
+
+        counts = np.bincount(kept_images, minlength=n_images)
+        sums = np.bincount(kept_images, weights=confidences[keep], minlength=n_images)
+        mean_confidence = np.divide(sums, counts, out=np.zeros(n_images), where=counts > 0)
+
+        # Apply rules last to first so the first matching rule wins
+        category_idx = np.full(n_images, len(self.rule_all), dtype=np.int64)
+        for i in range(len(self.rule_all) - 1, -1, -1):
+            matches = ((image_bits & self.rule_all[i]) == self.rule_all[i]) & ((image_bits & self.rule_none[i]) == 0)
+            category_idx[matches] = i
+
+        return self.categories[category_idx], mean_confidence, keep
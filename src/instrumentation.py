@@ -0,0 +1,119 @@
+import os
+import sys
+import time
+from typing import Any, Dict, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# -----------------------------------------------------------------------------
+# CONFIG
+# -----------------------------------------------------------------------------
+
+# Counters reported as <name>_per_sec alongside their totals
+THROUGHPUT_COUNTERS = ("rows", "messages", "bytes", "images", "files")
+
+
+def peak_rss_mb() -> Optional[float]:
+    """
+    Peak resident set size of this process and its waited-for children.
+
+    ru_maxrss is a high-water mark for the whole process, so a stage reports
+    the peak reached by the time it finished, not its own increment.
+    """
+    if resource is None:
+        return None
+    peak = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+    # Kilobytes on Linux, bytes on macOS
+    divisor = 1 << 20 if sys.platform == "darwin" else 1 << 10
+    return round(peak / divisor, 1)
+
+
+def process_cpu_seconds() -> float:
+    """CPU time of this process plus its waited-for children (dbt, loaders run as subprocesses)."""
+    times = os.times()
+    return time.process_time() + times.children_user + times.children_system
+
+
+# -----------------------------------------------------------------------------
+# TIMER
+# -----------------------------------------------------------------------------
+
+class StageTimer:
+    """
+    Wall time, CPU time, peak RSS and counters of one pipeline stage.
+
+        with StageTimer("scrape") as timer:
+            for channel in channels:
+                with timer.stage(channel) as channel_timer:
+                    ...
+                    channel_timer.add(messages=len(messages))
+
+    Sub-stages (e.g. per channel) are nested under `stages`, and their
+    counters are added to the parent's. `to_dict()` is what goes into the
+    run manifest and the Dagster asset metadata.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.counters: Dict[str, float] = {}
+        self.children: Dict[str, "StageTimer"] = {}
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.peak_rss_mb: Optional[float] = None
+        self._parent: Optional["StageTimer"] = None
+        self._started_wall: Optional[float] = None
+        self._started_cpu: Optional[float] = None
+
+    def __enter__(self) -> "StageTimer":
+        self._started_wall = time.perf_counter()
+        self._started_cpu = process_cpu_seconds()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        # Accumulates, so a stage can be entered more than once
+        self.wall_seconds += time.perf_counter() - self._started_wall
+        self.cpu_seconds += process_cpu_seconds() - self._started_cpu
+        self.peak_rss_mb = peak_rss_mb()
+
+    def stage(self, name: str) -> "StageTimer":
+        if name not in self.children:
+            child = StageTimer(name)
+            child._parent = self
+            self.children[name] = child
+        return self.children[name]
+
+    def add(self, **counters: float) -> None:
+        timer: Optional[StageTimer] = self
+        while timer is not None:
+            for key, value in counters.items():
+                timer.counters[key] = timer.counters.get(key, 0) + value
+            timer = timer._parent
+
+    def to_dict(self) -> Dict[str, Any]:
+        result: Dict[str, Any] = {
+            "wall_seconds": round(self.wall_seconds, 3),
+            "cpu_seconds": round(self.cpu_seconds, 3),
+            "peak_rss_mb": self.peak_rss_mb,
+            **self.counters,
+        }
+        for key in THROUGHPUT_COUNTERS:
+            if key in self.counters and self.wall_seconds > 0:
+                result[f"{key}_per_sec"] = round(self.counters[key] / self.wall_seconds, 1)
+        if self.children:
+            result["stages"] = {name: child.to_dict() for name, child in self.children.items()}
+        return result
+
+    def summary(self) -> str:
+        parts = [f"{self.wall_seconds:.2f}s wall", f"{self.cpu_seconds:.2f}s CPU"]
+        if self.peak_rss_mb is not None:
+            parts.append(f"peak RSS {self.peak_rss_mb:.0f} MB")
+        for key in THROUGHPUT_COUNTERS:
+            if key in self.counters and self.wall_seconds > 0:
+                parts.append(f"{self.counters[key] / self.wall_seconds:.0f} {key}/sec")
+        return f"{self.name}: " + ", ".join(parts)
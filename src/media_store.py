@@ -0,0 +1,170 @@
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+from typing import Any, Dict, Optional
+
+from src.datalake import (
+    apply_default_mode,
+    atomic_write_json,
+    ensure_dir,
+    partition_lock,
+    telegram_media_blob_path,
+    telegram_media_dir,
+)
+
+# -----------------------------------------------------------------------------
+# CONFIG
+# -----------------------------------------------------------------------------
+
+INDEX_FILE = "_index.json"
+
+# Bump when the index layout changes; older indexes are ignored
+INDEX_VERSION = 1
+
+CHUNK_SIZE = 1 << 20
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# -----------------------------------------------------------------------------
+# STORE
+# -----------------------------------------------------------------------------
+
+class MediaStore:
+    """
+    Content-addressed store for downloaded Telegram media.
+
+    Every file is stored once under its SHA-256
+    (data/raw/telegram/media/ab/cd/<sha256>.jpg). The per-channel paths the
+    rest of the pipeline reads (data/raw/images/{channel}/{message_id}.jpg)
+    are hard links to the blob, or copies where the filesystem cannot link,
+    so a photo forwarded to many channels costs one file on disk.
+
+    The index maps Telegram photo ids to blobs: a photo that was already
+    downloaded is linked again without another download request. Channel
+    views must be treated as read-only, since writing to a hard link
+    changes the shared blob.
+    """
+
+    def __init__(self, base_path: str = "data"):
+        self.base_path = base_path
+        self.root = telegram_media_dir(base_path)
+        self.index_path = os.path.join(self.root, INDEX_FILE)
+        self.photos: Dict[str, str] = {}
+        self.stats: Dict[str, int] = {
+            "downloads": 0,
+            "skipped_downloads": 0,
+            "duplicate_blobs": 0,
+            "links": 0,
+            "copies": 0,
+        }
+
+        self.photos = self._read_index()
+
+    def _read_index(self) -> Dict[str, str]:
+        if not os.path.exists(self.index_path):
+            return {}
+        with open(self.index_path, "r", encoding="utf-8") as f:
+            payload = json.load(f)
+        if payload.get("version") != INDEX_VERSION:
+            return {}
+        return payload.get("photos", {})
+
+    def blob_path(self, sha256: str) -> str:
+        return telegram_media_blob_path(self.base_path, sha256)
+
+    def sha_for_photo(self, photo_id: Optional[int]) -> Optional[str]:
+        """The blob already holding this Telegram photo, if any."""
+        if photo_id is None:
+            return None
+        sha256 = self.photos.get(str(photo_id))
+        if sha256 is None or not os.path.exists(self.blob_path(sha256)):
+            return None
+        return sha256
+
+    def put(self, src_path: str, photo_id: Optional[int] = None) -> str:
+        """Move a downloaded file into the store and return its hash."""
+        sha256 = file_sha256(src_path)
+        blob = self.blob_path(sha256)
+        if os.path.exists(blob):
+            # Same bytes under a different photo id (re-uploaded repost)
+            os.remove(src_path)
+            self.stats["duplicate_blobs"] += 1
+        else:
+            ensure_dir(os.path.dirname(blob))
+            os.replace(src_path, blob)
+        if photo_id is not None:
+            self.photos[str(photo_id)] = sha256
+        return sha256
+
+    def link(self, sha256: str, dest_path: str) -> str:
+        """Expose a blob at dest_path as a hard link, falling back to a copy."""
+        blob = self.blob_path(sha256)
+        if os.path.exists(dest_path):
+            if os.path.samefile(dest_path, blob):
+                return dest_path
+            os.remove(dest_path)
+
+        ensure_dir(os.path.dirname(dest_path) or ".")
+        try:
+            os.link(blob, dest_path)
+            self.stats["links"] += 1
+        except OSError:
+            # Cross-device target or a filesystem without hard links
+            shutil.copyfile(blob, dest_path)
+            self.stats["copies"] += 1
+        return dest_path
+
+    async def fetch(self, client: Any, media: Any, dest_path: str, rate_limiter: Any = None) -> str:
+        """
+        Place a message's photo at dest_path, downloading it only when its
+        photo id is not in the store yet. Returns the blob's SHA-256.
+        """
+        photo_id = getattr(getattr(media, "photo", None), "id", None)
+        sha256 = self.sha_for_photo(photo_id)
+
+        if sha256 is None:
+            ensure_dir(self.root)
+            fd, tmp_path = tempfile.mkstemp(prefix=".download.", suffix=".part", dir=self.root)
+            os.close(fd)
+            try:
+                if rate_limiter is not None:
+                    await rate_limiter.acquire()
+                await client.download_media(media, tmp_path)
+                if rate_limiter is not None:
+                    rate_limiter.on_success()
+                # Blobs (and the channel views linked to them) keep this mode
+                apply_default_mode(tmp_path)
+                sha256 = self.put(tmp_path, photo_id)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+            self.stats["downloads"] += 1
+        else:
+            self.stats["skipped_downloads"] += 1
+
+        self.link(sha256, dest_path)
+        return sha256
+
+    def save(self) -> str:
+        """
+        Write the photo index, merged with the copy on disk.
+
+        Concurrent scrapers share the store, so the index is re-read under
+        the store's lock and their new photo ids are kept alongside ours.
+        """
+        with partition_lock(self.root):
+            self.photos = {**self._read_index(), **self.photos}
+            return atomic_write_json(
+                self.index_path,
+                {"version": INDEX_VERSION, "photos": self.photos},
+                indent=None,
+            )
@@ -0,0 +1,102 @@
+import time
+import asyncio
+from typing import Dict, Optional
+
+
+class AdaptiveRateLimiter:
+    """
+    Token bucket whose refill rate adapts with AIMD.
+
+    Every successful request raises the rate additively (by about
+    `increase` requests/sec per second of traffic). A FloodWaitError cuts
+    it multiplicatively by `decrease` and blocks all callers until the
+    wait Telegram asked for has passed. The rate therefore climbs until
+    Telegram pushes back and then settles just below that limit.
+
+    One limiter should be shared by every request made with the same
+    account, since Telegram's limits are per account and not per channel.
+    """
+
+    def __init__(
+        self,
+        initial_rate: float = 2.0,
+        min_rate: float = 0.2,
+        max_rate: float = 30.0,
+        increase: float = 0.5,
+        decrease: float = 0.5,
+        burst: float = 1.0,
+    ):
+        if not 0 < min_rate <= initial_rate <= max_rate:
+            raise ValueError("Expected 0 < min_rate <= initial_rate <= max_rate")
+        if not 0 < decrease < 1:
+            raise ValueError("decrease must be between 0 and 1")
+
+        self.rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.burst = burst
+
+        self._tokens = burst
+        self._last_refill = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+
+        self._started = time.monotonic()
+        self._requests = 0
+        self._flood_waits = 0
+        self._flood_wait_seconds = 0.0
+        self._throttled_seconds = 0.0
+        self._peak_rate = initial_rate
+
+    async def acquire(self) -> None:
+        """Wait until a request may be sent."""
+        # Created lazily so the limiter can be built outside an event loop
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._blocked_until:
+                    await self._sleep(self._blocked_until - now)
+                    continue
+
+                self._tokens = min(self.burst, self._tokens + (now - self._last_refill) * self.rate)
+                self._last_refill = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    self._requests += 1
+                    return
+
+                await self._sleep((1 - self._tokens) / self.rate)
+
+    def on_success(self) -> None:
+        # +increase/rate per request is +increase req/s per second of traffic
+        self.rate = min(self.max_rate, self.rate + self.increase / self.rate)
+        self._peak_rate = max(self._peak_rate, self.rate)
+
+    def on_flood_wait(self, seconds: float) -> None:
+        self.rate = max(self.min_rate, self.rate * self.decrease)
+        self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+        self._tokens = 0.0
+        self._flood_waits += 1
+        self._flood_wait_seconds += seconds
+
+    def stats(self) -> Dict[str, float]:
+        elapsed = time.monotonic() - self._started
+        return {
+            "requests": self._requests,
+            "elapsed_seconds": round(elapsed, 3),
+            "effective_rate": round(self._requests / elapsed, 3) if elapsed > 0 else 0.0,
+            "current_rate": round(self.rate, 3),
+            "peak_rate": round(self._peak_rate, 3),
+            "flood_waits": self._flood_waits,
+            "flood_wait_seconds": round(self._flood_wait_seconds, 3),
+            "throttled_seconds": round(self._throttled_seconds, 3),
+        }
+
+    async def _sleep(self, seconds: float) -> None:
+        self._throttled_seconds += seconds
+        await asyncio.sleep(seconds)
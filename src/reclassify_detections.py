@@ -0,0 +1,204 @@
+import os
+import sys
+import time
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+from loguru import logger
+from sqlalchemy import create_engine, inspect, text
+
+# Allow running this file directly: `python src/reclassify_detections.py`
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.image_taxonomy import TAXONOMY_PATH, Taxonomy
+
+# -----------------------------------------------------------------------------
+# ENVIRONMENT
+# -----------------------------------------------------------------------------
+
+load_dotenv()
+
+DB_STR = (
+    f"postgresql://{os.getenv('PG_USER')}:"
+    f"{os.getenv('PG_PASSWORD')}@"
+    f"{os.getenv('PG_HOST')}:"
+    f"{os.getenv('PG_PORT')}/"
+    f"{os.getenv('PG_DB')}"
+)
+
+# COCO class names as used by yolov8n, needed to compile the taxonomy
+# without loading the model. Also loaded into the warehouse by `dbt seed`.
+COCO_CLASSES_PATH = PROJECT_ROOT / "medical_warehouse" / "seeds" / "coco_classes.csv"
+
+
+def load_class_names(path: Path = COCO_CLASSES_PATH) -> dict:
+    classes = pd.read_csv(path)
+    return dict(zip(classes["class_id"], classes["class_name"]))
+
+
+# -----------------------------------------------------------------------------
+# RECLASSIFICATION
+# -----------------------------------------------------------------------------
+
+def reclassify_boxes(boxes: pd.DataFrame, images: pd.DataFrame, taxonomy: Taxonomy) -> pd.DataFrame:
+    """
+    Reclassify images from their stored boxes in one vectorised pass.
+
+    `images` holds one row per image (message_id, channel_name); `boxes`
+    holds every stored box with its class_id and confidence, so per-class
+    thresholds apply exactly as they would at inference time.
+    """
+    compiled = taxonomy.compile(load_class_names())
+    images = images.reset_index(drop=True)
+
+    position = pd.Series(
+        images.index,
+        index=pd.MultiIndex.from_frame(images[["message_id", "channel_name"]]),
+    )
+    image_idx = position.reindex(
+        pd.MultiIndex.from_frame(boxes[["message_id", "channel_name"]])
+    ).to_numpy()
+    matched = ~np.isnan(image_idx)
+
+    categories, mean_confidence, _ = compiled.classify(
+        boxes["class_id"].to_numpy()[matched],
+        boxes["confidence"].to_numpy()[matched],
+        image_idx[matched].astype(np.int64),
+        len(images),
+    )
+
+    return pd.DataFrame({
+        "message_id": images["message_id"],
+        "channel_name": images["channel_name"],
+        "image_category": categories,
+        "confidence_score": mean_confidence.round(3),
+    })
+
+
+def reclassify_labels(detections: pd.DataFrame, taxonomy: Taxonomy) -> pd.DataFrame:
+    """
+    Reclassify detections stored before per-box storage existed.
+
+    Expects one row per image with the stored label list in
+    `detected_objects` and the image's `confidence_score`. Only the image
+    level confidence is stored, so it stands in for every box.
+    """
+    compiled = taxonomy.compile(load_class_names())
+    detections = detections.reset_index(drop=True)
+
+    # '{bottle,person}' / "['bottle', 'person']" -> one row per label
+    labels = (
+        detections["detected_objects"]
+        .fillna("")
+        .astype(str)
+        .str.replace(r"[\[\]{}'\" ]", "", regex=True)
+        .str.split(",")
+        .explode()
+    )
+    labels = labels[labels != ""]
+
+    image_idx = labels.index.to_numpy()
+    cls_ids = compiled.ids_for(labels.tolist())
+    confidences = detections["confidence_score"].fillna(0).to_numpy(dtype=np.float32)[image_idx]
+
+    categories, _, _ = compiled.classify(cls_ids, confidences, image_idx, len(detections))
+
+    return pd.DataFrame({
+        "message_id": detections["message_id"],
+        "channel_name": detections["channel_name"],
+        "image_category": categories,
+        "confidence_score": detections["confidence_score"],
+    })
+
+
+def main(taxonomy_path: Path, model_name: str) -> None:
+    taxonomy = Taxonomy.from_file(taxonomy_path)
+    engine = create_engine(DB_STR)
+
+    started = time.perf_counter()
+    # Detection runs append, so an image can have several rows; one per
+    # image is enough, since the UPDATE below rewrites all of them
+    detections = pd.read_sql(
+        "SELECT DISTINCT ON (message_id, channel_name) "
+        "message_id, channel_name, detected_objects, confidence_score "
+        "FROM raw.yolo_detections "
+        "ORDER BY message_id, channel_name, confidence_score DESC NULLS LAST",
+        engine,
+    )
+    if detections.empty:
+        logger.warning("No stored detections to reclassify.")
+        return
+
+    boxes = pd.DataFrame()
+    if inspect(engine).has_table("yolo_detection_boxes", schema="raw"):
+        boxes = pd.read_sql(
+            text(
+                "SELECT message_id, channel_name, class_id, confidence "
+                "FROM raw.yolo_detection_boxes WHERE model_name = :model_name"
+            ),
+            engine,
+            params={"model_name": model_name},
+        )
+
+    if boxes.empty:
+        logger.info("No stored boxes, reclassifying from label lists")
+        result = reclassify_labels(detections, taxonomy)
+    else:
+        # Images detected before per-box storage fall back to their labels
+        keys = ["message_id", "channel_name"]
+        images = boxes[keys].drop_duplicates()
+        legacy = detections.merge(images, on=keys, how="left", indicator=True)
+        legacy = legacy[legacy["_merge"] == "left_only"].drop(columns="_merge")
+        result = pd.concat(
+            [reclassify_boxes(boxes, images, taxonomy), reclassify_labels(legacy, taxonomy)],
+            ignore_index=True,
+        )
+
+    with engine.begin() as conn:
+        result.to_sql("_reclassified", conn, schema="raw", if_exists="replace", index=False)
+        updated = conn.execute(text("""
+            UPDATE raw.yolo_detections y
+            SET image_category = r.image_category,
+                confidence_score = r.confidence_score
+            FROM raw._reclassified r
+            WHERE y.message_id = r.message_id
+              AND y.channel_name = r.channel_name
+              AND (y.image_category, y.confidence_score)
+                  IS DISTINCT FROM (r.image_category, r.confidence_score)
+        """)).rowcount
+        conn.execute(text("DROP TABLE raw._reclassified"))
+
+    elapsed = time.perf_counter() - started
+    logger.success(
+        f"Reclassified {len(result)} images in {elapsed:.2f}s "
+        f"({updated} rows changed)"
+    )
+    logger.info(f"Category counts: {result['image_category'].value_counts().to_dict()}")
+
+
+# -----------------------------------------------------------------------------
+# MAIN
+# -----------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Reclassify stored YOLO detections under the current taxonomy (no re-inference)"
+    )
+    parser.add_argument(
+        "--taxonomy",
+        type=Path,
+        default=TAXONOMY_PATH,
+        help=f"Taxonomy config file (default: {TAXONOMY_PATH})",
+    )
+    parser.add_argument(
+        "--model-name",
+        default="yolov8n.pt",
+        help="Model whose stored boxes are reclassified (default: yolov8n.pt)",
+    )
+    args = parser.parse_args()
+    main(args.taxonomy, args.model_name)
@@ -0,0 +1,217 @@
+import os
+import time
+import asyncio
+import random
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional
+
+from telethon.errors import FloodWaitError
+from telethon.tl.types import MessageMediaPhoto, Photo
+
+# -----------------------------------------------------------------------------
+# CONFIG
+# -----------------------------------------------------------------------------
+
+# Telethon fetches history in pages of 100 messages per API request
+PAGE_SIZE = 100
+
+SAMPLE_TEXTS = [
+    "Paracetamol 500mg available now. ዋጋ 350 ብር",
+    "New stock: Amoxicillin 250mg - 420 birr",
+    "Vitamin C 1000mg ✅ Price: 600 ETB, delivery in Addis",
+    "Blood pressure monitor በቅናሽ ዋጋ 2500 ብር",
+    "",
+]
+
+
+@dataclass
+class FakeMessage:
+    """The subset of telethon's Message the scraper reads."""
+
+    id: int
+    date: datetime
+    message: str
+    media: Optional[Any]
+    views: Optional[int]
+    forwards: Optional[int]
+
+
+# -----------------------------------------------------------------------------
+# CLIENT
+# -----------------------------------------------------------------------------
+
+class FakeTelegramClient:
+    """
+    Offline stand-in for telethon's TelegramClient.
+
+    Implements the calls the scraper makes (start, get_entity,
+    iter_messages, download_media and the async context manager) over
+    deterministic synthetic channels. Every API call counts as one request
+    and can be slowed down or rejected with a FloodWaitError:
+
+        latency / download_latency  seconds added to each request
+        flood_wait_every            raise FloodWaitError on every Nth request
+        max_requests_per_second     raise FloodWaitError when the caller exceeds
+                                    this rate, like Telegram's server-side limit
+
+    `stats` counts requests, pages, downloads and flood waits, so a run's
+    throughput and retry behaviour can be checked without network access.
+    """
+
+    def __init__(
+        self,
+        messages_per_channel: int = 500,
+        media_share: float = 0.4,
+        repost_share: float = 0.1,
+        latency: float = 0.05,
+        download_latency: float = 0.1,
+        flood_wait_every: int = 0,
+        flood_wait_seconds: int = 5,
+        max_requests_per_second: Optional[float] = None,
+        seed: int = 42,
+    ):
+        self.messages_per_channel = messages_per_channel
+        self.media_share = media_share
+        self.repost_share = repost_share
+        self.latency = latency
+        self.download_latency = download_latency
+        self.flood_wait_every = flood_wait_every
+        self.flood_wait_seconds = flood_wait_seconds
+        self.max_requests_per_second = max_requests_per_second
+        self.seed = seed
+
+        self.stats: Dict[str, int] = {"requests": 0, "pages": 0, "downloads": 0, "flood_waits": 0}
+        self._channels: Dict[str, List[FakeMessage]] = {}
+        self._photo_ids: List[int] = []
+        self._recent: Deque[float] = deque()
+
+    # -------------------------------------------------------------------------
+    # CONNECTION
+    # -------------------------------------------------------------------------
+
+    async def start(self) -> "FakeTelegramClient":
+        return self
+
+    async def disconnect(self) -> None:
+        return None
+
+    async def __aenter__(self) -> "FakeTelegramClient":
+        return await self.start()
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.disconnect()
+
+    # -------------------------------------------------------------------------
+    # API
+    # -------------------------------------------------------------------------
+
+    async def get_entity(self, channel: str) -> SimpleNamespace:
+        await self._request(self.latency)
+        username = channel.lstrip("@")
+        return SimpleNamespace(
+            id=sum(map(ord, username)),
+            username=username,
+            title=f"{username} (fake)",
+        )
+
+    async def iter_messages(
+        self,
+        entity: SimpleNamespace,
+        limit: Optional[int] = None,
+        offset_id: int = 0,
+    ) -> AsyncIterator[FakeMessage]:
+        """Yield messages newest first; offset_id only yields ids below it."""
+        messages = self._messages_for(entity.username)
+        if offset_id:
+            messages = [m for m in messages if m.id < offset_id]
+        if limit is not None:
+            messages = messages[:limit]
+
+        for start in range(0, len(messages), PAGE_SIZE):
+            await self._request(self.latency)
+            self.stats["pages"] += 1
+            for message in messages[start:start + PAGE_SIZE]:
+                yield message
+
+    async def download_media(self, media: MessageMediaPhoto, file: str) -> str:
+        await self._request(self.download_latency)
+        self.stats["downloads"] += 1
+
+        os.makedirs(os.path.dirname(file) or ".", exist_ok=True)
+        with open(file, "wb") as f:
+            f.write(_photo_bytes(media.photo.id))
+        return file
+
+    # -------------------------------------------------------------------------
+    # INTERNALS
+    # -------------------------------------------------------------------------
+
+    async def _request(self, latency: float) -> None:
+        self.stats["requests"] += 1
+
+        flood = self.flood_wait_every and self.stats["requests"] % self.flood_wait_every == 0
+        if self.max_requests_per_second:
+            now = time.monotonic()
+            while self._recent and now - self._recent[0] > 1.0:
+                self._recent.popleft()
+            flood = flood or len(self._recent) >= self.max_requests_per_second
+            self._recent.append(now)
+
+        if flood:
+            self.stats["flood_waits"] += 1
+            raise FloodWaitError(request=None, capture=self.flood_wait_seconds)
+
+        if latency > 0:
+            await asyncio.sleep(latency)
+
+    def _messages_for(self, username: str) -> List[FakeMessage]:
+        if username not in self._channels:
+            self._channels[username] = self._generate(username)
+        return self._channels[username]
+
+    def _generate(self, username: str) -> List[FakeMessage]:
+        rng = random.Random(f"{self.seed}:{username}")
+        newest = datetime(2026, 1, 31, 12, tzinfo=timezone.utc)
+
+        messages = []
+        for message_id in range(self.messages_per_channel, 0, -1):
+            media = None
+            if rng.random() < self.media_share:
+                # Reposts carry an existing photo id, possibly another channel's
+                if self._photo_ids and rng.random() < self.repost_share:
+                    photo_id = rng.choice(self._photo_ids)
+                else:
+                    photo_id = rng.getrandbits(62)
+                    self._photo_ids.append(photo_id)
+                media = MessageMediaPhoto(photo=Photo(
+                    id=photo_id,
+                    access_hash=0,
+                    file_reference=b"",
+                    date=None,
+                    sizes=[],
+                    dc_id=2,
+                ))
+
+            messages.append(FakeMessage(
+                id=message_id,
+                date=newest - timedelta(minutes=37 * (self.messages_per_channel - message_id)),
+                message=rng.choice(SAMPLE_TEXTS),
+                media=media,
+                views=int(rng.paretovariate(1.5) * 100),
+                forwards=rng.randrange(0, 40),
+            ))
+        return messages
+
+
+def _photo_bytes(photo_id: int) -> bytes:
+    """A small JPEG whose content is determined by the photo id."""
+    import cv2
+    import numpy as np
+
+    rng = np.random.default_rng(photo_id)
+    image = rng.integers(0, 255, size=(240, 320, 3), dtype=np.uint8)
+    ok, encoded = cv2.imencode(".jpg", image)
+    return encoded.tobytes()
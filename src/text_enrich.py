@@ -0,0 +1,346 @@
+import os
+import re
+import sys
+import time
+import hashlib
+import argparse
+from collections import deque
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Tuple
+
+import pandas as pd
+from dotenv import load_dotenv
+from loguru import logger
+from sqlalchemy import create_engine, text
+
+# Allow running this file directly: `python src/text_enrich.py`
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+# -----------------------------------------------------------------------------
+# CONFIG
+# -----------------------------------------------------------------------------
+
+load_dotenv()
+
+DB_STR = (
+    f"postgresql://{os.getenv('PG_USER')}:"
+    f"{os.getenv('PG_PASSWORD')}@"
+    f"{os.getenv('PG_HOST')}:"
+    f"{os.getenv('PG_PORT')}/"
+    f"{os.getenv('PG_DB')}"
+)
+
+# Also loaded into the warehouse by `dbt seed`
+DICTIONARY_PATH = PROJECT_ROOT / "medical_warehouse" / "seeds" / "drug_dictionary.csv"
+
+BATCH_SIZE = 5000
+
+# Prices are a number next to a currency: "350 ብር", "420 birr", "ETB 600", "$12.50"
+_AMOUNT = r"(?P<amount>\d{1,3}(?:,\d{3})+|\d+)(?:\.(?P<cents>\d{1,2}))?"
+_CURRENCY = r"(?P<currency>birr|br|etb|ብር|usd|\$)"
+PRICE_PATTERNS = [
+    re.compile(rf"(?<![\d.,]){_AMOUNT} ?{_CURRENCY}(?![a-z])"),
+    re.compile(rf"(?<![a-z]){_CURRENCY} ?{_AMOUNT}(?![\d,])"),
+]
+CURRENCIES = {"birr": "ETB", "br": "ETB", "etb": "ETB", "ብር": "ETB", "usd": "USD", "$": "USD"}
+
+CREATE_SQL = """
+CREATE SCHEMA IF NOT EXISTS raw;
+
+CREATE TABLE IF NOT EXISTS raw.product_mentions (
+    message_id    bigint   NOT NULL,
+    channel_name  text     NOT NULL,
+    mention_index smallint NOT NULL,
+    product_name  text     NOT NULL,
+    category      text,
+    matched_term  text     NOT NULL,
+    price         numeric(12, 2),
+    currency      text,
+    PRIMARY KEY (message_id, channel_name, mention_index)
+);
+
+-- One row per processed message, so each run only reads new messages
+CREATE TABLE IF NOT EXISTS raw.text_enrichment_log (
+    message_id         bigint      NOT NULL,
+    channel_name       text        NOT NULL,
+    dictionary_version text        NOT NULL,
+    mention_count      smallint    NOT NULL,
+    processed_at       timestamptz NOT NULL DEFAULT now(),
+    PRIMARY KEY (message_id, channel_name)
+);
+"""
+
+
+def normalise(message: str) -> str:
+    """Lowercase and collapse whitespace, hyphens and underscores to one space."""
+    return re.sub(r"[\s\-_]+", " ", message.lower())
+
+
+# -----------------------------------------------------------------------------
+# MATCHING
+# -----------------------------------------------------------------------------
+
+class AhoCorasick:
+    """
+    Multi-pattern string matcher.
+
+    All dictionary terms are compiled into one automaton, so a message is
+    scanned once no matter how many terms there are, instead of once per
+    term as with ILIKE or a regex per product.
+    """
+
+    def __init__(self, patterns: Dict[str, Any]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, Any]]] = [[]]
+
+        for pattern, payload in patterns.items():
+            state = 0
+            for ch in pattern:
+                if ch not in self._goto[state]:
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                    self._goto[state][ch] = len(self._goto) - 1
+                state = self._goto[state][ch]
+            self._out[state].append((len(pattern), payload))
+
+        # Breadth-first: a state's failure link points at the longest proper
+        # suffix that is also a prefix of some pattern
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, child in self._goto[state].items():
+                queue.append(child)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(ch, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def iter(self, haystack: str) -> Iterator[Tuple[int, int, Any]]:
+        """Yield (start, end, payload) for every occurrence of every pattern."""
+        state = 0
+        for i, ch in enumerate(haystack):
+            while state and ch not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(ch, 0)
+            for length, payload in self._out[state]:
+                yield i - length + 1, i + 1, payload
+
+
+class ProductMatcher:
+    """Drug/product mentions and their prices in free message text."""
+
+    def __init__(self, dictionary: pd.DataFrame):
+        terms = {
+            normalise(row.term).strip(): (row.product_name, row.category, row.term)
+            for row in dictionary.itertuples(index=False)
+        }
+        self.automaton = AhoCorasick(terms)
+        self.version = hashlib.md5(
+            dictionary.sort_values("term").to_csv(index=False).encode("utf-8")
+        ).hexdigest()[:12]
+
+    @classmethod
+    def from_csv(cls, path: Path = DICTIONARY_PATH) -> "ProductMatcher":
+        return cls(pd.read_csv(path, dtype=str))
+
+    def products(self, normalised: str) -> List[Tuple[int, int, Tuple[str, str, str]]]:
+        """Whole-word matches, leftmost-longest, without overlaps."""
+        matches = [
+            (start, end, payload)
+            for start, end, payload in self.automaton.iter(normalised)
+            if (start == 0 or not normalised[start - 1].isalnum())
+            and (end == len(normalised) or not normalised[end].isalnum())
+        ]
+        matches.sort(key=lambda m: (m[0], -(m[1] - m[0])))
+
+        selected, last_end = [], 0
+        for start, end, payload in matches:
+            if start >= last_end:
+                selected.append((start, end, payload))
+                last_end = end
+        return selected
+
+    @staticmethod
+    def prices(normalised: str) -> List[Tuple[int, float, str]]:
+        found = {}
+        for pattern in PRICE_PATTERNS:
+            for m in pattern.finditer(normalised):
+                amount = float(m.group("amount").replace(",", "") + "." + (m.group("cents") or "0"))
+                found.setdefault(m.start(), (m.start(), amount, CURRENCIES[m.group("currency")]))
+        return sorted(found.values())
+
+    def extract(self, message: str) -> List[Dict[str, Any]]:
+        """
+        Product mentions in one message, each with the price that follows it.
+
+        A price belongs to the nearest product mentioned before it; a price
+        ahead of every product goes to the first one.
+        """
+        normalised = normalise(message or "")
+        products = self.products(normalised)
+        if not products:
+            return []
+
+        mentions = [
+            {"product_name": name, "category": category, "matched_term": term, "price": None, "currency": None}
+            for _, _, (name, category, term) in products
+        ]
+        for position, amount, currency in self.prices(normalised):
+            owner = 0
+            for i, (start, _, _) in enumerate(products):
+                if start < position:
+                    owner = i
+            if mentions[owner]["price"] is None:
+                mentions[owner]["price"] = amount
+                mentions[owner]["currency"] = currency
+        return mentions
+
+
+# -----------------------------------------------------------------------------
+# BATCH PROCESSING
+# -----------------------------------------------------------------------------
+
+def enrich_batch(matcher: ProductMatcher, messages: List[Tuple[int, str, str]]) -> List[Dict[str, Any]]:
+    rows = []
+    for message_id, channel_name, message_text in messages:
+        for index, mention in enumerate(matcher.extract(message_text)):
+            rows.append({
+                "message_id": message_id,
+                "channel_name": channel_name,
+                "mention_index": index,
+                **mention,
+            })
+    return rows
+
+
+def ensure_tables(engine=None) -> None:
+    """Create the raw tables this stage writes, so dbt can read them before the first run."""
+    engine = engine or create_engine(DB_STR)
+    with engine.begin() as conn:
+        conn.exec_driver_sql(CREATE_SQL)
+
+
+def main(dictionary_path: Path, batch_size: int) -> None:
+    matcher = ProductMatcher.from_csv(dictionary_path)
+    engine = create_engine(DB_STR)
+    ensure_tables(engine)
+
+    # Keyset walk over the primary key; messages already processed with
+    # this dictionary version are skipped, older versions are redone.
+    select_sql = text("""
+        SELECT m.message_id, m.channel_name, m.message_text
+        FROM raw.telegram_messages m
+        LEFT JOIN raw.text_enrichment_log l
+            ON l.message_id = m.message_id
+           AND l.channel_name = m.channel_name
+           AND l.dictionary_version = :version
+        WHERE l.message_id IS NULL
+          AND (m.message_id, m.channel_name) > (:last_id, :last_channel)
+        ORDER BY m.message_id, m.channel_name
+        LIMIT :batch_size
+    """)
+    delete_sql = text("""
+        DELETE FROM raw.product_mentions
+        WHERE (message_id, channel_name) IN (
+            SELECT * FROM unnest(CAST(:ids AS bigint[]), CAST(:channels AS text[]))
+        )
+    """)
+    insert_sql = text("""
+        INSERT INTO raw.product_mentions (
+            message_id, channel_name, mention_index, product_name,
+            category, matched_term, price, currency
+        )
+        VALUES (
+            :message_id, :channel_name, :mention_index, :product_name,
+            :category, :matched_term, :price, :currency
+        )
+    """)
+    log_sql = text("""
+        INSERT INTO raw.text_enrichment_log (message_id, channel_name, dictionary_version, mention_count)
+        VALUES (:message_id, :channel_name, :version, :mention_count)
+        ON CONFLICT (message_id, channel_name) DO UPDATE
+        SET dictionary_version = EXCLUDED.dictionary_version,
+            mention_count = EXCLUDED.mention_count,
+            processed_at = now()
+    """)
+
+    started = time.perf_counter()
+    processed = mentions = 0
+    last_id, last_channel = -1, ""
+
+    while True:
+        with engine.begin() as conn:
+            batch = conn.execute(select_sql, {
+                "version": matcher.version,
+                "last_id": last_id,
+                "last_channel": last_channel,
+                "batch_size": batch_size,
+            }).fetchall()
+            if not batch:
+                break
+
+            rows = enrich_batch(matcher, batch)
+            counts: Dict[Tuple[int, str], int] = {}
+            for row in rows:
+                key = (row["message_id"], row["channel_name"])
+                counts[key] = counts.get(key, 0) + 1
+
+            conn.execute(delete_sql, {
+                "ids": [m[0] for m in batch],
+                "channels": [m[1] for m in batch],
+            })
+            if rows:
+                conn.execute(insert_sql, rows)
+            conn.execute(log_sql, [
+                {
+                    "message_id": m[0],
+                    "channel_name": m[1],
+                    "version": matcher.version,
+                    "mention_count": counts.get((m[0], m[1]), 0),
+                }
+                for m in batch
+            ])
+
+        processed += len(batch)
+        mentions += len(rows)
+        last_id, last_channel = batch[-1][0], batch[-1][1]
+        logger.info(f"Processed {processed} messages ({mentions} mentions)")
+
+    elapsed = time.perf_counter() - started
+    if processed:
+        logger.success(
+            f"Enriched {processed} messages in {elapsed:.2f}s "
+            f"({processed / elapsed:.0f} messages/sec, {mentions} product mentions, "
+            f"dictionary {matcher.version})"
+        )
+    else:
+        logger.info("No new messages to enrich.")
+
+
+# -----------------------------------------------------------------------------
+# MAIN
+# -----------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Extract drug/product mentions and prices from new raw messages"
+    )
+    parser.add_argument(
+        "--dictionary",
+        type=Path,
+        default=DICTIONARY_PATH,
+        help=f"Product dictionary CSV (default: {DICTIONARY_PATH})",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=BATCH_SIZE,
+        help=f"Messages per transaction (default: {BATCH_SIZE})",
+    )
+    args = parser.parse_args()
+    main(args.dictionary, args.batch_size)
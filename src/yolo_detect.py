@@ -1,12 +1,28 @@
 import os
+import sys
 import glob
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
 import cv2
+import numpy as np
 import pandas as pd
 from ultralytics import YOLO
 from dotenv import load_dotenv
 from loguru import logger
 from sqlalchemy import create_engine
 
+# Allow running this file directly: `python src/yolo_detect.py`
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.datalake import record_stage_metrics, write_detection_boxes_parquet
+from src.image_cache import ImageCache, to_original_coords
+from src.image_hash import ImageHashIndex, dhash
+from src.image_taxonomy import Taxonomy
+from src.instrumentation import StageTimer
+
 # -----------------------------------------------------------------------------
 # ENVIRONMENT
 # -----------------------------------------------------------------------------
@@ -32,140 +48,360 @@ os.makedirs(OUTPUT_DIR, exist_ok=True)
 # -----------------------------------------------------------------------------
 
 # YOLOv8 nano for lightweight local inference
-model = YOLO("yolov8n.pt")
-
-# COCO classes loosely representing physical products
-PRODUCT_CLASSES = [
-    "bottle",
-    "cup",
-    "bowl",
-    "vase",
-    "other"
+MODEL_NAME = "yolov8n.pt"
+model = YOLO(MODEL_NAME)
+
+# Images per inference call
+BATCH_SIZE = 16
+
+# Narrow per-box layout shared by the Parquet files and raw.yolo_detection_boxes
+BOX_COLUMNS = [
+    "message_id",
+    "channel_name",
+    "box_index",
+    "class_id",
+    "confidence",
+    "x1",
+    "y1",
+    "x2",
+    "y2",
+    "source_image_path",
 ]
+BOX_DTYPES = {
+    "message_id": "int64",
+    "box_index": "int16",
+    "class_id": "int16",
+    "confidence": "float32",
+    "x1": "float32",
+    "y1": "float32",
+    "x2": "float32",
+    "y2": "float32",
+}
 
-# -----------------------------------------------------------------------------
-# BUSINESS LOGIC
-# -----------------------------------------------------------------------------
-
-def classify_image(detections: list[dict]) -> str:
-    """
-    Classify image based on detected objects.
-    """
-    labels = [d["label"] for d in detections]
-
-    has_person = "person" in labels
-    has_product = any(label in PRODUCT_CLASSES for label in labels)
-
-    if has_person and has_product:
-        return "promotional"
-    if has_product and not has_person:
-        return "product_display"
-    if has_person and not has_product:
-        return "lifestyle"
-    return "other"
+# Category rules and per-class thresholds live in config/image_taxonomy.json
+TAXONOMY = Taxonomy.from_file().compile(model.names)
 
 
 # -----------------------------------------------------------------------------
 # IMAGE PROCESSING
 # -----------------------------------------------------------------------------
 
-def process_images() -> pd.DataFrame:
+def process_images(
+        image_dir: str = IMAGE_DIR,
+        hash_index: Optional[ImageHashIndex] = None,
+        image_cache: Optional[ImageCache] = None,
+        batch_size: int = BATCH_SIZE,
+) -> pd.DataFrame:
     """
     Scan directory, run YOLO, SAVE IMAGES, and return DataFrame.
+
+    When a hash index is given, reposts of an already detected image
+    (same perceptual hash within the index threshold) reuse the cached
+    detection instead of running the model again. When an image cache is given,
+    inference reads the letterboxed copy and skips JPEG decode and resize,
+    and byte-identical images (same SHA-256 in the cache) are inferred once.
+    Inference and classification run batch_size images at a time.
     """
     image_paths = glob.glob(
-        os.path.join(IMAGE_DIR, "**", "*.jpg"),
+        os.path.join(image_dir, "**", "*.jpg"),
         recursive=True
     )
 
     logger.info(f"Found {len(image_paths)} images to process")
 
     rows = []
+    pending = []    # images that need inference
+    followers = []  # reposts of a pending image, resolved after inference
+    pending_paths = set()
+    pending_by_sha = {}  # content hash -> pending image with those bytes
+    reused = 0
 
     for img_path in image_paths:
         try:
             filename = os.path.basename(img_path)
             message_id = filename.replace(".jpg", "")
             channel_name = os.path.basename(os.path.dirname(img_path))
-
-            # Run Inference
-            results = model(img_path, verbose=False)[0]
-
-            # --- NEW: VISUALIZATION STEP ---
-            # Plot the results (draws boxes on the image)
-            annotated_frame = results.plot()
-
-            # Save the image to the new folder
-            # Structure: data/processed/annotated_images/channel_name_message_id.jpg
-            output_filename = f"{channel_name}_{filename}"
-            output_path = os.path.join(OUTPUT_DIR, output_filename)
-            cv2.imwrite(output_path, annotated_frame)
-            # -------------------------------
-
-            detections = []
-            confidences = []
-
-            for box in results.boxes:
-                cls_id = int(box.cls[0])
-                label = model.names[cls_id]
-                conf = float(box.conf[0])
-
-                detections.append({
-                    "label": label,
-                    "confidence": conf,
-                })
-                confidences.append(conf)
-
-            image_category = classify_image(detections)
-            avg_confidence = (
-                sum(confidences) / len(confidences)
-                if confidences else 0.0
-            )
-
-            rows.append({
-                "message_id": int(message_id) if message_id.isdigit() else None,
-                "channel_name": channel_name,
-                "image_path": img_path,
-                "detected_objects": [d["label"] for d in detections],
-                "image_category": image_category,
-                "confidence_score": round(avg_confidence, 3),
-            })
+            message_id = int(message_id) if message_id.isdigit() else None
+            image = (img_path, message_id, channel_name, filename)
+
+            canonical = None
+            if hash_index is not None:
+                canonical = _canonical_path(hash_index, img_path, message_id, channel_name)
+
+            if canonical is not None and hash_index.get(canonical)["detection"] is not None:
+                rows.append(_row(image, hash_index.get(canonical)["detection"]))
+                reused += 1
+            elif canonical is not None and canonical != img_path and canonical in pending_paths:
+                followers.append((image, canonical))
+            else:
+                entry = image_cache.entries.get(img_path) if image_cache is not None else None
+                sha256 = entry["sha256"] if entry is not None else None
+                if sha256 is not None and sha256 in pending_by_sha:
+                    followers.append((image, pending_by_sha[sha256]))
+                    continue
+                pending.append(image)
+                pending_paths.add(img_path)
+                if sha256 is not None:
+                    pending_by_sha[sha256] = img_path
 
         except Exception as exc:
             logger.error(f"Failed processing {img_path}: {exc}")
 
+    detected = {}
+
+    def run_batches(images: list) -> None:
+        for start in range(0, len(images), batch_size):
+            batch = images[start:start + batch_size]
+            try:
+                results = list(zip(batch, _detect_batch(batch, image_cache)))
+            except Exception as exc:
+                # One unreadable file fails the whole batch; retry image by
+                # image so only the bad one is skipped
+                logger.warning(f"Batch starting at {batch[0][0]} failed ({exc}); retrying one image at a time")
+                results = []
+                for image in batch:
+                    try:
+                        results.append((image, _detect_batch([image], image_cache)[0]))
+                    except Exception as image_exc:
+                        logger.error(f"Failed processing {image[0]}: {image_exc}")
+
+            for image, detection in results:
+                detected[image[0]] = detection
+                rows.append(_row(image, detection))
+                if hash_index is not None and image[0] in hash_index:
+                    hash_index.set_detection(image[0], detection)
+                    canonical = hash_index.canonical(image[0])
+                    if canonical["detection"] is None:
+                        canonical["detection"] = detection
+
+    run_batches(pending)
+
+    orphans = []  # reposts whose canonical image's batch failed
+    for image, canonical in followers:
+        if canonical in detected:
+            rows.append(_row(image, detected[canonical]))
+            reused += 1
+        else:
+            orphans.append(image)
+
+    if orphans:
+        logger.warning(
+            f"{len(orphans)} reposts lost their canonical image's detection; "
+            "running inference on them directly"
+        )
+        run_batches(orphans)
+
+    if hash_index is not None or reused:
+        logger.info(
+            f"Reused cached detections for {reused}/{len(rows)} images "
+            f"({len(rows) - reused} inferences run)"
+        )
+
     return pd.DataFrame(rows)
 
 
+def _row(image: tuple, detection: dict) -> dict:
+    img_path, message_id, channel_name, _ = image
+    return {
+        "message_id": message_id,
+        "channel_name": channel_name,
+        "image_path": img_path,
+        **detection,
+    }
+
+
+def _canonical_path(
+        hash_index: ImageHashIndex,
+        img_path: str,
+        message_id: Optional[int],
+        channel_name: str,
+) -> Optional[str]:
+    """
+    Look the image up in the hash index, adding it if unseen.
+
+    Returns the path of its cluster's canonical image, or None when the
+    image could not be hashed.
+    """
+    if img_path not in hash_index:
+        value = dhash(img_path)
+        if value is None:
+            return None
+        hash_index.add(img_path, value, message_id, channel_name)
+    return hash_index.get(img_path)["cluster"]
+
+
+def _detect_batch(batch: list, image_cache: Optional[ImageCache] = None) -> list:
+    """Run inference on a batch of images and classify them in one pass."""
+    sources = []
+    letterboxed = []
+    for img_path, *_ in batch:
+        cached = image_cache.load(img_path) if image_cache is not None else None
+        sources.append(cached[0] if cached is not None else img_path)
+        letterboxed.append(cached[1] if cached is not None else None)
+
+    results = model(sources, verbose=False)
+
+    cls_parts, conf_parts, idx_parts, xyxy_parts = [], [], [], []
+    for i, (result, (_, _, channel_name, filename)) in enumerate(zip(results, batch)):
+        # --- NEW: VISUALIZATION STEP ---
+        # Plot the results (draws boxes on the image)
+        annotated_frame = result.plot()
+
+        # Save the image to the new folder
+        # Structure: data/processed/annotated_images/channel_name_message_id.jpg
+        output_filename = f"{channel_name}_{filename}"
+        output_path = os.path.join(OUTPUT_DIR, output_filename)
+        cv2.imwrite(output_path, annotated_frame)
+        # -------------------------------
+
+        boxes = result.boxes
+        cls_parts.append(boxes.cls.cpu().numpy().astype(np.int64))
+        conf_parts.append(boxes.conf.cpu().numpy())
+        idx_parts.append(np.full(len(boxes), i, dtype=np.int64))
+
+        # Cached inputs are letterboxed; store boxes in source image pixels
+        xyxy = boxes.xyxy.cpu().numpy()
+        if letterboxed[i] is not None:
+            xyxy = to_original_coords(xyxy, letterboxed[i])
+        xyxy_parts.append(xyxy)
+
+    cls_ids = np.concatenate(cls_parts)
+    confidences = np.concatenate(conf_parts)
+    image_idx = np.concatenate(idx_parts)
+    xyxy = np.concatenate(xyxy_parts).reshape(-1, 4)
+
+    categories, mean_confidence, keep = TAXONOMY.classify(
+        cls_ids, confidences, image_idx, len(batch)
+    )
+
+    labels = [[] for _ in batch]
+    for cls_id, i in zip(cls_ids[keep], image_idx[keep]):
+        labels[i].append(model.names[int(cls_id)])
+
+    # Every box is kept, including those below the taxonomy thresholds,
+    # so later reclassification can apply different thresholds.
+    boxes = [[] for _ in batch]
+    for cls_id, conf, i, (x1, y1, x2, y2) in zip(cls_ids, confidences, image_idx, xyxy):
+        boxes[i].append([
+            int(cls_id),
+            round(float(conf), 4),
+            round(float(x1), 1),
+            round(float(y1), 1),
+            round(float(x2), 1),
+            round(float(y2), 1),
+        ])
+
+    return [
+        {
+            "detected_objects": labels[i],
+            "image_category": str(categories[i]),
+            "confidence_score": round(float(mean_confidence[i]), 3),
+            "boxes": boxes[i],
+            "source_image_path": batch[i][0],
+        }
+        for i in range(len(batch))
+    ]
+
+
+def detection_boxes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Flatten the per-image box lists into one narrow row per box.
+
+    Reposts reuse the boxes of their cluster's canonical image; their
+    coordinates refer to source_image_path rather than image_path.
+    """
+    rows = []
+    for row in df.itertuples(index=False):
+        if row.message_id is None or pd.isna(row.message_id):
+            continue
+        for box_index, (cls_id, conf, x1, y1, x2, y2) in enumerate(row.boxes):
+            rows.append((
+                int(row.message_id), row.channel_name, box_index, cls_id, conf,
+                x1, y1, x2, y2, row.source_image_path,
+            ))
+
+    boxes = pd.DataFrame(rows, columns=BOX_COLUMNS)
+    boxes["model_name"] = MODEL_NAME
+    return boxes.astype(BOX_DTYPES)
+
+
 # -----------------------------------------------------------------------------
 # MAIN
 # -----------------------------------------------------------------------------
 
 if __name__ == "__main__":
     logger.info("Starting YOLO object detection")
-
-    df = process_images()
-
-    if df.empty:
-        logger.warning("No images processed. Exiting.")
-        exit(0)
-
-    # Backup CSV
-    csv_path = "data/yolo_detections.csv"
-    df.to_csv(csv_path, index=False)
-    logger.info(f"CSV backup written to {csv_path}")
-
-    # Load to PostgreSQL raw schema
-    engine = create_engine(DB_STR)
-    df.to_sql(
-        name="yolo_detections",
-        con=engine,
-        schema="raw",
-        if_exists="append",  # Changed to replace to avoid duplicates during testing
-        index=False,
-    )
-
-    logger.success(
-        f"Loaded {len(df)} rows into raw.yolo_detections"
-    )
-    logger.success(f"Visual results saved to {OUTPUT_DIR}")
\ No newline at end of file
+    timer = StageTimer("detect")
+    today = datetime.today().strftime("%Y-%m-%d")
+
+    with timer:
+        # Decode + letterbox new images once; repeat runs read the cache
+        with timer.stage("image_cache"):
+            image_cache = ImageCache()
+            image_cache.build(IMAGE_DIR)
+
+        with timer.stage("inference") as inference_timer:
+            hash_index = ImageHashIndex.load(MODEL_NAME)
+            df = process_images(hash_index=hash_index, image_cache=image_cache)
+            hash_index.save()
+            inference_timer.add(images=len(df))
+        logger.info(f"Image cache report: {image_cache.report()}")
+
+        if df.empty:
+            logger.warning("No images processed. Exiting.")
+            exit(0)
+
+        # Every box goes to the lake as Parquet; scripts/load_yolo_detection_boxes.py
+        # loads it into raw.yolo_detection_boxes
+        with timer.stage("lake_write") as write_timer:
+            boxes = detection_boxes(df)
+            parquet_path = write_detection_boxes_parquet(
+                base_path="data",
+                date_str=today,
+                model_name=MODEL_NAME,
+                boxes=boxes,
+            )
+            write_timer.add(boxes=len(boxes), bytes=os.path.getsize(parquet_path))
+        logger.info(f"Wrote {len(boxes)} boxes to {parquet_path}")
+
+    # Re-entering the run timer adds the database load to its totals
+    with timer, timer.stage("db_load") as db_timer:
+        df = df.drop(columns=["boxes", "source_image_path"])
+
+        # Backup CSV
+        csv_path = "data/yolo_detections.csv"
+        df.to_csv(csv_path, index=False)
+        logger.info(f"CSV backup written to {csv_path}")
+
+        # Load to PostgreSQL raw schema
+        engine = create_engine(DB_STR)
+        df.to_sql(
+            name="yolo_detections",
+            con=engine,
+            schema="raw",
+            if_exists="append",  # Changed to replace to avoid duplicates during testing
+            index=False,
+        )
+
+        db_timer.add(rows=len(df))
+        logger.success(
+            f"Loaded {len(df)} rows into raw.yolo_detections"
+        )
+
+        # Duplicate clusters are a full snapshot of the index, so replace
+        clusters = pd.DataFrame(hash_index.cluster_rows())
+        clusters.to_sql(
+            name="image_duplicates",
+            con=engine,
+            schema="raw",
+            if_exists="replace",
+            index=False,
+        )
+        logger.success(
+            f"Loaded {len(clusters)} rows into raw.image_duplicates "
+            f"({clusters['cluster_id'].nunique()} clusters)"
+        )
+    logger.success(f"Visual results saved to {OUTPUT_DIR}")
+
+    record_stage_metrics(base_path="data", date_str=today, stage="detect", metrics=timer.to_dict())
+    logger.info(timer.summary())
\ No newline at end of file